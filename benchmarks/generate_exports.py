@@ -0,0 +1,158 @@
+# Standard library imports
+import os
+import random
+import argparse
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+
+# Merchant names, keyed by the category a (mock) language model would assign them
+MERCHANTS = {
+    'Coffee Shops': ['STARBUCKS STORE', 'DUNKIN', 'BLUE BOTTLE COFFEE', 'CAFE NERO'],
+    'Groceries': ['WHOLEFOODS', 'MERCADONA', 'TRADER JOES', 'COSTCO WHSE', 'LIDL SUPERMARKET'],
+    'Fuel': ['SHELL OIL', 'CHEVRON', 'REPSOL PETROL', 'BP GAS STATION'],
+    'Streaming': ['NETFLIX.COM', 'SPOTIFY', 'HULU', 'DISNEY PLUS'],
+    'Transportation': ['UBER TRIP', 'LYFT RIDE', 'RENFE VIAJEROS', 'AMTRAK'],
+    'Restaurants': ['CHIPOTLE', 'SUSHI BAR', 'TAQUERIA', 'PIZZERIA NAPOLI'],
+    'Shopping': ['AMAZON MKTPLACE PMTS', 'EBAY O*', 'TARGET', 'ZARA'],
+    'Income': ['PAYROLL DEPOSIT', 'NOMINA EMPRESA', 'REFUND'],
+    'Housing': ['RENT PAYMENT', 'MORTGAGE'],
+    'Gym': ['PLANET FITNESS', 'YOGA STUDIO'],
+}
+
+# Supported layouts: header, data format, decimal separator and date format
+LAYOUTS = {
+    'us_type': (['Date', 'Description', 'Type', 'Amount'], 'TYPE_AMOUNTS', '.', '%m/%d/%Y'),
+    'us_signed': (['Posting Date', 'Description', 'Amount', 'Balance'], 'ONLY_AMOUNTS', '.', '%Y-%m-%d'),
+    'eu_signed': (['Fecha', 'Concepto', 'Importe', 'Saldo'], 'ONLY_AMOUNTS', ',', '%d/%m/%Y'),
+    'eu_type': (['Fecha Valor', 'Descripción', 'Tipo', 'Importe'], 'TYPE_AMOUNTS', ',', '%d.%m.%Y'),
+    'us_crdb': (['Transaction Date', 'Description', 'Credit', 'Debit'], 'CR_DB_AMOUNTS', '.', '%d %b %Y'),
+    'eu_crdb': (['Date', 'Desc.', 'Credit', 'Debit'], 'CR_DB_AMOUNTS', ',', '%d-%m-%y'),
+}
+
+
+def merchant_catalog(unique_merchants: int, seed: int = 0, long_tail_share: float = 0.5) -> List[Tuple[str, Optional[str]]]:
+    """
+    Return (description, category) pairs for a number of distinct merchants.
+
+    Known merchants (see MERCHANTS) appear with varying store numbers and cities; the long tail of small
+    merchants gets random names (and no category, as only a language model could tell it).
+    """
+
+    rng = random.Random(seed)
+    cities = ['NEW YORK', 'MADRID', 'VALENCIA', 'BOSTON', 'AUSTIN', 'PARIS', 'LONDON', '']
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    catalog = []
+    while len(catalog) < unique_merchants:
+        if rng.random() < long_tail_share:
+            name = ' '.join(''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(2))
+            catalog.append((f"POS {name} {rng.randint(1, 999)}", None))
+        else:
+            category = rng.choice(list(MERCHANTS))
+            name = rng.choice(MERCHANTS[category])
+            catalog.append((f"{name} {rng.randint(1, 9999)} {rng.choice(cities)}".strip(), category))
+    return catalog
+
+
+def format_amounts(amounts: np.ndarray, decimal_separator: str) -> pd.Series:
+    """Format amounts as text, with thousands separators, in US (1,234.56) or European (1.234,56) format."""
+    text = pd.Series([f'{amount:,.2f}' for amount in amounts], dtype=object)
+    if decimal_separator == ',':
+        text = text.str.replace(',', '_', regex=False).str.replace('.', ',', regex=False).str.replace('_', '.', regex=False)
+    return text
+
+
+def generate_export(
+    layout: str,
+    rows: int,
+    catalog: List[Tuple[str, Optional[str]]],
+    seed: int = 0,
+    start: date = date(2020, 1, 1),
+) -> pd.DataFrame:
+    """
+    Generate a synthetic bank export.
+
+    Descriptions are drawn from the merchant catalog with a Zipf-like distribution (a few merchants are
+    very frequent), and about one in ten transactions is a credit.
+
+    Args:
+        layout (str): One of LAYOUTS.
+        rows (int): Number of transactions.
+        catalog (List[Tuple[str, Optional[str]]]): Merchant descriptions and categories (see 'merchant_catalog').
+        seed (int): Random seed (exports are deterministic).
+        start (date): Date of the first transaction.
+
+    Returns:
+        pd.DataFrame: The export, with the columns of its layout (dates and amounts as text).
+    """
+
+    header, data_format, decimal_separator, date_format = LAYOUTS[layout]
+    rng = np.random.default_rng(seed)
+
+    ranks = np.minimum(rng.zipf(1.3, rows), len(catalog)) - 1
+    descriptions = np.array([description for description, _ in catalog], dtype=object)[ranks]
+    days = np.sort(rng.integers(0, 3 * 365, rows))
+    dates = pd.Series(pd.Timestamp(start) + pd.to_timedelta(days, unit='D')).dt.strftime(date_format)
+    amounts = np.round(rng.lognormal(3, 1.2, rows), 2)
+    credits = rng.random(rows) < 0.1
+
+    export = {header[0]: dates, header[1]: descriptions}
+    if data_format == 'TYPE_AMOUNTS':
+        export[header[2]] = np.where(credits, rng.choice(['Credit', 'CR'], rows), rng.choice(['Debit', 'DR'], rows))
+        export[header[3]] = format_amounts(amounts, decimal_separator)
+    elif data_format == 'ONLY_AMOUNTS':
+        export[header[2]] = format_amounts(np.where(credits, amounts, -amounts), decimal_separator)
+        export[header[3]] = format_amounts(np.round(rng.uniform(0, 20000, rows), 2), decimal_separator)
+    else:
+        formatted = format_amounts(amounts, decimal_separator)
+        export[header[2]] = formatted.where(credits, None)
+        export[header[3]] = formatted.where(~credits, None)
+
+    return pd.DataFrame(export)
+
+
+def generate_exports(folder: str, rows: int, layouts: Optional[List[str]] = None, unique_merchants: int = 2_000, seed: int = 0) -> Dict[str, str]:
+    """
+    Write one synthetic export per layout, splitting the rows evenly among them.
+
+    Args:
+        folder (str): Folder to write the exports to.
+        rows (int): Total number of transactions.
+        layouts (List[str], optional): Layouts to generate (default: all of them).
+        unique_merchants (int): Number of distinct merchant descriptions.
+        seed (int): Random seed.
+
+    Returns:
+        Dict[str, str]: Path to the export of each layout.
+    """
+
+    layouts = layouts or list(LAYOUTS)
+    catalog = merchant_catalog(unique_merchants, seed)
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for position, layout in enumerate(layouts):
+        layout_rows = rows // len(layouts) + (1 if position < rows % len(layouts) else 0)
+        paths[layout] = os.path.join(folder, f'{layout}_{rows}.csv')
+        generate_export(layout, layout_rows, catalog, seed + position).to_csv(paths[layout], index=False)
+    return paths
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generate_exports', description='Generate synthetic bank exports')
+    parser.add_argument('--rows', type=int, default=10_000, help='Total number of transactions (split among layouts)')
+    parser.add_argument('--layouts', default=','.join(LAYOUTS), help='Comma-separated layouts to generate')
+    parser.add_argument('--merchants', type=int, default=2_000, help='Number of distinct merchant descriptions')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', default='data/tx_data/input', help='Folder to write the exports to')
+    parsed = parser.parse_args(args)
+
+    paths = generate_exports(parsed.output, parsed.rows, parsed.layouts.split(','), parsed.merchants, parsed.seed)
+    for layout, path in paths.items():
+        print(f'{layout}: {path}')
+
+
+if __name__ == '__main__':
+    main()
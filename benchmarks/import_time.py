@@ -0,0 +1,75 @@
+# Standard library imports
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+# Modules only needed to call the language model (loaded on first use, see 'LLMScheduler')
+LLM_MODULES = ('langchain', 'openai')
+
+# What starting the application imports: the entry point's module level, without running it
+STARTUP_CODE = "import runpy; runpy.run_path('expense-manager.py', run_name='expense_manager')"
+
+
+def measure_imports(code: str = STARTUP_CODE) -> Dict:
+    """
+    Run code in a fresh interpreter with 'python -X importtime', and collect the import time of each module.
+
+    Args:
+        code (str): Code to run (from the repository root).
+
+    Returns:
+        dict: Total import time (seconds), import time of each top-level import (cumulative seconds,
+        including the modules it imports) and the names of all modules imported.
+    """
+
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'import failed')
+
+    # Lines are 'import time: self [us] | cumulative | name', with the name indented by import depth
+    top_level, modules = {}, []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    return {'seconds': sum(top_level.values()), 'top_level': top_level, 'modules': modules}
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time', description='Measure the startup import time of the application')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters to measure (the median is reported)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest top-level imports to list')
+    parser.add_argument('--check', action='store_true', help='Exit with an error if startup imports the LLM stack (langchain, openai)')
+    parser.add_argument('--json', help='Write the results to this JSON file (e.g. to compare runs)')
+    parsed = parser.parse_args(args)
+
+    runs = [measure_imports() for _ in range(parsed.runs)]
+    median_run = sorted(runs, key=lambda run: run['seconds'])[len(runs) // 2]
+    llm_modules = sorted({module for module in median_run['modules'] if module.split('.')[0] in LLM_MODULES})
+
+    print(f"Startup imports: {statistics.median(run['seconds'] for run in runs):.3f}s "
+          f"(median of {len(runs)} runs, {len(median_run['modules'])} modules)")
+    for name, seconds in sorted(median_run['top_level'].items(), key=lambda item: -item[1])[:parsed.top]:
+        print(f'  {seconds:8.3f}s  {name}')
+    print(f"LLM stack imported at startup: {'yes (' + ', '.join(llm_modules[:5]) + ', ...)' if llm_modules else 'no'}")
+
+    if parsed.json:
+        with open(parsed.json, 'w') as file:
+            json.dump({
+                'seconds': [run['seconds'] for run in runs],
+                'top_level': median_run['top_level'],
+                'llm_modules': llm_modules,
+            }, file, indent=2)
+
+    if parsed.check and llm_modules:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
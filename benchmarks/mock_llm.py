@@ -0,0 +1,91 @@
+# Standard library imports
+import random
+import asyncio
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+# Third-party library imports
+import openai
+
+# Local application/library specific imports
+import src.templates as templates
+import src.llm_scheduler as llm_scheduler
+from benchmarks.generate_exports import MERCHANTS
+
+
+class MockLLMChain:
+    """Deterministic, offline stand-in for the categorization LLMChain (see 'LLMScheduler').
+
+    Each description is assigned the category of the merchant it starts with (see MERCHANTS), or a
+    category picked from its hash. Calls take 'latency' seconds; a share of them ('error_rate')
+    fail with a rate limit error, and a share of the descriptions ('drop_rate') are left out of the
+    output, so retry and requeue paths are exercised. Outcomes depend only on the input and on how
+    many times it was sent, so runs are reproducible regardless of concurrency.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, drop_rate: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.categories = sorted(templates.EXPENSE_CATEGORIES)
+        self.merchants = [(name, category) for category, names in MERCHANTS.items() for name in names]
+        self.calls = 0
+        self.errors = 0
+        self.descriptions = 0
+        self._attempts: Counter = Counter()
+
+    def categorize(self, description: str) -> str:
+        for name, category in self.merchants:
+            if description.startswith(name):
+                return category
+        return self.categories[zlib.crc32(description.encode('utf-8')) % len(self.categories)]
+
+    async def arun(self, input_data: str = '', **kwargs) -> str:
+        self._attempts[input_data] += 1
+        rng = random.Random(f'{self.seed}:{self._attempts[input_data]}:{input_data}')
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if rng.random() < self.error_rate:
+            self.errors += 1
+            raise openai.error.RateLimitError('Rate limit reached (mock)', headers={'retry-after': '0'})
+
+        descriptions: List[str] = [line for line in input_data.split('\n') if line.strip()]
+        self.descriptions += len(descriptions)
+        pairs = [[description, self.categorize(description)] for description in descriptions if rng.random() >= self.drop_rate]
+        return str(pairs)
+
+
+def install_mock_llm(
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    drop_rate: float = 0.0,
+    seed: int = 0,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> MockLLMChain:
+    """
+    Route all language model calls to a mock chain, through a new process-wide scheduler.
+
+    Args:
+        latency (float): Seconds per call.
+        error_rate (float): Share of calls failing with a rate limit error.
+        drop_rate (float): Share of descriptions left out of the output.
+        seed (int): Random seed.
+        requests_per_minute (float, optional): Request rate limit (default: practically unlimited).
+        tokens_per_minute (float, optional): Token rate limit (default: practically unlimited).
+
+    Returns:
+        MockLLMChain: The mock chain (with call, error and description counters).
+    """
+
+    chain = MockLLMChain(latency, error_rate, drop_rate, seed)
+    llm_scheduler._scheduler = llm_scheduler.LLMScheduler(
+        chain=chain,
+        requests_per_minute=requests_per_minute or 1e9,
+        tokens_per_minute=tokens_per_minute or 1e12,
+    )
+    return chain
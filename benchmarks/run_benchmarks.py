@@ -0,0 +1,158 @@
+# Standard library imports
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from benchmarks.generate_exports import generate_exports, merchant_catalog
+from benchmarks.mock_llm import install_mock_llm
+from src.file_processing import standardize_tx_format, save_results
+from src.categorize_tx import llm_list_categorizer
+from src.reference_index import ReferenceIndex
+from src.descriptions import canonicalize_descriptions
+from src.keyword_rules import get_keyword_rules
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimer:
+    """Times pipeline stages and records their throughput and memory use."""
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, items: int) -> Iterator[Dict]:
+        stage = {'stage': name, 'items': items}
+        if self.trace_memory:
+            tracemalloc.start()
+        started_at = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage['seconds'] = time.perf_counter() - started_at
+            stage['items_per_second'] = stage['items'] / stage['seconds'] if stage['seconds'] else float('inf')
+            stage['peak_rss_mb'] = peak_rss_mb()
+            if self.trace_memory:
+                stage['peak_alloc_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+            self.stages.append(stage)
+
+
+def run_pipeline(rows: int, args: argparse.Namespace) -> List[Dict]:
+    """
+    Run the pipeline stages on synthetic exports of the given size, in a scratch data folder.
+
+    Args:
+        rows (int): Total number of transactions (split among all layouts).
+        args (argparse.Namespace): Benchmark options (see 'main').
+
+    Returns:
+        List[Dict]: Timings, throughput and memory use of each stage.
+    """
+
+    timer = StageTimer(args.trace_memory)
+    chain = install_mock_llm(args.llm_latency, args.llm_error_rate, args.llm_drop_rate, args.seed)
+    paths = generate_exports('data/tx_data/input', rows, unique_merchants=args.merchants, seed=args.seed)
+
+    with timer.stage('read', rows):
+        for path in paths.values():
+            pd.read_csv(path, index_col=False)
+
+    with timer.stage('standardize', rows):
+        results = [{'file_name': os.path.basename(path), 'output': standardize_tx_format(path), 'error': ''} for path in paths.values()]
+
+    # The reference holds part of the merchants, so the rest goes through fuzzy matching, keyword rules and the local
+    # classifier, and then to the language model
+    catalog = [(description, category) for description, category in merchant_catalog(args.merchants, args.seed) if category]
+    reference = pd.DataFrame(catalog[:int(len(catalog) * args.reference_share)], columns=['description', 'category'])
+    tx_list = pd.concat([result['output'] for result in results], keys=range(len(results)))
+    with timer.stage('canonicalize', tx_list['description'].nunique()) as stage:
+        keys = canonicalize_descriptions(tx_list['description'], tx_list['source'])
+        stage['unique_keys'] = int(keys.nunique())
+    with timer.stage('fuzzy', keys.nunique()) as stage:
+        ref_index = ReferenceIndex(reference)
+        tx_list['category'] = ref_index.categorize(keys).values
+        stage['hit_rate'] = float(tx_list['category'].notnull().mean())
+
+    for name, categorizer in (('rules', get_keyword_rules().categorize), ('local_model', ref_index.classify)):
+        missing = tx_list['category'].isnull()
+        with timer.stage(name, keys[missing].nunique()) as stage:
+            tx_list.loc[missing, 'category'] = categorizer(keys[missing]).values
+            stage['hit_rate'] = float(tx_list.loc[missing, 'category'].notnull().mean()) if missing.any() else 0.0
+
+    uncategorized = tx_list[tx_list['category'].isnull()].assign(description=keys).drop_duplicates(subset=['description'])
+    uncategorized.attrs['file_name'] = 'benchmark'
+    with timer.stage('llm', len(uncategorized)) as stage:
+        categorized = asyncio.run(llm_list_categorizer(uncategorized[['description', 'category']]))
+        stage.update({'calls': chain.calls, 'errors': chain.errors})
+    tx_list['category'] = tx_list['category'].fillna(
+        keys.map(categorized.set_index('description')['category'])
+    ).fillna('Other')
+    ref_index.update(pd.DataFrame({'description': keys, 'category': tx_list['category']}))
+
+    for position, result in enumerate(results):
+        result['output'] = tx_list.xs(position)
+    with timer.stage('save', rows):
+        save_results(results, ref_index)
+
+    return timer.stages
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run_benchmarks', description='Benchmark the pipeline stages offline')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated total row counts (e.g. 1000,1000000)')
+    parser.add_argument('--merchants', type=int, default=2_000, help='Number of distinct merchant descriptions')
+    parser.add_argument('--reference-share', type=float, default=0.5, help='Share of the known merchants in the reference data')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Seconds per mock LLM call')
+    parser.add_argument('--llm-error-rate', type=float, default=0.02, help='Share of mock LLM calls failing with a rate limit error')
+    parser.add_argument('--llm-drop-rate', type=float, default=0.02, help='Share of descriptions left out of mock LLM outputs')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--trace-memory', action='store_true', help='Also report peak Python allocations per stage (slower)')
+    parser.add_argument('--json', help='Write the results to this JSON file (e.g. to compare runs)')
+    parsed = parser.parse_args(args)
+
+    report = []
+    working_dir = os.getcwd()
+    for rows in [int(size) for size in parsed.sizes.split(',')]:
+        # Each size runs in a scratch data folder (config paths are relative), with empty caches and registries
+        with tempfile.TemporaryDirectory(prefix='expense-manager-bench-') as scratch_dir:
+            os.chdir(scratch_dir)
+            for folder in ['data/ref_data', 'data/tx_data/input', 'data/tx_data/output', 'data/tx_data/archive']:
+                os.makedirs(folder)
+            try:
+                stages = run_pipeline(rows, parsed)
+            finally:
+                os.chdir(working_dir)
+        report.extend({'rows': rows, **stage} for stage in stages)
+
+    columns = ['rows', 'stage', 'items', 'seconds', 'items_per_second', 'peak_rss_mb']
+    if parsed.trace_memory:
+        columns.append('peak_alloc_mb')
+    print(pd.DataFrame(report)[columns].to_string(index=False, float_format=lambda value: f'{value:,.2f}'))
+
+    if parsed.json:
+        with open(parsed.json, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
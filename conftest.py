@@ -0,0 +1 @@
+# Makes the repository root importable by the tests (e.g. 'from src.normalize_tx import ...'), also with a bare 'pytest'
@@ -3,28 +3,38 @@
 # Standard library imports
 import os
 import sys
-import glob
+import shutil
 import logging
 import asyncio
-import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 # Third-party library imports
 from dotenv import load_dotenv
-import langchain
 
 # Local application/library specific imports
-from src.file_processing import manage_processed_files, save_results, process_file
+from src.file_processing import manage_processed_files, process_files, list_input_files
+from src.watch import watch_input_folder
+from src.shards import ShardWorker, run_worker, WORKER_NAME_PATTERN
+from src.reference_index import ReferenceIndex
+from src.ingest_ledger import IngestLedger
+from src.aggregates import TxAggregates
+from src.metrics import get_metrics
+from src.llm_scheduler import configure_scheduler
 from src.config import (
-    TX_ARCHIVE_FOLDER,
-    TX_INPUT_FOLDER,
     TX_OUTPUT_FILE,
+    TX_OUTPUT_DATASET,
+    TX_PARSER_WORKERS,
     LOG_FILE,
     LOG_LEVEL
 )
 
-def read_args(args: list) -> bool:
+def read_args(args: list) -> tuple:
     n_flag = False
     d_flag = False
+    w_flag = False
+    o_flag = False
+    worker_name = None
+    workers = 1
     
     if args:
         for arg in args:
@@ -35,11 +45,34 @@ def read_args(args: list) -> bool:
             elif arg == '-nd': # Combined effects of -n and -d flags
                 n_flag = True
                 d_flag = True
+            elif arg == '-w': # Keeps running, processing new files as they arrive in the input folder
+                w_flag = True
+            elif arg in ('-o', '--offline'): # Categorizes with local data only (reference, rules, local model, LLM cache), without calling the LLM
+                o_flag = True
+            elif arg.startswith('--worker='): # Runs as one of several concurrent workers sharing the input folder (sharded run)
+                worker_name = arg[len('--worker='):]
+                if not WORKER_NAME_PATTERN.fullmatch(worker_name):
+                    print(f'Invalid worker name: {worker_name} (use letters, digits, dots, dashes and underscores)')
+                    sys.exit(1)
+            elif arg.startswith('--workers='): # Number of workers running at the same time (they share the LLM rate limits)
+                workers = arg[len('--workers='):]
+                if not workers.isdigit() or int(workers) < 1:
+                    print(f'Invalid number of workers: {workers}')
+                    sys.exit(1)
+                workers = int(workers)
             else:
                 print(f'Invalid argument: {arg}')
                 sys.exit(1)
+
+    # Other workers may be writing to the output file (and the ledger) at the same time
+    if n_flag and worker_name is not None:
+        print('Invalid arguments: -n can\'t be used with --worker')
+        sys.exit(1)
+    if workers > 1 and worker_name is None:
+        print('Invalid arguments: --workers can only be used with --worker')
+        sys.exit(1)
         
-    return n_flag, d_flag
+    return n_flag, d_flag, w_flag, o_flag, worker_name, workers
 
 
 async def main():
@@ -47,34 +80,52 @@ async def main():
     Main function to initialize environment, process CSV files, 
     save the results, and archive the processed files.
     """
-    # Filter out UserWarnings related to DateTime parsing; these are expected since date format is inferred
-    warnings.filterwarnings("ignore", category=UserWarning, message='^Could not infer format*')
-
     load_dotenv()
     
-    # Set langchain's debug level
-    langchain.debug = False
-    
     # -n flag: deletes previous output file and creates a new one
     # -d flag: deletes all processed files at the end of the program
-    n_flag, d_flag = read_args(sys.argv[1:])
-    if n_flag and os.path.isfile(TX_OUTPUT_FILE):
-        os.remove(TX_OUTPUT_FILE)
+    # -w flag: watches the input folder, processing new files as they arrive (until stopped)
+    # -o flag: categorizes without calling the LLM (descriptions not found locally are set to 'Other')
+    # --worker=NAME: claims input files before processing them, so several workers can share the input folder
+    # --workers=N: number of workers running at the same time; each one gets 1/N of the LLM rate limits
+    n_flag, d_flag, w_flag, o_flag, worker_name, workers = read_args(sys.argv[1:])
+    configure_scheduler(workers)
+    worker = ShardWorker(worker_name) if worker_name is not None else None
+    ledger = IngestLedger(worker=worker_name)
+    if n_flag:
+        if os.path.isfile(TX_OUTPUT_FILE):
+            os.remove(TX_OUTPUT_FILE)
+        if os.path.isdir(TX_OUTPUT_DATASET):
+            shutil.rmtree(TX_OUTPUT_DATASET)
+        # Transactions are ingested (and aggregated) again into the new output file
+        ledger.reset()
+        aggregates = TxAggregates()
+        aggregates.reset()
+        aggregates.close()
     
     # Configure logging with file, level, and format
     logging.basicConfig(filename=LOG_FILE, level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s %(message)s')
     logger = logging.getLogger(__name__)
 
-    # Create and run an asyncio task to process each file
-    file_paths = glob.glob(os.path.join(TX_INPUT_FOLDER, "*.csv"), recursive=True) + glob.glob(os.path.join(TX_INPUT_FOLDER, "*.CSV"), recursive=True)    
-    tasks = [process_file(file_path) for file_path in file_paths]
+    # Load the reference data once; the index is shared (and updated) by all files in the run
+    ref_index = ReferenceIndex.load()
 
-    print('\nProcessing files...')    
-    results = await asyncio.gather(*tasks)
+    # Files are read and standardized in a process pool (kept warm between batches in watch mode)
+    metrics = get_metrics()
+    with ProcessPoolExecutor(max_workers=TX_PARSER_WORKERS) as executor:
+        if w_flag:
+            await watch_input_folder(executor, ref_index, ledger, d_flag, offline=o_flag, worker=worker)
+        elif worker is not None:
+            # Claim and process a few files at a time, until no files are left for this worker
+            await run_worker(worker, executor, ref_index, ledger, d_flag, o_flag)
+        else:
+            # Process, categorize and save all files at once, then archive input files
+            await process_files(list_input_files(), executor, ref_index, ledger, o_flag)
+            manage_processed_files(d_flag)
+    ledger.close()
 
-    # Save results to output file and archive input files
-    save_results(results)
-    manage_processed_files(d_flag)
+    # Write the metrics of the run (stage timings, categorization counts and LLM usage)
+    metrics.dump()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+# Standard library imports
+import os
+import re
+import sqlite3
+import argparse
+from typing import List, Optional, Tuple
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from src.config import TX_AGGREGATES_FILE, TX_OUTPUT_FILE, TX_OUTPUT_FORMAT, TX_CHUNK_SIZE, LOCK_TIMEOUT
+
+AGGREGATE_DIMENSIONS = ['month', 'category', 'source', 'type']
+
+
+class TxAggregates:
+    """Durable (SQLite) aggregates of the output transactions: total amount and number of transactions
+    by month, category, source and type.
+
+    Aggregates are updated incrementally with the new transactions of each run (see 'save_results'),
+    so reports (e.g. spend by category for a quarter) never need to rescan the output file.
+    """
+
+    def __init__(self, file_path: str = TX_AGGREGATES_FILE) -> None:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(file_path, timeout=LOCK_TIMEOUT)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS tx_aggregates (
+                month TEXT NOT NULL,
+                category TEXT NOT NULL,
+                source TEXT NOT NULL,
+                type TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (month, category, source, type)
+            )"""
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def reset(self) -> None:
+        """Delete all aggregates (e.g. when the output file is recreated)."""
+        self.connection.execute("DELETE FROM tx_aggregates")
+        self.connection.commit()
+
+    def add(self, tx_list: pd.DataFrame, commit: bool = True) -> None:
+        """Add transactions (in output format) to the aggregates.
+
+        Args:
+            tx_list (pd.DataFrame): Transactions, with the output columns (see 'save_results').
+            commit (bool): Commit right away; otherwise, call 'commit' once all transactions are added (so they are
+                added all at once, or not at all).
+        """
+
+        if tx_list.empty:
+            return
+
+        dates = tx_list['Date'].astype(str)
+        groups = pd.DataFrame({
+            'month': dates.str[:4] + '-' + dates.str[5:7],
+            'category': tx_list['Category'].astype(str).values,
+            'source': tx_list['Source'].astype(str).values,
+            'type': tx_list['Type'].astype(str).values,
+            'amount': tx_list['Amount'].astype(float).values,
+        }).groupby(AGGREGATE_DIMENSIONS)['amount'].agg(['sum', 'count'])
+
+        self.connection.executemany(
+            """INSERT INTO tx_aggregates (month, category, source, type, total, count) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (month, category, source, type)
+               DO UPDATE SET total = total + excluded.total, count = count + excluded.count""",
+            [(*keys, float(total), int(count)) for keys, total, count in groups.itertuples()],
+        )
+        if commit:
+            self.connection.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def query(
+        self,
+        start_month: Optional[str] = None,
+        end_month: Optional[str] = None,
+        group_by: Optional[List[str]] = None,
+        tx_type: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Query the aggregates.
+
+        Args:
+            start_month (str, optional): First month (inclusive), e.g. '2023-04'.
+            end_month (str, optional): Last month (inclusive), e.g. '2023-06'.
+            group_by (List[str], optional): Dimensions to group by (default: category).
+            tx_type (str, optional): Only transactions of this type ('C' or 'D').
+            source (str, optional): Only transactions from this source (input file name).
+
+        Returns:
+            pd.DataFrame: Total amount and number of transactions per group, by descending absolute total.
+        """
+
+        group_by = group_by or ['category']
+        unknown = set(group_by) - set(AGGREGATE_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {sorted(unknown)} (valid: {AGGREGATE_DIMENSIONS})")
+
+        conditions, parameters = [], []
+        for condition, value in (('month >= ?', start_month), ('month <= ?', end_month), ('type = ?', tx_type), ('source = ?', source)):
+            if value:
+                conditions.append(condition)
+                parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        columns = ', '.join(group_by)
+
+        return pd.read_sql_query(
+            f"""SELECT {columns}, ROUND(SUM(total), 2) AS total, SUM(count) AS count FROM tx_aggregates
+                {where} GROUP BY {columns} ORDER BY ABS(SUM(total)) DESC""",
+            self.connection,
+            params=parameters,
+        )
+
+    def rebuild(self) -> None:
+        """Rebuild the aggregates from the output (e.g. for history saved before aggregates were kept)."""
+        self.reset()
+        if TX_OUTPUT_FORMAT == 'parquet':
+            # Imported here: the Parquet dataset needs an optional dependency
+            from src.tx_dataset import load_transactions
+            self.add(load_transactions(columns=['Source', 'Date', 'Type', 'Category', 'Amount']))
+        elif os.path.exists(TX_OUTPUT_FILE):
+            for tx_list in pd.read_csv(TX_OUTPUT_FILE, index_col=False, chunksize=TX_CHUNK_SIZE):
+                self.add(tx_list)
+
+
+def period_months(period: str) -> Tuple[str, str]:
+    """Return the first and last month of a period: a year (2023), a quarter (2023-Q2) or a month (2023-04)."""
+    match = re.fullmatch(r'(\d{4})(?:-Q([1-4])|-(\d{2}))?', period.strip(), flags=re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid period: {period} (e.g. 2023, 2023-Q2, 2023-04)")
+    year, quarter, month = match.groups()
+    if quarter:
+        first = 3 * int(quarter) - 2
+        return f'{year}-{first:02d}', f'{year}-{first + 2:02d}'
+    if month:
+        return f'{year}-{month}', f'{year}-{month}'
+    return f'{year}-01', f'{year}-12'
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.aggregates', description='Query the transaction aggregates')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    query_parser = subparsers.add_parser('query', help='Totals and counts per group (e.g. spend by category for 2023-Q2)')
+    query_parser.add_argument('--period', help='Year, quarter or month (e.g. 2023, 2023-Q2, 2023-04)')
+    query_parser.add_argument('--start', help='First month (e.g. 2023-04)')
+    query_parser.add_argument('--end', help='Last month (e.g. 2023-06)')
+    query_parser.add_argument('--by', default='category', help=f"Comma-separated dimensions ({', '.join(AGGREGATE_DIMENSIONS)})")
+    query_parser.add_argument('--type', choices=['C', 'D'], help='Only credits (C) or debits (D), e.g. D for spend')
+    query_parser.add_argument('--source', help='Only transactions from this source (input file name)')
+    subparsers.add_parser('rebuild', help='Rebuild the aggregates from the output')
+    parsed = parser.parse_args(args)
+
+    aggregates = TxAggregates()
+    try:
+        if parsed.command == 'rebuild':
+            aggregates.rebuild()
+            print(f'Rebuilt aggregates in {TX_AGGREGATES_FILE}')
+        else:
+            start_month, end_month = period_months(parsed.period) if parsed.period else (parsed.start, parsed.end)
+            result = aggregates.query(start_month, end_month, parsed.by.split(','), parsed.type, parsed.source)
+            print(result.to_string(index=False))
+    finally:
+        aggregates.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Standard library imports
+from typing import Deque, List, Optional
+
+# Local application/library specific imports
+import src.templates as templates
+from src.llm_scheduler import estimate_tokens
+from src.config import (
+    TX_PER_LLM_RUN,
+    LLM_MIN_TX_PER_RUN,
+    LLM_MAX_TX_PER_RUN,
+    LLM_BATCH_TOKEN_BUDGET,
+)
+
+
+def description_tokens(description: str) -> int:
+    """Estimate the tokens a description adds to a request (input line plus its output pair)."""
+    return 2 * estimate_tokens(description) + 8
+
+
+class BatchPacker:
+    """Packs transaction descriptions into LLM requests of adaptive size.
+
+    Each request is filled with descriptions until either its estimated size (prompt, input
+    and expected output) reaches the token budget or it holds 'batch_size' descriptions.
+    The batch size adapts to the parse success rate of each batch (share of requested
+    descriptions found in the output): it shrinks when output errors appear and grows
+    back while parsing is clean.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+        batch_size: int = TX_PER_LLM_RUN,
+        min_batch_size: int = LLM_MIN_TX_PER_RUN,
+        max_batch_size: int = LLM_MAX_TX_PER_RUN,
+    ) -> None:
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.prompt_tokens = estimate_tokens(templates.EXPENSE_CAT_TEMPLATE)
+        self.batches = 0
+        self.requested = 0
+        self.parsed = 0
+
+    @property
+    def parse_rate(self) -> float:
+        """Share of the descriptions sent so far that were found in the output."""
+        return self.parsed / self.requested if self.requested else 1.0
+
+    def next_batch(self, pending: Deque[str]) -> List[str]:
+        """Take the next batch of descriptions from the front of the pending queue.
+
+        Args:
+            pending (Deque[str]): Descriptions waiting to be categorized; consumed in place.
+
+        Returns:
+            List[str]: Descriptions for the next request (at least one if any are pending).
+        """
+
+        batch = []
+        tokens = self.prompt_tokens
+        while pending and len(batch) < self.batch_size:
+            cost = description_tokens(pending[0])
+            if batch and tokens + cost > self.token_budget:
+                break
+            batch.append(pending.popleft())
+            tokens += cost
+        return batch
+
+    def record(self, requested: int, parsed: int) -> None:
+        """Record the parse outcome of a batch and adapt the batch size.
+
+        Args:
+            requested (int): Number of descriptions sent.
+            parsed (int): Number of them found (correctly formatted) in the output.
+        """
+
+        self.batches += 1
+        self.requested += requested
+        self.parsed += parsed
+        if parsed < requested:
+            self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.7))
+        elif requested >= self.batch_size:
+            # Only full batches show that the current size parses cleanly
+            self.batch_size = min(self.max_batch_size, self.batch_size + 2)
+
+
+_batch_packer: Optional[BatchPacker] = None
+
+
+def get_batch_packer() -> BatchPacker:
+    """Return the process-wide batch packer (created on first use), so batch sizes adapt across files."""
+    global _batch_packer
+    if _batch_packer is None:
+        _batch_packer = BatchPacker()
+    return _batch_packer
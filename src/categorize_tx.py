@@ -1,32 +1,40 @@
 # Standard library imports
+import os
 import re
 import ast
-import json
 import logging
-from typing import Any, List, Tuple, Optional, Dict, Union
+from collections import deque
+from typing import List, Tuple, Optional, Dict, Union
 
 # Third-party library imports
 import numpy as np
 import pandas as pd
 import asyncio
-from rapidfuzz import process
-from tenacity import retry, wait_random_exponential, stop_after_attempt
-from pydantic import ValidationError
+from rapidfuzz import process, fuzz
+from tenacity import retry, retry_if_exception, wait_random_exponential, stop_after_attempt
 
 # Local application/library specific imports
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
-from langchain.prompts import PromptTemplate
 import src.templates as templates
-from src.config import REF_OUTPUT_FILE, TX_PER_LLM_RUN
+from src.ngram_index import NgramIndex
+from src.llm_cache import LLMCache
+from src.llm_scheduler import LLMScheduler, get_scheduler, is_rate_limit_error
+from src.batch_packer import get_batch_packer
+from src.descriptions import normalize_description
+from src.metrics import get_metrics, timed
+from src.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_ATTEMPTS,
+    FUZZY_MATCH_THRESHOLD,
+    FUZZY_MATCH_MAX_CELLS,
+    FUZZY_MATCH_WORKERS,
+)
 
 
 def fuzzy_match_list_categorizer(
     description: str,
     descriptions: np.ndarray,
     description_category_pairs: pd.DataFrame,
-    threshold: int = 75,
+    threshold: int = FUZZY_MATCH_THRESHOLD,
 ) -> Optional[str]:
     """Find the most similar transaction description and return its category.
 
@@ -54,69 +62,245 @@ def fuzzy_match_list_categorizer(
     return None
 
 
-async def llm_list_categorizer(tx_list: pd.DataFrame) -> pd.DataFrame:
+def fuzzy_match_batch_categorizer(
+    tx_descriptions: pd.Series,
+    descriptions: np.ndarray,
+    description_category_pairs: pd.DataFrame,
+    threshold: int = FUZZY_MATCH_THRESHOLD,
+) -> pd.Series:
+    """Categorize a batch of transaction descriptions using fuzzy matching.
+
+    Batch equivalent of 'fuzzy_match_list_categorizer': descriptions are deduplicated,
+    scored against the reference descriptions in chunked similarity matrices (computed
+    on all cores), and the categories are broadcast back to every transaction.
+
+    Args:
+        tx_descriptions (pd.Series): The transaction descriptions to categorize.
+        descriptions (np.ndarray): Known descriptions to compare against.
+        description_category_pairs (pd.DataFrame): DataFrame mapping descriptions to categories.
+        threshold (int): Minimum similarity score to consider a match.
+
+    Returns:
+        pd.Series: Category of the matched description for each transaction (None if no match found).
+    """
+
+    unique_descriptions = tx_descriptions.dropna().unique()
+    if len(unique_descriptions) == 0 or len(descriptions) == 0:
+        return pd.Series(None, index=tx_descriptions.index, dtype=object)
+
+    # On a single core, the pruning done by 'process.extractOne' beats a full matrix pass
+    if FUZZY_MATCH_WORKERS == 1 or (FUZZY_MATCH_WORKERS == -1 and (os.cpu_count() or 1) == 1):
+        matches = {description: fuzzy_match_list_categorizer(description, descriptions, description_category_pairs, threshold)
+                   for description in unique_descriptions}
+        return tx_descriptions.map(matches).astype(object)
+
+    # Size chunks so that each similarity matrix stays under FUZZY_MATCH_MAX_CELLS cells
+    chunk_size = max(1, FUZZY_MATCH_MAX_CELLS // len(descriptions))
+    ref_categories = description_category_pairs['category'].values
+
+    matches = {}
+    for start in range(0, len(unique_descriptions), chunk_size):
+        chunk = unique_descriptions[start:start + chunk_size]
+
+        # Same scorer as 'process.extractOne'; scores below the threshold are set to 0
+        scores = process.cdist(chunk, descriptions, scorer=fuzz.WRatio, score_cutoff=threshold, workers=FUZZY_MATCH_WORKERS)
+
+        # Keep the best match (first one on ties, like 'process.extractOne') of each description
+        best_positions = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(chunk)), best_positions]
+        for description, position, score in zip(chunk, best_positions, best_scores):
+            if score >= threshold:
+                matches[description] = ref_categories[position]
+
+    # Broadcast the categories back to every transaction
+    return tx_descriptions.map(matches).astype(object)
+
+
+def fuzzy_match_pruned_categorizer(
+    tx_descriptions: pd.Series,
+    ngram_index: NgramIndex,
+    descriptions: np.ndarray,
+    description_category_pairs: pd.DataFrame,
+    threshold: int = FUZZY_MATCH_THRESHOLD,
+) -> pd.Series:
+    """Categorize a batch of transaction descriptions using fuzzy matching over indexed candidates.
+
+    Equivalent to 'fuzzy_match_batch_categorizer' for large reference sets, but each description
+    is only scored against the candidates returned by the n-gram index (the reference descriptions
+    sharing the most n-grams with it) instead of against the whole reference.
+
+    Args:
+        tx_descriptions (pd.Series): The transaction descriptions to categorize.
+        ngram_index (NgramIndex): N-gram index built over the reference descriptions.
+        descriptions (np.ndarray): Known descriptions to compare against.
+        description_category_pairs (pd.DataFrame): DataFrame mapping descriptions to categories.
+        threshold (int): Minimum similarity score to consider a match.
+
+    Returns:
+        pd.Series: Category of the matched description for each transaction (None if no match found).
+    """
+
+    ref_categories = description_category_pairs['category'].values
+
+    matches = {}
+    for description in tx_descriptions.dropna().unique():
+        candidates = ngram_index.candidates(description)
+        if len(candidates) == 0:
+            continue
+
+        # Fuzzy-match this description against its candidates only
+        match_results = process.extractOne(description, descriptions[candidates], score_cutoff=threshold)
+        if match_results:
+            matches[description] = ref_categories[candidates[match_results[2]]]
+
+    # Broadcast the categories back to every transaction
+    return tx_descriptions.map(matches).astype(object)
+
+
+async def llm_list_categorizer(tx_list: pd.DataFrame, offline: bool = False) -> pd.DataFrame:
     """Categorize a list of transactions using a language model.
 
     This function uses a Language Model (LLM) to categorize a list of transaction descriptions.
-    It splits the input DataFrame into chunks and processes each chunk asynchronously to improve performance.
+    Descriptions already in the LLM cache are not sent again; the rest are packed into batches
+    sized to a token budget (see 'BatchPacker'), processed asynchronously to improve performance,
+    and cached as each batch completes. Descriptions missing from a batch's output (or returned
+    with an invalid category) are re-queued into later batches, up to LLM_MAX_ATTEMPTS times.
 
     Args:
         tx_list (pd.DataFrame): DataFrame containing the transaction descriptions to categorize.
+        offline (bool): Only return cached categories, without calling the language model.
 
     Returns:
         pd.DataFrame: DataFrame mapping transaction descriptions to their inferred categories.
     """
 
-    # Initialize language model and prompt
-    llm = ChatOpenAI(temperature=0, client=Any)
-    prompt = PromptTemplate.from_template(template=templates.EXPENSE_CAT_TEMPLATE)    
-    chain = LLMChain(llm=llm, prompt=prompt)
+    logger = logging.getLogger(__name__)
+    cache = LLMCache()
+    try:
+        # Reuse the categories of descriptions categorized in previous (or interrupted) runs
+        cached_categories = cache.get_many(tx_list['description'])
+        cached_outputs = [[description, category] for description, category in cached_categories.items()]
+        get_metrics().increment('llm_cache_hits', len(cached_outputs))
+        tx_list = tx_list[~tx_list['description'].isin(cached_categories.keys())]
+        if tx_list.empty or offline:
+            return pd.DataFrame(cached_outputs, columns=['description', 'category'])
+
+        # All language model calls go through the process-wide scheduler (shared client and rate limits)
+        scheduler = get_scheduler()
+        packer = get_batch_packer()
+        pending = deque(tx_list['description'])
+        attempts = {description: 0 for description in pending}
+        valid_outputs = []
 
-    # Iterate over the DataFrame in batches of TX_PER_LLM_RUN transactions
-    tasks = [llm_sublist_categorizer(tx_list.attrs['file_name'], chain=chain, tx_descriptions="\n".join(chunk['description']).strip())
-             for chunk in np.array_split(tx_list, tx_list.shape[0] // TX_PER_LLM_RUN + 1)]
+        async def categorize_batches() -> None:
+            # Take batches from the shared queue until it is empty; batch sizes adapt as results come in
+            while pending:
+                batch = packer.next_batch(pending)
+                for description in batch:
+                    attempts[description] += 1
+
+                try:
+                    result = await llm_sublist_categorizer(tx_list.attrs['file_name'], scheduler=scheduler, tx_descriptions="\n".join(batch).strip())
+                    categorized, missing = reconcile_llm_output(batch, result['output'])
+                except Exception as e:
+                    logger.error(f"| File: {tx_list.attrs['file_name']} | LLM Error: {e}")
+                    get_metrics().increment('llm_failed_batches')
+                    categorized, missing = [], batch
+                packer.record(len(batch), len(categorized))
+
+                # Keep good outputs (even from failed batches) and persist them right away, so they survive a crash later in the run
+                valid_outputs.extend(categorized)
+                cache.put_many(categorized)
+
+                # Re-queue only the missing or invalid descriptions, up to LLM_MAX_ATTEMPTS times each
+                retry_descriptions = [description for description in missing if attempts[description] < LLM_MAX_ATTEMPTS]
+                pending.extend(retry_descriptions)
+                if len(retry_descriptions) < len(missing):
+                    logger.error(f"| File: {tx_list.attrs['file_name']} | Not categorized after {LLM_MAX_ATTEMPTS} attempts: "
+                                 f"{[description for description in missing if description not in retry_descriptions]}")
+
+        await asyncio.gather(*[categorize_batches() for _ in range(LLM_MAX_CONCURRENCY)])
+    finally:
+        cache.close()
+
+    # Return a DataFrame with the cached and valid outputs
+    return pd.DataFrame(cached_outputs + valid_outputs, columns=['description', 'category'])
+
+
+def reconcile_llm_output(
+    descriptions: List[str],
+    output: List[Tuple[str, str]],
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Match the description-category pairs returned by the language model with the descriptions requested.
+
+    Returned descriptions are matched exactly or, failing that, ignoring case and whitespace
+    (the model sometimes alters them); pairs with unknown categories are discarded.
+
+    Args:
+        descriptions (List[str]): Descriptions sent to the language model.
+        output (List[Tuple[str, str]]): Description-category pairs returned by the language model.
+
+    Returns:
+        tuple: Description-category pairs for the requested descriptions, and the requested
+        descriptions missing from the output (or returned with an invalid category).
+    """
 
-    # Gather results and extract (valid) outputs
-    # The results variable is a list of 'results', each 'result' being the output of a single LLM run
-    results = await asyncio.gather(*tasks)
+    exact = set(descriptions)
+    normalized = {normalize_description(description): description for description in descriptions}
+    categorized = {}
+    for description, category in output:
+        if category not in templates.EXPENSE_CATEGORIES:
+            continue
+        requested_description = description if description in exact else normalized.get(normalize_description(description))
+        if requested_description is not None:
+            categorized.setdefault(requested_description, category)
 
-    # Extract valid results (each valid result is a list of description-category pairs)
-    valid_results = [result['output'] for result in results if result['valid']]
+    missing = [description for description in descriptions if description not in categorized]
+    return list(categorized.items()), missing
 
-    # Flatten the list of valid results to obtain a single list of description-category pairs
-    valid_outputs = [output for valid_result in valid_results for output in valid_result]
 
-    # Return a DataFrame with the valid outputs
-    return pd.DataFrame(valid_outputs, columns=['description', 'category'])
+def _count_llm_retry(retry_state) -> None:
+    get_metrics().increment('llm_batch_retries')
 
 
-@retry(wait=wait_random_exponential(min=1, max=20), stop=stop_after_attempt(6))
+# Timed per batch, including retries; rate limit responses the scheduler gave up on are not retried again
+@timed('llm_batch')
+@retry(
+    retry=retry_if_exception(lambda e: not is_rate_limit_error(e)),
+    wait=wait_random_exponential(min=1, max=20),
+    stop=stop_after_attempt(6),
+    before_sleep=_count_llm_retry,
+    reraise=True,
+)
 async def llm_sublist_categorizer(
     file_name: str,
-    chain: LLMChain,
+    scheduler: LLMScheduler,
     tx_descriptions: str,
 ) -> Dict[str, Union[bool, List[Tuple[str, str]]]]:
     """Categorize a batch of transactions using a language model.
 
     This function takes a batch of transaction descriptions and passes them to a language model
-    for categorization. The function retries on failure, with an exponential backoff.
+    for categorization. The function retries other failures (e.g. connection errors) with an exponential
+    backoff; rate limit responses are only retried by the scheduler (see 'LLMScheduler.arun'), and its last
+    one is raised right away, so the batch is re-queued (see 'llm_list_categorizer') instead of retried here.
 
     Args:
         file_name (str): Name of the file the transaction descriptions were extracted from.
-        chain (LLMChain): Language model chain to use for categorization.
+        scheduler (LLMScheduler): Scheduler running the language model chain used for categorization.
         tx_descriptions (str): Concatenated transaction descriptions to categorize.
 
     Returns:
         dict: Dictionary containing a 'valid' flag and a list of categorized descriptions.
     """
 
-    raw_result = await chain.arun(input_data=tx_descriptions)
+    raw_result = await scheduler.arun(input_data=tx_descriptions)
 
     logger = logging.getLogger(__name__)
     result = {'valid': True, 'output': []}
     try:
         # Create a pattern to match a list Description-Category pairs (List[Tuple[str, str]])
-        pattern = r"\['([^']+)', '([^']+)'\]"
+        # Strings may be single or double quoted (e.g. descriptions containing apostrophes)
+        pattern = r"""\[\s*('[^']+'|"[^"]+")\s*,\s*('[^']+'|"[^"]+")\s*\]"""
         
         # Use it to extract all the correctly formatted pairs from the raw result
         matches = re.findall(pattern, raw_result.replace("\\'", "'"))
@@ -125,7 +309,7 @@ async def llm_sublist_categorizer(
         valid_outputs = []
         for match in matches:
             try:
-                parsed_pair = ast.literal_eval(str(list(match)))
+                parsed_pair = ast.literal_eval(f"[{match[0]}, {match[1]}]")
                 valid_outputs.append(parsed_pair)
             except Exception as e:
                 logger.log(logging.ERROR, f"Parsing Error: {e}\nMatch: {match}\n")
@@ -1,49 +1,87 @@
 # Standard library imports
-import os
-from datetime import datetime
+from typing import Optional
 
 # Third-party library imports
 import pandas as pd
 
 # Local application/library specific imports
-from src.config import REF_OUTPUT_FILE
-from src.categorize_tx import llm_list_categorizer, fuzzy_match_list_categorizer
+from src.categorize_tx import llm_list_categorizer
+from src.reference_index import ReferenceIndex
+from src.keyword_rules import get_keyword_rules
+from src.descriptions import canonicalize_descriptions
+from src.metrics import get_metrics
+from src.config import KEYWORD_RULES_ENABLED, LOCAL_MODEL_ENABLED
 
 
-async def categorize_tx_list(tx_list: pd.DataFrame) -> pd.DataFrame:
+async def categorize_tx_list(tx_list: pd.DataFrame, ref_index: Optional[ReferenceIndex] = None, offline: bool = False) -> pd.DataFrame:
     """Asynchronously categorize a list of transactions.
 
-    This function categorizes a list of transactions using a combination of fuzzy matching
-    and a language model. It looks up new transaction descriptions in the reference file
-    (a combination of user input and previous executions) to minimize API calls.
-    Any uncategorized transactions are sent to the language model, and new description-category
-    pairs are added to the reference file.
+    This function categorizes a list of transactions using a combination of reference lookups,
+    keyword rules, a local classifier and a language model. Descriptions are first reduced to canonical
+    keys (see 'DescriptionCanonicalizer'), so variants of the same merchant (store numbers, dates, card
+    numbers...) are looked up, and sent to the language model, only once. It looks up new transaction descriptions
+    in the reference index (a combination of user input, previous executions and files already processed
+    in this run), then matches the rest against the keyword rules (see 'KeywordRules') and the local
+    classifier trained on the reference (see 'LocalClassifier'), to minimize API calls. Any uncategorized
+    transactions are sent to the language model, and new description-category pairs obtained from it are
+    added to the reference index (keyword matches and local predictions are not, so changes to the rules
+    apply to descriptions already seen, and the classifier is not trained on its own predictions).
 
     Args:
         tx_list (pd.DataFrame): The list of transactions to categorize.
+        ref_index (ReferenceIndex, optional): Reference index shared by all files in the run;
+            loaded from the reference file if not provided.
+        offline (bool): Use local tiers only (the reference, keyword rules, the local classifier and the LLM cache);
+            descriptions they can't categorize are set to 'Other' without calling the language model.
 
     Returns:
         pd.DataFrame: The original DataFrame with an additional column for the category.
     """
 
-    if os.path.exists(REF_OUTPUT_FILE):
-        # Read description-category pairs from the reference file
-        description_category_pairs = pd.read_csv(
-            REF_OUTPUT_FILE, header=None, names=['description', 'category']
-        )
+    if ref_index is None:
+        ref_index = ReferenceIndex.load()
 
-        # Extract only descriptions for faster matching
-        descriptions = description_category_pairs['description'].values
+    # Canonical key of each description (the output keeps the original descriptions)
+    metrics = get_metrics()
+    with metrics.timer('canonicalize'):
+        keys = canonicalize_descriptions(tx_list['description'], tx_list.get('source'))
 
-        # Use fuzzy matching to find similar descriptions and assign the category
-        tx_list['category'] = tx_list['description'].apply(
-            fuzzy_match_list_categorizer,
-            args=(descriptions, description_category_pairs),
-        )
+    # Look up descriptions not categorized yet in the reference index (exact, normalized and fuzzy matches)
+    uncategorized = tx_list['category'].isnull()
+    if len(ref_index) and uncategorized.any():
+        tx_list['category'] = tx_list['category'].astype(object)
+        tx_list.loc[uncategorized, 'category'] = ref_index.categorize(keys[uncategorized])
+
+    # Count transactions by how they were categorized (from the reference, by keyword rules, by the local classifier,
+    # by the language model, or 'Other')
+    reference_hits = int(tx_list['category'].notnull().sum())
+    metrics.increment('tx_reference_hits', reference_hits)
 
-    # Filter out uncategorized transactions, deduplicate, and sort by description
+    # Match the remaining descriptions against the keyword rules
+    rule_matches = pd.Series(False, index=tx_list.index)
+    uncategorized = tx_list['category'].isnull()
+    if KEYWORD_RULES_ENABLED and uncategorized.any():
+        with metrics.timer('keyword_rules'):
+            tx_list['category'] = tx_list['category'].astype(object)
+            tx_list.loc[uncategorized, 'category'] = get_keyword_rules().categorize(keys[uncategorized])
+        rule_matches = uncategorized & tx_list['category'].notnull()
+        metrics.increment('tx_rule_hits', int(rule_matches.sum()))
+
+    # Categorize the remaining descriptions with the local classifier (confident predictions only)
+    model_matches = pd.Series(False, index=tx_list.index)
+    uncategorized = tx_list['category'].isnull()
+    if LOCAL_MODEL_ENABLED and uncategorized.any():
+        with metrics.timer('local_model'):
+            tx_list['category'] = tx_list['category'].astype(object)
+            tx_list.loc[uncategorized, 'category'] = ref_index.classify(keys[uncategorized])
+        model_matches = uncategorized & tx_list['category'].notnull()
+        metrics.increment('tx_model_hits', int(model_matches.sum()))
+    local_matches = rule_matches | model_matches
+
+    # Filter out uncategorized transactions, deduplicate, and sort by canonical key
     uncategorized_descriptions = (
         tx_list[tx_list['category'].isnull()]
+        .assign(description=keys)
         .drop_duplicates(subset=['description'])
         .sort_values(by=['description'])
     )
@@ -51,7 +89,7 @@ async def categorize_tx_list(tx_list: pd.DataFrame) -> pd.DataFrame:
     # Ask the language model to categorize the remaining descriptions
     if not uncategorized_descriptions.empty:
         categorized_descriptions = await llm_list_categorizer(
-            uncategorized_descriptions[['description', 'category']]
+            uncategorized_descriptions[['description', 'category']], offline=offline
         )
 
         categorized_descriptions.dropna(inplace=True)
@@ -59,12 +97,21 @@ async def categorize_tx_list(tx_list: pd.DataFrame) -> pd.DataFrame:
         # Update the category for uncategorized transactions based on the language model results
         if not categorized_descriptions.empty:
             tx_list['category'] = tx_list['category'].fillna(
-                tx_list['description'].map(
+                keys.map(
                     categorized_descriptions.set_index('description')['category']
                 )
             )
         
         # Fill remaining NaN values in 'category' with 'Other'
+        unresolved = tx_list['category'].isnull()
+        other = int(unresolved.sum())
+        metrics.increment('tx_llm_categorized', len(tx_list) - reference_hits - int(local_matches.sum()) - other)
+        metrics.increment('tx_other', other)
         tx_list['category'] = tx_list['category'].fillna('Other')
 
+        # Make the new description-category pairs available to the files processed next (offline, descriptions left
+        # as 'Other' are not added, so the language model categorizes them in a later run)
+        new_pairs = ~local_matches & ~unresolved if offline else ~local_matches
+        ref_index.update(pd.DataFrame({'description': keys, 'category': tx_list['category']})[new_pairs])
+
     return tx_list
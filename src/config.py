@@ -1,8 +1,35 @@
 # DATA FOLDERS
 REF_OUTPUT_FILE = 'data/ref_data/ref_master_data.csv'
+REF_LOG_FILE = 'data/ref_data/ref_master_data.log.csv' # New description-category pairs, pending compaction into REF_OUTPUT_FILE
 TX_INPUT_FOLDER = 'data/tx_data/input/'
 TX_OUTPUT_FILE = 'data/tx_data/output/tx_master_data.csv'
+TX_OUTPUT_DATASET = 'data/tx_data/output/tx_master_data/' # Parquet output, partitioned by month (if TX_OUTPUT_FORMAT is 'parquet')
 TX_ARCHIVE_FOLDER = 'data/tx_data/archive/'
+TX_CLAIMS_FOLDER = 'data/tx_data/claimed/' # Input files claimed by each worker of a sharded run (--worker); must be on the same volume as TX_INPUT_FOLDER
+TX_AGGREGATES_FILE = 'data/tx_data/output/tx_aggregates.sqlite' # Totals and counts by month, category, source and type
+INGEST_LEDGER_FILE = 'data/ref_data/ingest_ledger.sqlite' # Fingerprints of the input files and transactions already ingested
+SCHEMA_REGISTRY_FILE = 'data/ref_data/schema_registry.json' # Columns and parsing parameters of each known file layout
+KEYWORD_RULES_FILE = 'data/ref_data/keyword_rules.csv' # Your own keyword rules (keyword, category, priority); override the built-in keywords
+CANONICAL_RULES_FILE = 'data/ref_data/canonical_rules.csv' # Your own description cleanup rules per source file (source, pattern, replacement)
+ACCOUNTS_FILE = 'data/ref_data/accounts.csv' # Account of each input file (source, account), e.g. when file names don't identify it; see 'AccountMap'
+
+# FILE PROCESSING CONFIG
+TX_OUTPUT_FORMAT = 'csv' # Output format: 'csv' (TX_OUTPUT_FILE) or 'parquet' (TX_OUTPUT_DATASET; requires pyarrow)
+TX_PARSER_WORKERS = None # Processes used to read and standardize input files; None uses all available cores
+TX_STREAMING_MIN_FILE_SIZE = 100 * 1024 * 1024 # Files larger than this (in bytes) are read, standardized and categorized in chunks
+TX_CHUNK_SIZE = 100_000 # Rows per chunk when streaming large files
+TX_WATCH_POLL_INTERVAL = 2 # Seconds between scans of TX_INPUT_FOLDER in watch mode (-w)
+TX_WATCH_DEBOUNCE = 5 # Seconds without new or changed files before a batch is processed in watch mode (files must be fully written)
+TX_WATCH_MAX_DELAY = 60 # Max seconds a complete file waits for the input folder to go quiet in watch mode
+TX_WATCH_RETRY_DELAY = 30 # Seconds before the files of a failed batch are retried in watch mode (doubled after each failure)
+TX_WATCH_MAX_RETRY_DELAY = 3600 # Max seconds between retries of the files of a failed batch in watch mode
+TX_WORKER_BATCH_FILES = 4 # Input files a worker of a sharded run (--worker) claims at a time; the rest are left to other workers
+LOCK_TIMEOUT = 600 # Max seconds to wait for a lock on a shared file or database held by another worker
+REF_COMPACTION_MIN_ENTRIES = 5_000 # Reference log entries from which the log is compacted into the reference file
+AMOUNT_SAMPLE_SIZE = 200 # Values sampled to detect the decimal separator of an amount column
+DATE_SAMPLE_SIZE = 200 # Unique dates sampled to detect the format of a date column
+SIGN_CHECK_MIN_SHARE = 0.8 # Share of amounts with the unexpected sign from which a file is rejected for contradicting the sign convention of its layout
+SIGN_CHECK_MIN_AMOUNTS = 10 # Non-zero amounts a file needs for its signs to be checked against the sign convention of its layout
 
 # STRING VARIATIONS
 CR_VARIATIONS = frozenset(['credit', 'cr', 'cr.', 'c'])
@@ -13,9 +40,50 @@ TYPE_VALUE_VARIATIONS = frozenset(['credit', 'cr', 'cr.', 'c', 'debit', 'dr', 'd
 DATE_VARIATIONS = frozenset(['date', 'fecha'])
 DESC_VARIATIONS = frozenset(['desc', 'desc.', 'description', 'descripción', 'concepto'])
 
+# DESCRIPTION CANONICALIZATION CONFIG
+CANONICAL_CACHE_SIZE = 500_000 # Canonical keys of the most recently seen descriptions kept in memory
+
+# KEYWORD RULES CONFIG
+KEYWORD_RULES_ENABLED = True # Categorize descriptions containing a merchant keyword (see keyword_rules.py) without calling the LLM
+KEYWORD_RULES_DEFAULT_PRIORITY = 0 # Priority of the built-in keywords; your rules default to a higher one, and the highest matching rule wins
+
+# LOCAL MODEL CONFIG
+LOCAL_MODEL_ENABLED = True # Categorize descriptions with a local model trained on the reference data before calling the LLM
+LOCAL_MODEL_MIN_REFS = 500 # Reference size from which the local model is used (smaller references are too little training data)
+LOCAL_MODEL_MIN_CONFIDENCE = 0.9 # Minimum confidence (0-1) of a local prediction; check with 'python -m src.local_classifier evaluate'
+LOCAL_MODEL_FEATURES = 2 ** 17 # Hash buckets for the character n-grams of descriptions
+LOCAL_MODEL_NGRAM_SIZES = (3, 4, 5) # Character n-gram sizes used as features
+
+# FUZZY MATCHING CONFIG
+FUZZY_MATCH_THRESHOLD = 75 # Minimum similarity score (0-100) to reuse the category of a reference description
+FUZZY_MATCH_MAX_CELLS = 10_000_000 # Max cells per similarity matrix chunk (descriptions x reference); bounds memory use
+FUZZY_MATCH_WORKERS = -1 # Cores used to compute similarity matrices; -1 uses all available cores
+FUZZY_INDEX_MIN_REFS = 5_000 # Reference size from which fuzzy matching is restricted to n-gram index candidates
+FUZZY_INDEX_NGRAM_SIZE = 3 # Character n-gram size used by the candidate index (trigrams)
+FUZZY_INDEX_MAX_CANDIDATES = 500 # Reference descriptions (sharing the most n-grams) scored per description
+
 # LLM CONFIG
-TX_PER_LLM_RUN = 10 # Tx to process per LLM run; higher values tend to result in output errors
+LLM_MODEL = 'gpt-3.5-turbo'
+TX_PER_LLM_RUN = 10 # Initial tx per LLM run; adapted between the limits below based on output errors
+LLM_MIN_TX_PER_RUN = 5
+LLM_MAX_TX_PER_RUN = 60
+LLM_BATCH_TOKEN_BUDGET = 2_500 # Max estimated tokens per LLM run (prompt, descriptions and expected output)
+LLM_MAX_CONCURRENCY = 8 # Max LLM requests in flight at any time (across all files)
+LLM_REQUESTS_PER_MINUTE = 3_500 # Set to your OpenAI account's rate limits for LLM_MODEL
+LLM_TOKENS_PER_MINUTE = 90_000
+LLM_RATE_LIMIT_RETRIES = 5 # Retries of a request after rate limit (429) responses
+LLM_MAX_ATTEMPTS = 3 # Max batches a description is sent in when missing from (or invalid in) the output
+
+# LLM CACHE CONFIG
+LLM_CACHE_FILE = 'data/ref_data/llm_cache.sqlite' # Survives -n/-d; inspect/prune with 'python -m src.llm_cache'
+LLM_CACHE_TTL_DAYS = 365 # Cached categories older than this are ignored (and evicted when pruning)
+LLM_CACHE_MAX_ENTRIES = 200_000 # Least recently used entries beyond this number are evicted when pruning
 
 # LOG CONFIG
 LOG_FILE = 'logs/app.log'
 LOG_LEVEL = 'ERROR'
+
+# METRICS CONFIG
+METRICS_ENABLED = True # Time pipeline stages and count categorization outcomes and LLM usage (near-zero cost when False)
+METRICS_FILE = 'logs/metrics.json' # Metrics of the last run
+METRICS_PROMETHEUS_FILE = None # Also write them in Prometheus text format to this file (e.g. for node_exporter's textfile collector)
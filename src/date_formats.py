@@ -0,0 +1,138 @@
+# Standard library imports
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from src.config import DATE_SAMPLE_SIZE
+
+# Candidate date formats, tried in order; month-first formats come before their day-first
+# counterparts, but are only chosen over them if the dates are not ambiguous (see 'detect_date_format')
+DATE_FORMATS = [
+    'ISO8601', # e.g. 2023-01-31, 2023-01-31 10:05:00, 2023-01-31T10:05:00
+    '%Y/%m/%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y%m%d',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%m/%d/%y',
+    '%d/%m/%y',
+    '%m/%d/%Y %H:%M',
+    '%d/%m/%Y %H:%M',
+    '%m/%d/%y %H:%M',
+    '%d/%m/%y %H:%M',
+    '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%m-%d-%Y',
+    '%d-%m-%Y',
+    '%m-%d-%y',
+    '%d-%m-%y',
+    '%m.%d.%Y',
+    '%d.%m.%Y',
+    '%d.%m.%y',
+    '%d %b %Y',
+    '%d-%b-%Y',
+    '%d-%b-%y',
+    '%b %d, %Y',
+    '%b %d %Y',
+    '%d %B %Y',
+    '%B %d, %Y',
+]
+
+
+def header_signature(columns: Iterable[str]) -> str:
+    """Return a signature identifying a file layout (e.g. a bank's export) from its normalized header."""
+    header = '|'.join(str(column).lower().strip() for column in columns)
+    return hashlib.sha256(header.encode('utf-8')).hexdigest()[:16]
+
+
+def _parses(dates: pd.Series, date_format: str) -> Optional[pd.Series]:
+    # Return the parsed dates if the format parses all of them, None otherwise
+    parsed = pd.to_datetime(dates, format=date_format, errors='coerce')
+    return None if parsed.isnull().any() else parsed
+
+
+def detect_date_format(dates: pd.Series, sample_size: int = DATE_SAMPLE_SIZE) -> Dict[str, object]:
+    """
+    Detect the format of a date column.
+
+    Candidate formats are tried on a sample of the (unique, non-empty) dates; if several formats parse
+    the sample with different results (e.g. 01/02/2023 as January 2nd or February 1st), all dates are
+    used to disambiguate them.
+
+    Args:
+        dates (pd.Series): Date column, as read from the input file.
+        sample_size (int): Number of unique dates to sample.
+
+    Returns:
+        dict: The detected 'format' and whether it is 'ambiguous' (several formats remain viable and
+        disagree; the first one, month-first, is returned).
+
+    Raises:
+        ValueError: If no single format parses all dates (e.g. mixed formats).
+    """
+
+    unique_dates = pd.Series(dates.dropna().astype(str).str.strip().unique())
+    if unique_dates.empty:
+        return {'format': DATE_FORMATS[0], 'ambiguous': False}
+
+    candidates: List[str] = DATE_FORMATS
+    for values in (unique_dates.head(sample_size), unique_dates):
+        viable = {}
+        for date_format in candidates:
+            parsed = _parses(values, date_format)
+            if parsed is not None:
+                viable[date_format] = parsed
+        if not viable:
+            break
+
+        # Formats that agree with the first viable format are equivalent for this column
+        first_format, first_parsed = next(iter(viable.items()))
+        if all(parsed.equals(first_parsed) for parsed in viable.values()):
+            return {'format': first_format, 'ambiguous': False}
+
+        # The sample is ambiguous; try the viable formats on all dates
+        if len(values) == len(unique_dates):
+            return {'format': first_format, 'ambiguous': True}
+        candidates = list(viable)
+
+    raise ValueError(f"Could not detect a single date format (mixed or unknown formats), e.g.: {unique_dates.head(3).tolist()}")
+
+
+def parse_dates(dates: pd.Series, date_format: Optional[str] = None, file_name: str = '') -> Tuple[pd.Series, Optional[str]]:
+    """
+    Parse a date column with an explicit format: the given one (e.g. remembered for the file layout)
+    if it still parses all dates, otherwise a newly detected one.
+
+    Args:
+        dates (pd.Series): Date column, as read from the input file.
+        date_format (str, optional): Date format to try first.
+        file_name (str): Name of the input file (for reporting).
+
+    Returns:
+        tuple: Parsed dates, and the format used (None if it was ambiguous, so it is not remembered).
+
+    Raises:
+        ValueError: If no single format parses all dates.
+    """
+
+    logger = logging.getLogger(__name__)
+    date_strings = dates.astype(str).str.strip().where(dates.notnull())
+
+    if date_format:
+        parsed = pd.to_datetime(date_strings, format=date_format, errors='coerce')
+        if not (parsed.isnull() & date_strings.notnull()).any():
+            return parsed, date_format
+
+    detected = detect_date_format(date_strings)
+    if detected['ambiguous']:
+        # Not remembered: a later export from the same source may disambiguate it
+        message = f"Ambiguous date format (day-first or month-first) in file {file_name}; assumed {detected['format']}"
+        logger.warning(message)
+        print(f'WARNING: {message}')
+        return pd.to_datetime(date_strings, format=detected['format']), None
+
+    return pd.to_datetime(date_strings, format=detected['format']), detected['format']
@@ -0,0 +1,167 @@
+# Standard library imports
+import os
+import re
+import logging
+from fnmatch import fnmatch
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from src.config import CANONICAL_RULES_FILE, CANONICAL_CACHE_SIZE
+
+US_STATES = (
+    'AL AK AZ AR CA CO CT DE DC FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY NC ND OH OK '
+    'OR PA RI SC SD TN TX UT VT VA WA WV WI WY'
+).split()
+
+STATE_CODES = '|'.join(US_STATES)
+
+# Noise that changes from one transaction to the next (applied in order, ignoring case)
+CANONICAL_RULES: List[Tuple[Pattern, str]] = [(re.compile(pattern, flags=re.IGNORECASE), replacement) for pattern, replacement in [
+    # Trailing state codes, only where they clearly follow a city (so 'PAGO EN TIENDA LA' or 'CHECK IN' keep their last
+    # word): after the city of a store number ('0423 NEW YORK NY'), or after the city column of a fixed-width card
+    # descriptor ('STARBUCKS      SEATTLE      WA'), matched first, on the original description (canonical keys have
+    # no store numbers or runs of spaces left, so the codes of keys are not stripped again); or after a comma (see below)
+    (rf"(\d{{3,}}(?:\s+[A-Z][A-Z.'&-]*){{1,3}})\s+(?:{STATE_CODES})\s*$", r'\1'),
+    (rf"(\S\s{{2,}}(?:\S+\s){{0,2}}\S+)\s+(?:{STATE_CODES})\s*$", r'\1'),
+    # Payment processor and card purchase prefixes (e.g. 'SQ *', 'TST* ', 'POS ', 'CHECKCARD ')
+    (r'^\s*(?:SQ|TST|SP|PP|PAYPAL|PY|IC|DD)\s?\*\s*', ''),
+    (r'^\s*(?:POS(?: PURCHASE)?|CHECKCARD|CHKCARD|(?:DEBIT |VISA )?CARD PURCHASE|PURCHASE AUTHORIZED ON)\b\s*', ''),
+    # Card numbers (e.g. 'CARD 1234', 'XXXX1234', '****1234')
+    (r'\b(?:CARD|ACCT|ACCOUNT)\s*(?:ENDING\s*(?:IN)?\s*)?[X*]*\d{4}\b', ' '),
+    (r'(?:\bX{2,}|\*{2,})\d{2,4}\b', ' '),
+    # Authorization and reference codes (e.g. 'AUTH #123456', 'REF: A1B2C3')
+    (r'\b(?:AUTH(?:ORIZATION)?|REF(?:ERENCE)?|CONF(?:IRMATION)?|TRACE|TXN|TRANS(?:ACTION)?|ID)\b\s*(?:#|NO\.?|NUM(?:BER)?|:)?\s*[A-Z0-9-]*\d[A-Z0-9-]*', ' '),
+    # Dates (e.g. '04/23', '2023-04-23', '23.04.2023')
+    (r'\b\d{4}-\d{2}-\d{2}\b', ' '),
+    (r'\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b', ' '),
+    # Store numbers, phone numbers and other codes (words with 3 or more digits, e.g. '#0423', 'P123', '866-579')
+    (r'#?\b(?:[A-Z]*\d){3,}[A-Z0-9]*\b', ' '),
+    # Punctuation left over, and trailing state codes after a comma (e.g. 'NEW YORK, NY'; all of them at once, so that
+    # keys are not stripped again)
+    (r'(?<![A-Z0-9])[*#:/.\-]+|[*#:/\-]+(?![A-Z0-9])', ' '),
+    (rf"(\S)(?:\s*,\s*(?:{STATE_CODES})\b)+\s*$", r'\1'),
+]]
+
+
+def normalize_description(description: str) -> str:
+    """Normalize a transaction description for hash lookups (case and whitespace insensitive)."""
+    return ' '.join(description.lower().split())
+
+
+class DescriptionCanonicalizer:
+    """Reduces transaction descriptions to canonical keys, removing the noise that changes on every transaction
+    (processor prefixes, card numbers, authorization codes, dates, store numbers and state codes), so that e.g.
+    'SQ *BLUE BOTTLE 0423 NEW YORK NY' and 'BLUE BOTTLE 1187 NEW YORK NY' share the key 'BLUE BOTTLE NEW YORK'.
+
+    Rules for specific sources (input files) run before the general ones (see 'load'). Keys are computed once per
+    unique description and kept in an LRU cache, so recurring descriptions are not processed again.
+    """
+
+    def __init__(self, source_rules: Optional[pd.DataFrame] = None, cache_size: int = CANONICAL_CACHE_SIZE) -> None:
+        self.source_rules: List[Tuple[str, Pattern, str]] = []
+        if source_rules is not None:
+            for source, pattern, replacement in source_rules[['source', 'pattern', 'replacement']].itertuples(index=False):
+                try:
+                    self.source_rules.append((source, re.compile(pattern, flags=re.IGNORECASE), replacement if isinstance(replacement, str) else ''))
+                except re.error as e:
+                    logging.log(logging.ERROR, f"| Canonical rules | Invalid pattern ignored: {pattern} ({e})")
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[Tuple[int, ...], str], str]' = OrderedDict()
+        self._source_rule_ids: Dict[str, Tuple[int, ...]] = {}
+
+    @classmethod
+    def load(cls, file_path: str = CANONICAL_RULES_FILE) -> 'DescriptionCanonicalizer':
+        """
+        Build the canonicalizer with your own rules for specific sources, if any.
+
+        Your rules are a CSV file with 'source' (a pattern of input file names, e.g. 'chase*.csv'), 'pattern' (a regular
+        expression, ignoring case) and 'replacement' columns.
+
+        Args:
+            file_path (str): Path to your rules.
+
+        Returns:
+            DescriptionCanonicalizer: The canonicalizer.
+        """
+
+        if not os.path.exists(file_path):
+            return cls()
+        return cls(pd.read_csv(file_path, dtype=str, keep_default_na=False))
+
+    def _rule_ids(self, source: Optional[str]) -> Tuple[int, ...]:
+        # Positions of the source rules that apply to a source
+        if source not in self._source_rule_ids:
+            self._source_rule_ids[source] = tuple(
+                position for position, (pattern, _, _) in enumerate(self.source_rules) if source is not None and fnmatch(source, pattern)
+            )
+        return self._source_rule_ids[source]
+
+    def _apply_rules(self, descriptions: pd.Series, rule_ids: Tuple[int, ...]) -> pd.Series:
+        keys = descriptions
+        rules = [self.source_rules[position][1:] for position in rule_ids] + CANONICAL_RULES
+        for pattern, replacement in rules:
+            keys = keys.str.replace(pattern, replacement, regex=True)
+        keys = keys.str.split().str.join(' ')
+        # Descriptions made only of noise (e.g. a bare reference number) keep their text
+        return keys.where(keys.str.len() > 0, descriptions.str.split().str.join(' '))
+
+    def canonicalize(self, descriptions: pd.Series, sources: Optional[pd.Series] = None) -> pd.Series:
+        """
+        Return the canonical key of each description.
+
+        Args:
+            descriptions (pd.Series): Transaction descriptions.
+            sources (pd.Series, optional): Source (input file name) of each description, for source rules.
+
+        Returns:
+            pd.Series: Canonical key of each description (same index; missing descriptions stay missing).
+        """
+
+        sources = pd.Series(None, index=descriptions.index, dtype=object) if sources is None else sources.astype(object)
+        rule_ids = sources.map({source: self._rule_ids(source) for source in pd.unique(sources)})
+        pairs = pd.DataFrame({'rule_ids': rule_ids.values, 'description': descriptions.values}).dropna(subset=['description'])
+        unique_pairs = set(zip(pairs['rule_ids'], pairs['description']))
+
+        # Look up cached keys, and compute the missing ones with each set of rules
+        keys = {}
+        missing: Dict[Tuple[int, ...], List[str]] = {}
+        for pair in unique_pairs:
+            if pair in self._cache:
+                self._cache.move_to_end(pair)
+                keys[pair] = self._cache[pair]
+            else:
+                missing.setdefault(pair[0], []).append(pair[1])
+        for ids, missing_descriptions in missing.items():
+            computed = self._apply_rules(pd.Series(missing_descriptions, dtype=object), ids)
+            for description, key in zip(missing_descriptions, computed):
+                keys[(ids, description)] = key
+                self._cache[(ids, description)] = key
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return pd.Series(
+            [keys.get((ids, description)) if isinstance(description, str) else description
+             for ids, description in zip(rule_ids, descriptions)],
+            index=descriptions.index,
+            dtype=object,
+        )
+
+
+_canonicalizer: Optional[DescriptionCanonicalizer] = None
+
+
+def get_canonicalizer() -> DescriptionCanonicalizer:
+    """Return the process-wide canonicalizer (loaded on first use)."""
+    global _canonicalizer
+    if _canonicalizer is None:
+        _canonicalizer = DescriptionCanonicalizer.load()
+    return _canonicalizer
+
+
+def canonicalize_descriptions(descriptions: pd.Series, sources: Optional[pd.Series] = None) -> pd.Series:
+    """Return the canonical key of each description (see 'DescriptionCanonicalizer.canonicalize')."""
+    return get_canonicalizer().canonicalize(descriptions, sources)
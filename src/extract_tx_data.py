@@ -1,14 +1,11 @@
 # Standard library imports
 import logging
-from typing import List
 
 # Third-party library imports
 import pandas as pd
-import pandas.api.types as pdt
 
 # Local application/library specific imports
 from src.config import (
-    TX_OUTPUT_FILE, 
     AMOUNT_VARIATIONS,
     TYPE_NAME_VARIATIONS,
     TYPE_VALUE_VARIATIONS,
@@ -19,7 +16,7 @@ from src.config import (
 )
 
 
-def extract_tx_data(tx_list: pd.DataFrame) -> tuple:
+def detect_tx_columns(tx_list: pd.DataFrame) -> tuple:
     """
     Analyzes the transaction DataFrame and determines the format and column positions.
 
@@ -27,7 +24,7 @@ def extract_tx_data(tx_list: pd.DataFrame) -> tuple:
         tx_list (pd.DataFrame): The transaction DataFrame to analyze.
 
     Returns:
-        tuple: A tuple containing the format string and the column positions dictionary.
+        tuple: A tuple containing the column positions dictionary (standard name -> column name) and the format string.
 
     Raises:
         ValueError: If the DataFrame does not match any known format.
@@ -63,14 +60,10 @@ def extract_tx_data(tx_list: pd.DataFrame) -> tuple:
     # Try to determine format based on type and amount columns
     if amount_col and type_col:
         # Credits/debits determined by 'type' column; all amounts are positive
-        tx_list = tx_list.loc[:, [date_col, type_col, desc_col, amount_col]]
-        tx_list.columns = ['date', 'type','description', 'amount']
-        return tx_list, 'TYPE_AMOUNTS'
+        return {'date': date_col, 'type': type_col, 'description': desc_col, 'amount': amount_col}, 'TYPE_AMOUNTS'
     elif amount_col:
         # Credits/debits determined by sign of 'amount' column
-        tx_list = tx_list.loc[:, [date_col, desc_col, amount_col]]
-        tx_list.columns = ['date', 'description', 'amount']
-        return tx_list, 'ONLY_AMOUNTS'
+        return {'date': date_col, 'description': desc_col, 'amount': amount_col}, 'ONLY_AMOUNTS'
 
     # No amount found; look for credit/debit columns
     cr_pos = next((col for col in tx_list.columns if col.lower() in CR_VARIATIONS), None)
@@ -78,9 +71,42 @@ def extract_tx_data(tx_list: pd.DataFrame) -> tuple:
 
     if cr_pos and db_pos:
         # Credits/debits in separate columns; all amounts are positive
-        tx_list = tx_list.loc[:, [date_col, desc_col, cr_pos, db_pos]]
-        tx_list.columns = ['date', 'description', 'credit', 'debit']
-        return tx_list, 'CR_DB_AMOUNTS'
+        return {'date': date_col, 'description': desc_col, 'credit': cr_pos, 'debit': db_pos}, 'CR_DB_AMOUNTS'
     else:
         logging.log(logging.ERROR, f"| File: {tx_list.attrs['file_name']} | Input file does not match any known format")
-        raise ValueError("Input file does not match any known format")
\ No newline at end of file
+        raise ValueError("Input file does not match any known format")
+
+
+def select_tx_columns(tx_list: pd.DataFrame, tx_columns: dict) -> pd.DataFrame:
+    """
+    Select the transaction columns and rename them to their standard names.
+
+    Args:
+        tx_list (pd.DataFrame): The transaction DataFrame.
+        tx_columns (dict): Column positions dictionary (standard name -> column name), see 'detect_tx_columns'.
+
+    Returns:
+        pd.DataFrame: DataFrame with the selected columns, using standard names.
+    """
+
+    tx_list = tx_list.loc[:, list(tx_columns.values())]
+    tx_list.columns = list(tx_columns.keys())
+    return tx_list
+
+
+def extract_tx_data(tx_list: pd.DataFrame) -> tuple:
+    """
+    Analyzes the transaction DataFrame, determines the format and extracts the relevant columns.
+
+    Args:
+        tx_list (pd.DataFrame): The transaction DataFrame to analyze.
+
+    Returns:
+        tuple: A tuple containing the DataFrame with the relevant columns (using standard names) and the format string.
+
+    Raises:
+        ValueError: If the DataFrame does not match any known format.
+    """
+
+    tx_columns, data_format = detect_tx_columns(tx_list)
+    return select_tx_columns(tx_list, tx_columns), data_format
@@ -0,0 +1,54 @@
+# Standard library imports
+import os
+import time
+from typing import IO, Optional
+
+# fcntl is only available on POSIX systems; elsewhere locks are no-ops (run a single worker at a time)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Local application/library specific imports
+from src.config import LOCK_TIMEOUT
+
+POLL_INTERVAL = 0.05
+
+
+class FileLock:
+    """Inter-process lock on a shared file, used as a context manager (e.g. 'with FileLock(TX_OUTPUT_FILE): ...').
+
+    The lock is a POSIX record lock (fcntl) on a '<file>.lock' companion file, so it also works between
+    machines sharing a volume that supports them (e.g. NFS), and it is released by the operating system if
+    the process holding it dies. Shared locks can be held by several readers at once; an exclusive lock waits
+    for all of them. Locks are not reentrant: closing any lock on a file releases all locks of the process on it.
+    """
+
+    def __init__(self, file_path: str, shared: bool = False, timeout: float = LOCK_TIMEOUT) -> None:
+        self.lock_path = f'{file_path}.lock'
+        self.shared = shared
+        self.timeout = timeout
+        self._file: Optional[IO] = None
+
+    def __enter__(self) -> 'FileLock':
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        self._file = open(self.lock_path, 'a+')
+        if fcntl is None:
+            return self
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.lockf(self._file.fileno(), (fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self._file.close()
+                    raise TimeoutError(f'Timed out after {self.timeout}s waiting for the lock on {self.lock_path}')
+                time.sleep(POLL_INTERVAL)
+
+    def __exit__(self, *exc_info) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -2,35 +2,74 @@
 import os
 import glob
 import shutil
+import asyncio
 import logging
-import warnings
+from functools import partial
+from concurrent.futures import Executor
 from typing import Optional, Union, Dict, List
-from datetime import datetime
 
 # Third-party library imports
 import pandas as pd
-from dateparser import parse
+import pandas.api.types as pdt
 
 # Local application/library specific imports
-from src.extract_tx_data import extract_tx_data
+from src.extract_tx_data import detect_tx_columns, select_tx_columns
+from src.date_formats import header_signature, detect_date_format, parse_dates
+from src.schema_registry import SchemaRegistry
+from src.normalize_tx import (
+    detect_decimal_separator,
+    parse_amounts,
+    standardize_types,
+    sign_amounts_by_type,
+    contradicts_sign_convention,
+    standardize_amount_signs,
+    types_from_amounts,
+)
 from src.categorize_tx_list import categorize_tx_list
+from src.reference_index import ReferenceIndex
+from src.reference_store import ReferenceStore
+from src.descriptions import canonicalize_descriptions
+from src.ingest_ledger import IngestLedger, file_fingerprint, row_fingerprints, get_account_map
+from src.tx_dataset import write_tx_dataset, write_tx_dataset_from_csv
+from src.aggregates import TxAggregates
+from src.metrics import get_metrics, timed
+from src.file_lock import FileLock
 from src.config import (
-    REF_OUTPUT_FILE, 
     TX_OUTPUT_FILE, 
+    TX_OUTPUT_DATASET,
+    TX_OUTPUT_FORMAT,
     TX_INPUT_FOLDER,
     TX_ARCHIVE_FOLDER,
-    CR_VARIATIONS,
-    DB_VARIATIONS)
-
-
-#TODO: Clean all TODOs in this file
-# Read file and process it (e.g. categorize transactions)
-async def process_file(file_path: str) -> Dict[str, Union[str, pd.DataFrame]]:
+    TX_STREAMING_MIN_FILE_SIZE,
+    TX_CHUNK_SIZE,
+    AMOUNT_SAMPLE_SIZE,
+    SCHEMA_REGISTRY_FILE)
+
+
+# Read file and process it (e.g. standardize transactions)
+async def process_file(
+    file_path: str,
+    executor: Optional[Executor] = None,
+    ref_index: Optional[ReferenceIndex] = None,
+    ledger: Optional[IngestLedger] = None,
+    offline: bool = False,
+) -> Dict[str, Union[str, pd.DataFrame]]:
     """
-    Process the input file by reading, cleaning, standardizing, and categorizing the transactions.
+    Process the input file by reading, cleaning, and standardizing the transactions.
+    Standardization is CPU-bound, so it runs in the executor (typically a process pool) when one is
+    provided, keeping the event loop free. If a reference index is provided, transactions found in
+    it by exact or normalized value are categorized right away (overlapping with other files still being
+    standardized); all other transactions (including fuzzy matches) are categorized afterwards, for all
+    files at once (see 'categorize_results').
+    If an ingest ledger is provided, files already ingested are skipped, and only transactions not
+    ingested before (e.g. from overlapping exports) are kept.
 
     Args:
         file_path (str): Path to the input file.
+        executor (Executor, optional): Executor to run the standardization in; runs inline if not provided.
+        ref_index (ReferenceIndex, optional): Reference index shared by all files in the run.
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested.
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
 
     Returns:
         Dict[str, Union[str, pd.DataFrame]]: Dictionary containing the file name, processed output, and error information if any
@@ -40,11 +79,44 @@ async def process_file(file_path: str) -> Dict[str, Union[str, pd.DataFrame]]:
     file_name = os.path.basename(file_path)
     result= {'file_name': file_name, 'output': pd.DataFrame(), 'error': ''}
     try:
-        # Read file into standardized tx format: source, date, type, category, description, amount 
-        tx_list = standardize_tx_format(file_path)
+        # Skip files already ingested from the same account (by content, so copies are skipped too)
+        if ledger is not None:
+            source, file_hash = await asyncio.get_running_loop().run_in_executor(None, identify_file, file_path)
+            if not ledger.stage_file(file_hash, file_name):
+                print(f'File already ingested, skipped: {file_name}')
+                result['skipped'] = True
+                return result
+            result['file_hash'] = file_hash
+
+        # Large files are read, standardized and categorized in chunks (and written to an interim output file)
+        if os.path.getsize(file_path) > TX_STREAMING_MIN_FILE_SIZE:
+            result['output_file'], result['ref_data'], duplicates = await stream_file(
+                file_path, ref_index, ledger, result.get('file_hash'), offline=offline, executor=executor
+            )
+            result['duplicates'] = report_duplicates(file_name, duplicates)
+            print(f'File processed sucessfully: {file_name}')
+            return result
 
-        # Categorize transactions
-        result['output'] = await categorize_tx_list(tx_list)
+        # Read file into standardized tx format: source, date, type, category, description, amount 
+        # (timed per file, including any wait for a free worker)
+        with get_metrics().timer('standardize'):
+            if executor is None:
+                tx_list = standardize_tx_format(file_path)
+            else:
+                tx_list = await asyncio.get_running_loop().run_in_executor(executor, standardize_tx_format, file_path)
+
+        # Keep only transactions not ingested before from the same account
+        if ledger is not None:
+            new_rows = ledger.stage_rows(result['file_hash'], row_fingerprints(tx_list, source))
+            result['duplicates'] = report_duplicates(file_name, int((~new_rows).sum()))
+            tx_list = tx_list[new_rows]
+
+        # Categorize transactions found in the reference index by exact or normalized value (the rest are fuzzy-matched
+        # once for all files, see 'categorize_results')
+        if ref_index is not None and len(ref_index):
+            tx_list['category'] = ref_index.categorize(canonicalize_descriptions(tx_list['description'], tx_list['source']), fuzzy=False)
+
+        result['output'] = tx_list
         print(f'File processed sucessfully: {file_name}')
 
     except Exception as e:
@@ -56,11 +128,137 @@ async def process_file(file_path: str) -> Dict[str, Union[str, pd.DataFrame]]:
     return result
 
 
+def identify_file(file_path: str) -> tuple:
+    """
+    Identify the input file for the ingest ledger (reads its header and hashes its whole content).
+
+    Args:
+        file_path (str): Path to the input file.
+
+    Returns:
+        tuple: Source of the transactions of the file (see 'tx_source'), and hash of its content (see 'file_fingerprint').
+    """
+
+    source = tx_source(file_path, header_signature(pd.read_csv(file_path, index_col=False, nrows=0).columns))
+    return source, file_fingerprint(file_path, source)
+
+
+def tx_source(file_path: str, signature: str) -> str:
+    """
+    Identify the source of the transactions of an input file for the ingest ledger: its account (see 'AccountMap')
+    and its layout, so that identical transactions from different accounts (or banks) are never mistaken for one another.
+
+    Args:
+        file_path (str): Path to the input file.
+        signature (str): Signature of the layout of the file (see 'header_signature').
+
+    Returns:
+        str: Source identifier (see 'row_fingerprints').
+    """
+    return f'{signature}/{get_account_map().account(os.path.basename(file_path))}'
+
+
+def report_duplicates(file_name: str, duplicates: int) -> int:
+    """Tell the user how many transactions of a file were skipped as already ingested (and return that number)."""
+    if duplicates:
+        print(f'{duplicates} transactions already ingested, skipped: {file_name}')
+        get_metrics().increment('tx_duplicates', duplicates)
+        logging.log(logging.INFO, f"| File: {file_name} | Transactions already ingested, skipped: {duplicates}")
+    return duplicates
+
+
+async def categorize_results(results: List, ref_index: Optional[ReferenceIndex] = None, offline: bool = False) -> None:
+    """
+    Categorize the transactions of all successfully processed files in a single run-level stage.
+
+    Transactions from all files are categorized together, so each unique description is looked up
+    (and, if needed, sent to the language model) only once, no matter how many files it appears in.
+    Categories are then fanned back out to each file's output; if categorization fails, the error
+    is recorded in each affected result.
+
+    Args:
+        results (List): Results returned by 'process_file'; updated in place.
+        ref_index (ReferenceIndex, optional): Reference index shared by all files in the run.
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
+
+    Returns:
+        None
+    """
+
+    # Streamed files are categorized as they are read
+    ok_results = [result for result in results if not result['error'] and not result.get('skipped') and 'output_file' not in result]
+    if not ok_results:
+        return
+
+    # Combine all transactions, keeping the position of their file as the first index level
+    tx_list = pd.concat([result['output'] for result in ok_results], keys=range(len(ok_results)))
+    tx_list.attrs['file_name'] = ', '.join(result['file_name'] for result in ok_results)
+
+    try:
+        tx_list = await categorize_tx_list(tx_list, ref_index, offline)
+    except Exception as e:
+        for result in ok_results:
+            logging.log(logging.ERROR, f"| File: {result['file_name']} | Categorization Error: {e}")
+            print(f"ERROR categorizing file {result['file_name']}: {e}")
+            result['error'] = str(e)
+        return
+
+    # Fan categorized transactions back out to their files
+    for position, result in enumerate(ok_results):
+        # Files without (new) transactions have nothing to fan back out
+        if not result['output'].empty:
+            result['output'] = tx_list.xs(position)
+
+
+def load_tx_schema(file_path: str) -> tuple:
+    """
+    Look up the layout of the input file (identified by its header) in the schema registry.
+
+    Args:
+        file_path (str): Path to the input file.
+
+    Returns:
+        tuple: The file header, its signature, the schema registry, and the schema of the layout (None if unknown).
+    """
+
+    header = pd.read_csv(file_path, index_col=False, nrows=0).columns
+    signature = header_signature(header)
+    registry = SchemaRegistry()
+    return header, signature, registry, registry.get(signature)
+
+
+def read_tx_columns(file_path: str, header: pd.Index, columns: Dict[str, str], **kwargs) -> pd.DataFrame:
+    """
+    Read only the transaction columns of the input file (dates and types as text; amounts keep their inferred dtype).
+
+    Args:
+        file_path (str): Path to the input file.
+        header (pd.Index): Header of the input file.
+        columns (Dict[str, str]): Column positions dictionary (standard name -> column name), see 'detect_tx_columns'.
+        **kwargs: Additional arguments for 'pd.read_csv' (e.g. 'chunksize').
+
+    Returns:
+        pd.DataFrame: Transaction columns, with lowercase names (or a reader of chunks, if 'chunksize' is given).
+    """
+
+    text_columns = {columns[name] for name in ('date', 'type') if name in columns}
+    return pd.read_csv(
+        file_path,
+        index_col=False,
+        usecols=lambda col: col.lower().strip() in columns.values(),
+        dtype={col: str for col in header if col.lower().strip() in text_columns},
+        **kwargs,
+    )
+
 
 def standardize_tx_format(file_path: str) -> pd.DataFrame:
     """
     Read and prepare the data from the input file.
 
+    The layout of the file (identified by its header) is looked up in the schema registry: known layouts
+    skip column and format detection, and only the needed columns are read. New layouts are detected and
+    added to the registry.
+
     Args:
         file_path (str): Path to the input file.
 
@@ -68,17 +266,53 @@ def standardize_tx_format(file_path: str) -> pd.DataFrame:
         pd.DataFrame: Prepared transaction data.
     """
 
-    tx_list = pd.read_csv(file_path, index_col=False)    
-    tx_list.attrs['file_name'] = file_path
-    tx_list.columns = tx_list.columns.str.lower().str.strip()
+    header, signature, registry, schema = load_tx_schema(file_path)
+
+    if schema:
+        tx_list = read_tx_columns(file_path, header, schema['columns'])
+        tx_list.columns = tx_list.columns.str.lower().str.strip()
+    else:
+        tx_list = pd.read_csv(file_path, index_col=False)
+        tx_list.attrs['file_name'] = file_path
+        tx_list.columns = tx_list.columns.str.lower().str.strip()
+        # Determine data format and column positions
+        # See 'detect_tx_columns' function for more details on data formats
+        columns, data_format = detect_tx_columns(tx_list)
+        schema = {'columns': columns, 'data_format': data_format}
+
+    # Extract relevant columns (renamed to their standard names) and standardize them
+    tx_list = select_tx_columns(tx_list, schema['columns'])
+    tx_list, parameters = standardize_tx_data(tx_list, schema, os.path.basename(file_path))
+
+    # Remember the layout (or update its parsing parameters)
+    if {**schema, **parameters} != schema:
+        registry.save(signature, {**schema, **parameters})
+
+    return tx_list
 
-    # Extract relevant columns and determine data format
-    # See 'extract_tx_data' function for more details on data formats
-    tx_list, data_format = extract_tx_data(tx_list)
 
-    # Standardize dates to YYYY/MM/DD format (ignoring non-actionable warnings)
-    warnings.filterwarnings('ignore', 'Parsing dates', category=UserWarning)
-    tx_list['date'] = pd.to_datetime(tx_list['date']).dt.strftime('%Y/%m/%d')
+def standardize_tx_data(tx_list: pd.DataFrame, schema: Dict, file_name: str, check_signs: bool = True) -> tuple:
+    """
+    Standardize transaction data (with standard column names) to the output tx format.
+
+    Parsing parameters (date format, decimal separator and sign convention) are taken from the schema of the
+    layout when known, and detected otherwise.
+
+    Args:
+        tx_list (pd.DataFrame): Transaction columns, renamed to their standard names (see 'select_tx_columns').
+        schema (Dict): Schema of the layout (see 'SchemaRegistry').
+        file_name (str): Name of the input file.
+        check_signs (bool): Check the amount signs against the sign convention of the layout (see 'check_sign_convention').
+
+    Returns:
+        tuple: Prepared transaction data, and the parsing parameters used (to be remembered for the layout).
+    """
+
+    data_format = schema['data_format']
+
+    # Standardize dates to YYYY/MM/DD format (parsed with the format known for this layout, or detected)
+    parsed_dates, date_format = parse_dates(tx_list['date'], schema.get('date_format'), file_name)
+    tx_list['date'] = parsed_dates.dt.strftime('%Y/%m/%d')
     
     # Check if credits and debits are in separate columns
     if (data_format == "CR_DB_AMOUNTS"):
@@ -86,47 +320,298 @@ def standardize_tx_format(file_path: str) -> pd.DataFrame:
         tx_list = tx_list.melt(id_vars=['date', 'description'], value_vars=['credit', 'debit'], var_name='type', value_name='amount')
         # Drop empty amounts and update structure to "TYPE_AMOUNTS"
         tx_list = tx_list.dropna(subset=['amount'])
-        data_format = "TYPE_AMOUNTS"
-
-    # Convert amounts to floats    
-    tx_list.loc[:,'amount'] = tx_list.loc[:,'amount'].apply(
-        lambda x: float(x.replace('.', '').replace(',', '.')) # European format (e.g. 1.234,56)
-            if isinstance(x, str) and ',' in x and (('.' not in x) or (x.rfind('.') < x.rfind(','))) # European format (e.g. 1.234,56)
-            else float(x.replace(',', '')) if isinstance(x, str) # US format (e.g. 1,234.56)
-            else x
-        )
+
+    # Convert amounts to floats (US and European formats are supported)
+    decimal_separator = schema.get('decimal_separator') or detect_decimal_separator(tx_list['amount'])
+    tx_list['amount'] = parse_amounts(tx_list['amount'], decimal_separator)
 
     # Standardize types values and amount signs based on data format
-    if (data_format == "TYPE_AMOUNTS"):
+    parameters = {'date_format': date_format, 'decimal_separator': decimal_separator}
+    if (data_format != "ONLY_AMOUNTS"):
         # Standardize type to 'C' and 'D' (i.e. credits and debits)
-        tx_list.loc[:,'type'] = tx_list.loc[:,'type'].apply(lambda x: 'C' if x.lower() in CR_VARIATIONS else 'D' if x.lower() in DB_VARIATIONS else None)
+        tx_list['type'] = standardize_types(tx_list['type'])
         # Make amount signs consistent with type (i.e. credits are positive, debits are negative)
-        tx_list.loc[:, 'amount'] = tx_list.apply(lambda x: abs(x['amount']) if x['type'] == 'C' else -abs(x['amount']), axis=1)
+        tx_list['amount'] = sign_amounts_by_type(tx_list['amount'], tx_list['type'])
     else: 
         # Data format is ONLY_AMOUNTS (i.e. no type or Cr/Db columns; type is determined by amount sign)
-        # Standardize amounts (assuming more debits than debits, so if more positive than negatives, invert all amounts)
-        count_pos = len(tx_list[tx_list['amount'] > 0])
-        count_neg = len(tx_list[tx_list['amount'] < 0])
-        if count_pos > count_neg:
-            tx_list.loc[:, 'amount'] = -tx_list.loc[:, 'amount']
+        # Standardize amounts with the sign convention of this account (guessed from its first file: assuming more
+        # debits than credits, so if more positive than negatives, invert all amounts)
+        sign_convention, sign_conventions = resolve_sign_convention(
+            int((tx_list['amount'] > 0).sum()), int((tx_list['amount'] < 0).sum()), schema, file_name, check_signs
+        )
+        tx_list['amount'] = standardize_amount_signs(tx_list['amount'], sign_convention)
 
         # Standardize type based on amounts (i.e. positive amounts are credits, negative amounts are debits)
-        tx_list.loc[:, 'type'] = tx_list.apply(lambda x: 'C' if x['amount'] >= 0 else 'D', axis=1)
+        tx_list['type'] = types_from_amounts(tx_list['amount'])
+        parameters['sign_conventions'] = sign_conventions
 
     # Add source and reindex to desired tx format; category column is new and therefore empty
-    tx_list.loc[:, 'source'] = os.path.basename(file_path)
+    tx_list.loc[:, 'source'] = file_name
     tx_list = tx_list.reindex(columns=['source', 'date', 'type', 'category', 'description', 'amount'])
 
+    # Use compact dtypes for low-cardinality columns (cheaper to send back from worker processes)
+    tx_list = tx_list.astype({'source': 'category', 'type': 'category'})
+
+    return tx_list, parameters
+
+
+def resolve_sign_convention(positives: int, negatives: int, schema: Dict, file_name: str, check_signs: bool = True) -> tuple:
+    """
+    Resolve the sign convention of a file without a type column.
+
+    Sign conventions are remembered per account (see 'AccountMap'), as accounts exported with the same columns
+    (e.g. a checking account and a credit card at the same bank) can sign their amounts the opposite way. The
+    convention of a new account is guessed from its file (see 'amount_sign_convention'); a later file of the
+    account whose signs clearly contradict it is rejected instead of having all its amounts inverted.
+
+    Args:
+        positives (int): Number of positive amounts in the file.
+        negatives (int): Number of negative amounts in the file.
+        schema (Dict): Schema of the layout (see 'SchemaRegistry'); its 'sign_check' can be set to false to
+            guess the convention from each file instead.
+        file_name (str): Name of the input file.
+        check_signs (bool): Check the amount signs against the remembered convention (if False, it is used as is).
+
+    Returns:
+        tuple: The sign convention of the file, and the sign conventions of the layout's accounts, including it.
+
+    Raises:
+        ValueError: If the signs clearly contradict the convention (see 'contradicts_sign_convention').
+    """
+
+    account = get_account_map().account(file_name)
+    sign_conventions = schema.get('sign_conventions', {})
+    known = sign_conventions.get(account)
+
+    if known and not check_signs:
+        return known, sign_conventions
+    if known and schema.get('sign_check', True):
+        if contradicts_sign_convention(positives, negatives, known):
+            raise ValueError(
+                f"Amount signs contradict the sign convention remembered for account '{account}' ('{known}': "
+                f"{positives} positive and {negatives} negative amounts). Check the file; if its signs are right, set "
+                f"'sign_check' to false for its layout in {SCHEMA_REGISTRY_FILE}"
+            )
+        return known, sign_conventions
+
+    sign_convention = 'invert' if positives > negatives else 'keep'
+    return sign_convention, {**sign_conventions, account: sign_convention}
+
+
+def scan_tx_file(file_path: str, header: pd.Index, schema: Dict, chunk_size: int = TX_CHUNK_SIZE) -> tuple:
+    """
+    Resolve the parsing parameters of a (large) input file with a first pass over its date and amount columns,
+    so that all its chunks are parsed the same way, and exactly as if the file had been read at once.
+
+    Memory use is bounded by the number of unique dates, as only those (plus a sample of amounts and the counts
+    of positive and negative amounts) are kept.
+
+    Args:
+        file_path (str): Path to the input file.
+        header (pd.Index): Header of the input file.
+        schema (Dict): Schema of the layout (see 'SchemaRegistry').
+        chunk_size (int): Number of rows read at a time.
+
+    Returns:
+        tuple: Schema with all parsing parameters resolved, parameters to be remembered for the layout, and
+        whether all amounts are integers (so chunks can keep the dtype the whole column would have).
+    """
+
+    file_name = os.path.basename(file_path)
+    columns = schema['columns']
+    amount_names = [name for name in ('amount', 'credit', 'debit') if name in columns]
+    scan_columns = {name: columns[name] for name in ['date', *amount_names]}
+
+    unique_dates = set()
+    samples = {name: [] for name in amount_names}
+    positives = negatives = 0
+    integer_amounts = True
+    for chunk in read_tx_columns(file_path, header, scan_columns, chunksize=chunk_size):
+        chunk.columns = chunk.columns.str.lower().str.strip()
+        chunk = select_tx_columns(chunk, scan_columns)
+        unique_dates.update(chunk['date'].dropna())
+
+        for name in amount_names:
+            amounts = chunk[name]
+            integer_amounts &= pdt.is_integer_dtype(amounts)
+            # Sample string amounts (in the order they would be sampled from the whole column) for the decimal separator
+            if pdt.is_object_dtype(amounts) and len(samples[name]) < AMOUNT_SAMPLE_SIZE:
+                strings = amounts[amounts.str.len().notnull()]
+                samples[name].extend(strings.head(AMOUNT_SAMPLE_SIZE - len(samples[name])).tolist())
+
+        if schema['data_format'] == 'ONLY_AMOUNTS':
+            # Amount signs do not depend on the decimal separator
+            amounts = parse_amounts(chunk['amount'])
+            positives += int((amounts > 0).sum())
+            negatives += int((amounts < 0).sum())
+
+    # Dates: the format known for this layout, or the one detected on all unique dates
+    dates = pd.Series(sorted(unique_dates), dtype=object)
+    _, date_format = parse_dates(dates, schema.get('date_format'), file_name)
+
+    # Amounts: sample credits first, then debits (as in the melted column of a file read at once)
+    sample = pd.Series([value for name in amount_names for value in samples[name]][:AMOUNT_SAMPLE_SIZE], dtype=object)
+    decimal_separator = schema.get('decimal_separator') or (detect_decimal_separator(sample) if len(sample) else '.')
+
+    parameters = {'date_format': date_format, 'decimal_separator': decimal_separator}
+    if schema['data_format'] == 'ONLY_AMOUNTS':
+        _, parameters['sign_conventions'] = resolve_sign_convention(positives, negatives, schema, file_name)
+
+    # Ambiguous date formats are not remembered, but all chunks use the one assumed for the whole file
+    resolved_schema = {**schema, **parameters, 'date_format': date_format or detect_date_format(dates)['format']}
+    return resolved_schema, parameters, integer_amounts
+
+
+def resolve_stream_schema(file_path: str, chunk_size: int = TX_CHUNK_SIZE) -> tuple:
+    """
+    Resolve the layout of a (large) input file and its parsing parameters before it is streamed.
+
+    Args:
+        file_path (str): Path to the input file.
+        chunk_size (int): Number of rows read at a time.
+
+    Returns:
+        tuple: The file header, its signature, the schema of the layout (detected on the first chunk if unknown),
+        and the results of 'scan_tx_file'.
+    """
+
+    header, signature, _, schema = load_tx_schema(file_path)
+    if not schema:
+        # Detect the layout on the first chunk of the file
+        tx_list = pd.read_csv(file_path, index_col=False, nrows=chunk_size)
+        tx_list.attrs['file_name'] = file_path
+        tx_list.columns = tx_list.columns.str.lower().str.strip()
+        columns, data_format = detect_tx_columns(tx_list)
+        schema = {'columns': columns, 'data_format': data_format}
+
+    return (header, signature, schema, *scan_tx_file(file_path, header, schema, chunk_size))
+
+
+def standardize_next_chunk(reader, columns: Dict[str, str], resolved_schema: Dict, file_name: str, integer_amounts: bool) -> Optional[pd.DataFrame]:
+    """
+    Read and standardize the next chunk of a streamed file.
+
+    Args:
+        reader: Reader of chunks of the transaction columns (see 'read_tx_columns').
+        columns (Dict[str, str]): Column positions dictionary of the layout.
+        resolved_schema (Dict): Schema with all parsing parameters resolved (see 'scan_tx_file').
+        file_name (str): Name of the input file.
+        integer_amounts (bool): Whether all amounts of the file are integers.
+
+    Returns:
+        pd.DataFrame: Standardized transactions of the chunk (None once the file is exhausted).
+    """
+
+    tx_list = next(reader, None)
+    if tx_list is None:
+        return None
+    tx_list.columns = tx_list.columns.str.lower().str.strip()
+    tx_list = select_tx_columns(tx_list, columns)
+    tx_list, _ = standardize_tx_data(tx_list, resolved_schema, file_name, check_signs=False)
+    if not integer_amounts:
+        tx_list['amount'] = tx_list['amount'].astype(float)
     return tx_list
 
 
-def save_results(results: List) -> None:
+async def stream_file(
+    file_path: str,
+    ref_index: Optional[ReferenceIndex] = None,
+    ledger: Optional[IngestLedger] = None,
+    file_hash: Optional[str] = None,
+    chunk_size: int = TX_CHUNK_SIZE,
+    offline: bool = False,
+    executor: Optional[Executor] = None,
+) -> tuple:
+    """
+    Standardize and categorize a (large) input file in chunks of bounded size, writing each categorized chunk
+    to an interim output file, so memory use does not grow with the size of the file.
+
+    Parsing parameters are resolved for the whole file first (see 'scan_tx_file'), so results are the same as
+    if the file had been read at once (except for the order of the rows of credit/debit layouts, which are
+    consolidated per chunk).
+
+    Reading and standardization run outside the event loop, so other files (and their language model requests)
+    keep making progress meanwhile: the first pass in the executor, and the chunks in a thread (the reader of
+    the file keeps its position between chunks, so it can't be sent to worker processes).
+
+    Args:
+        file_path (str): Path to the input file.
+        ref_index (ReferenceIndex, optional): Reference index shared by all files in the run.
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested; if provided,
+            only transactions not ingested before are kept.
+        file_hash (str, optional): Hash of the content of the file (as staged in the ledger).
+        chunk_size (int): Number of rows read at a time.
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
+        executor (Executor, optional): Executor to run the first pass over the file in; runs in a thread if not provided.
+
+    Returns:
+        tuple: Path to the interim output file (categorized transactions, in output format and without header),
+        the description-category pairs found in the file, and the number of transactions skipped as already ingested.
+    """
+
+    file_name = os.path.basename(file_path)
+    if ref_index is None:
+        ref_index = ReferenceIndex.load()
+
+    loop = asyncio.get_running_loop()
+    header, signature, schema, resolved_schema, parameters, integer_amounts = await loop.run_in_executor(
+        executor, resolve_stream_schema, file_path, chunk_size
+    )
+
+    output_file = os.path.join(os.path.dirname(TX_OUTPUT_FILE), f'.{file_name}.part')
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    source = tx_source(file_path, signature)
+    ref_data = {}
+    duplicates = 0
+    try:
+        with read_tx_columns(file_path, header, schema['columns'], chunksize=chunk_size) as reader:
+            while True:
+                with get_metrics().timer('standardize_chunk'):
+                    tx_list = await loop.run_in_executor(
+                        None, standardize_next_chunk, reader, schema['columns'], resolved_schema, file_name, integer_amounts
+                    )
+                if tx_list is None:
+                    break
+
+                # Keep only transactions not ingested before from the same account
+                if ledger is not None:
+                    new_rows = ledger.stage_rows(file_hash, row_fingerprints(tx_list, source))
+                    duplicates += int((~new_rows).sum())
+                    tx_list = tx_list[new_rows]
+                    if tx_list.empty:
+                        continue
+
+                tx_list.attrs['file_name'] = file_name
+                tx_list = await categorize_tx_list(tx_list, ref_index, offline)
+                await loop.run_in_executor(None, partial(tx_list.to_csv, output_file, mode='a', index=False, header=False))
+                # Keep the first category of each description (as the reference file does)
+                for description, category in zip(canonicalize_descriptions(tx_list['description'], tx_list['source']), tx_list['category']):
+                    ref_data.setdefault(description, category)
+    except Exception:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        raise
+
+    # Remember the layout (or update its parsing parameters)
+    if {**schema, **parameters} != schema:
+        SchemaRegistry().save(signature, {**schema, **parameters})
+
+    return output_file, pd.DataFrame(list(ref_data.items()), columns=['Description', 'Category']), duplicates
+
+
+@timed('save_results')
+def save_results(results: List, ref_index: Optional[ReferenceIndex] = None, ledger: Optional[IngestLedger] = None) -> None:
     """
-    Merge all interim results in the input folder and write the merged results to the output file.
+    Merge all results, append them to the output file (and to the aggregates), and add the new description-category
+    pairs to the reference store.
 
     Args:
-        in_folder (str): Path to the input folder containing interim results.
-        out_file (str): Path to the output file.
+        results (List): Results returned by 'process_file' (and categorized by 'categorize_results').
+        ref_index (ReferenceIndex, optional): Reference index shared by all files in the run; if provided, its
+            new pairs are saved (without reading the reference data again).
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested; files saved
+            are committed to it, and files with errors are discarded from it.
 
     Returns:
         None
@@ -137,33 +622,83 @@ def save_results(results: List) -> None:
     ok_files = []
     ko_files = []
     error_messages = []
+    skipped_files = []
+    result_dfs = []
+    streamed_results = []
 
     col_list = ['Source', 'Date', 'Type', 'Category', 'Description', 'Amount']
-    tx_list = pd.DataFrame(columns=col_list)
     for result in results:
-        if not result['error']:
+        if result.get('skipped'):
+            skipped_files.append(result['file_name'])
+        elif not result['error'] and 'output_file' in result:
+            ok_files.append(result['file_name'])
+            streamed_results.append(result)
+        elif not result['error']:
             ok_files.append(result['file_name'])
             result_df = result['output']
             result_df.columns = col_list
-            tx_list = pd.concat([tx_list, result_df], ignore_index=True)
+            result_dfs.append(result_df)
         else:
             ko_files.append(result['file_name'])
             error_messages.append(f"{result['file_name']}: {result['error']}")  
 
-    # Write contents to output file (based on file type)
-    tx_list.to_csv(TX_OUTPUT_FILE, mode="a", index=False, header=not os.path.exists(TX_OUTPUT_FILE))
+    tx_list = pd.concat(result_dfs, ignore_index=True) if result_dfs else pd.DataFrame(columns=col_list)
 
-    new_ref_data = tx_list[['Description', 'Category']]
-    if os.path.exists(REF_OUTPUT_FILE):
-        # If it exists, add master file to interim results
-        old_ref_data = pd.read_csv(REF_OUTPUT_FILE, names=['Description', 'Category'], header=0)
-        new_ref_data = pd.concat([old_ref_data, new_ref_data], ignore_index=True)
-        
-    # Drop duplicates, sort, and write to create new Master File
-    new_ref_data.drop_duplicates(subset=['Description']).sort_values(by=['Description']).to_csv(REF_OUTPUT_FILE, mode="w", index=False, header=True)
+    # Write contents to output file (based on output format), including the interim output files of streamed files.
+    # Writes from concurrent workers are serialized, so their rows (and the header) are never interleaved
+    aggregates = TxAggregates()
+    try:
+        with FileLock(TX_OUTPUT_DATASET.rstrip('/') if TX_OUTPUT_FORMAT == 'parquet' else TX_OUTPUT_FILE):
+            if TX_OUTPUT_FORMAT == 'parquet':
+                write_tx_dataset(tx_list)
+                for result in streamed_results:
+                    write_tx_dataset_from_csv(result['output_file'])
+            else:
+                tx_list.to_csv(TX_OUTPUT_FILE, mode="a", index=False, header=not os.path.exists(TX_OUTPUT_FILE))
+                for result in streamed_results:
+                    with open(result['output_file'], 'r') as part_file, open(TX_OUTPUT_FILE, 'a') as output_file:
+                        shutil.copyfileobj(part_file, output_file)
+
+            # Update the aggregates only once the output is written (so transactions missing from the output are never
+            # counted, nor counted twice when rerun); streamed files are read back in chunks
+            aggregates.add(tx_list, commit=False)
+            tx_saved = len(tx_list)
+            for result in streamed_results:
+                for result_df in pd.read_csv(result['output_file'], names=col_list, header=None, chunksize=TX_CHUNK_SIZE):
+                    aggregates.add(result_df, commit=False)
+                    tx_saved += len(result_df)
+            aggregates.commit()
+    finally:
+        aggregates.close()
+
+    for result in streamed_results:
+        os.remove(result['output_file'])
+    get_metrics().increment('tx_saved', tx_saved)
+
+    # Record the files (and transactions) saved as ingested
+    if ledger is not None:
+        ledger.commit(result['file_hash'] for result in results if not result['error'] and 'file_hash' in result)
+        ledger.discard(result['file_hash'] for result in results if result['error'] and 'file_hash' in result)
+
+    # Append new description-category pairs to the reference store (known descriptions keep their category)
+    ref_store = ReferenceStore()
+    if ref_index is not None:
+        ref_store.upsert(ref_index.unsaved_pairs())
+        ref_index.mark_saved()
+    else:
+        new_ref_data = pd.concat(
+            [tx_list[['Description', 'Category']].assign(Description=canonicalize_descriptions(tx_list['Description'], tx_list['Source']))]
+            + [result['ref_data'] for result in streamed_results],
+            ignore_index=True,
+        ).set_axis(['description', 'category'], axis=1).drop_duplicates(subset=['description'])
+        known_descriptions = ref_store.load()['description']
+        ref_store.upsert(new_ref_data[~new_ref_data['description'].isin(known_descriptions)])
 
     # Summarize results
-    print(f"\nProcessed {len(results)} files: {len(ok_files)} successful, {len(ko_files)} with errors\n")
+    duplicates = sum(result.get('duplicates', 0) for result in results if not result['error'])
+    print(f"\nProcessed {len(results)} files: {len(ok_files)} successful, {len(ko_files)} with errors"
+          + (f", {len(skipped_files)} already ingested" if skipped_files else '')
+          + (f" ({duplicates} transactions already ingested were skipped)" if duplicates else '') + "\n")
     if len(ko_files):
         print(f"Errors in the following files:")
         for message in error_messages:
@@ -171,31 +706,87 @@ def save_results(results: List) -> None:
         print('\n')
 
 
-def manage_processed_files(d_flag: bool) -> None:
+async def process_files(
+    file_paths: List[str],
+    executor: Optional[Executor] = None,
+    ref_index: Optional[ReferenceIndex] = None,
+    ledger: Optional[IngestLedger] = None,
+    offline: bool = False,
+) -> List:
+    """
+    Process a batch of input files end to end: read and standardize them, categorize their transactions,
+    and save the results (input files are left in place; see 'manage_processed_files').
+
+    Args:
+        file_paths (List[str]): Paths to the input files.
+        executor (Executor, optional): Executor to standardize the files in (see 'process_file').
+        ref_index (ReferenceIndex, optional): Reference index shared by all files (and batches).
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested.
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
+
+    Returns:
+        List: Results returned by 'process_file' (categorized and saved).
+    """
+
+    # Create and run an asyncio task to process each file; files are read and standardized in the executor,
+    # and their reference lookups run in this process as soon as each file is ready
+    print('\nProcessing files...')
+    metrics = get_metrics()
+    with metrics.timer('process_files'):
+        results = await asyncio.gather(*[process_file(file_path, executor, ref_index, ledger, offline) for file_path in file_paths])
+
+    # Categorize the transactions of all files at once (each unique description is categorized only once)
+    print('\nCategorizing transactions...')
+    with metrics.timer('categorize'):
+        await categorize_results(results, ref_index, offline)
+
+    # Save results to output file
+    save_results(results, ref_index, ledger)
+    metrics.increment('files_processed', len(results))
+
+    return results
+
+
+def list_input_files(folder: str = TX_INPUT_FOLDER) -> List[str]:
+    """Return the paths of the input (CSV) files in a folder."""
+    return glob.glob(os.path.join(folder, "*.csv")) + glob.glob(os.path.join(folder, "*.CSV"))
+
+
+def manage_processed_files(
+    d_flag: bool,
+    file_names: Optional[List[str]] = None,
+    folder: str = TX_INPUT_FOLDER,
+    clear_archive: bool = True,
+) -> None:
     """
     Manage processed files by either deleting them or moving them to the archive folder.
 
     Args:
         d_flag (bool): If True, delete all processed files, including those in the archive folder.
                        If False, move all processed files to the archive folder.
+        file_names (List[str], optional): Names of the processed files (default: all files in the folder).
+        folder (str): Folder of the processed files (the input folder, or the folder of a worker in sharded runs).
+        clear_archive (bool): With 'd_flag', also delete the files in the archive folder (not done by the workers of
+            a sharded run, as other workers may be archiving their files meanwhile).
 
     Returns:
         None
     """
     
-    input_files = os.listdir(TX_INPUT_FOLDER)
+    input_files = os.listdir(folder) if file_names is None else file_names
 
     if d_flag: # Delete processed files, including those in archive folder
         
         for file in input_files:
-            os.remove(os.path.join(TX_INPUT_FOLDER, file))
+            os.remove(os.path.join(folder, file))
         
-        archived_files = os.listdir(TX_ARCHIVE_FOLDER)
-        for file in archived_files:
-            os.remove(os.path.join(TX_ARCHIVE_FOLDER, file))
+        if clear_archive:
+            archived_files = os.listdir(TX_ARCHIVE_FOLDER)
+            for file in archived_files:
+                os.remove(os.path.join(TX_ARCHIVE_FOLDER, file))
     else:
         # Move processed files to archive folder
         for file in input_files:
-            source_path = os.path.join(TX_INPUT_FOLDER, file)
+            source_path = os.path.join(folder, file)
             destination_path = os.path.join(TX_ARCHIVE_FOLDER, file)
             shutil.move(source_path, destination_path)
\ No newline at end of file
@@ -0,0 +1,282 @@
+# Standard library imports
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from fnmatch import fnmatch
+from typing import Iterable, List, Optional, Tuple
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+
+# Local application/library specific imports
+from src.config import INGEST_LEDGER_FILE, ACCOUNTS_FILE, LOCK_TIMEOUT
+
+
+def file_fingerprint(file_path: str, source: str = '') -> str:
+    """Return a hash of the content of a file (so copies of a file are recognized) and of its source (so the same
+    content exported from another account is not; see 'row_fingerprints')."""
+    digest = hashlib.sha256(source.encode('utf-8'))
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Parts of downloaded file names that change with each download: dates (e.g. '2023-04-30', '20230430', '04.30.23')
+# and copy suffixes (e.g. 'activity (1)', 'activity copy 2', 'activity - Copy')
+DOWNLOAD_NAME_NOISE = [re.compile(pattern) for pattern in [
+    r'\s*\(\d+\)$',
+    r'(?i)[\s_-]+copy(?:\s*\d+)?$',
+    r'(?<!\d)(?:19|20)\d{2}[-_.]?[01]\d(?:[-_.]?[0-3]\d)?(?!\d)',
+    r'(?<!\d)[0-3]?\d[-_.][0-3]?\d[-_.](?:19|20)?\d{2}(?!\d)',
+]]
+
+
+class AccountMap:
+    """Identifies the account each input file comes from, so the transactions of different accounts (even at the
+    same bank, or at banks exporting the same columns) are never mistaken for one another.
+
+    Your own mapping (see 'load') assigns accounts to file name patterns. Other files are identified by their name,
+    without the parts that change with each download (e.g. 'Chase1234_Activity_20230430 (1).csv' -> 'chase1234
+    activity'), so later exports of the same account are recognized as long as they are named the same way.
+    """
+
+    def __init__(self, accounts: Optional[pd.DataFrame] = None) -> None:
+        self.accounts: List[Tuple[str, str]] = []
+        if accounts is not None:
+            for source, account in accounts[['source', 'account']].itertuples(index=False):
+                if source and account:
+                    self.accounts.append((source.lower(), account))
+                else:
+                    logging.log(logging.ERROR, f"| Accounts | Incomplete entry ignored: {source}, {account}")
+
+    @classmethod
+    def load(cls, file_path: str = ACCOUNTS_FILE) -> 'AccountMap':
+        """
+        Build the account map with your own mapping, if any.
+
+        Your mapping is a CSV file with 'source' (a pattern of input file names, e.g. 'chase_checking*.csv') and
+        'account' (any name for the account) columns; the first matching pattern wins.
+
+        Args:
+            file_path (str): Path to your mapping.
+
+        Returns:
+            AccountMap: The account map.
+        """
+
+        if not os.path.exists(file_path):
+            return cls()
+        return cls(pd.read_csv(file_path, dtype=str, keep_default_na=False))
+
+    def account(self, file_name: str) -> str:
+        """Return the account an input file comes from (see the class description)."""
+        for source, account in self.accounts:
+            if fnmatch(file_name.lower(), source):
+                return account
+        stem = os.path.splitext(file_name)[0]
+        name = stem
+        for pattern in DOWNLOAD_NAME_NOISE:
+            name = pattern.sub('', name)
+        return ' '.join(re.split(r'[\s_.-]+', name.lower())).strip() or stem.lower()
+
+
+_account_map: Optional[AccountMap] = None
+
+
+def get_account_map() -> AccountMap:
+    """Return the process-wide account map (loaded on first use)."""
+    global _account_map
+    if _account_map is None:
+        _account_map = AccountMap.load()
+    return _account_map
+
+
+def row_fingerprints(tx_list: pd.DataFrame, source: str) -> np.ndarray:
+    """
+    Return a 64-bit key per transaction, built from its source, date, amount and description.
+
+    Args:
+        tx_list (pd.DataFrame): Standardized transactions (see 'standardize_tx_format').
+        source (str): Identifier of the account the transactions come from (see 'AccountMap'), so that the same
+            transaction in two accounts is kept in both.
+
+    Returns:
+        np.ndarray: Key of each transaction (as signed integers, as stored in SQLite).
+    """
+
+    keys = pd.DataFrame({
+        'date': tx_list['date'].astype(str).values,
+        'amount': tx_list['amount'].astype(float).round(2).values,
+        'description': tx_list['description'].astype(str).values,
+    })
+    hash_key = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+    return pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).values.astype(np.int64)
+
+
+class IngestLedger:
+    """Durable (SQLite) ledger of the input files and transactions already ingested.
+
+    Files are identified by a hash of their content, and transactions by their row key (see
+    'row_fingerprints') plus their occurrence number within the file, so identical transactions
+    in the same file (e.g. two coffees on the same day) are all kept, while the same transactions
+    in an overlapping export (e.g. "last 90 days", downloaded every month) are recognized.
+
+    Files and transactions are staged while a run processes them, and only committed once
+    the results are saved; staged entries left by an interrupted run are discarded.
+
+    In a sharded run, each worker stages entries under its name, so workers sharing the ledger only
+    discard their own staged entries (a run without a worker name discards all of them).
+    """
+
+    def __init__(self, file_path: str = INGEST_LEDGER_FILE, worker: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self.worker = worker or ''
+        self.connection = sqlite3.connect(file_path, timeout=LOCK_TIMEOUT)
+        self.connection.executescript(
+            """CREATE TABLE IF NOT EXISTS files (
+                file_hash TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                committed INTEGER NOT NULL,
+                ingested_at REAL NOT NULL,
+                worker TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS transactions (
+                row_key INTEGER NOT NULL,
+                occurrence INTEGER NOT NULL,
+                file_hash TEXT NOT NULL,
+                committed INTEGER NOT NULL,
+                worker TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (row_key, occurrence)
+            );
+            CREATE INDEX IF NOT EXISTS transactions_file_hash ON transactions (file_hash);
+            CREATE TEMP TABLE candidates (position INTEGER, row_key INTEGER, occurrence INTEGER);
+            CREATE TEMP TABLE row_counts (file_hash TEXT, row_key INTEGER, count INTEGER, PRIMARY KEY (file_hash, row_key));"""
+        )
+        # Ledgers created before sharded runs have no worker column
+        for table in ('files', 'transactions'):
+            if 'worker' not in {column for (_, column, *_) in self.connection.execute(f"PRAGMA table_info({table})")}:
+                self.connection.execute(f"ALTER TABLE {table} ADD COLUMN worker TEXT NOT NULL DEFAULT ''")
+        self.connection.commit()
+        self.discard_staged()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def reset(self) -> None:
+        """Forget all ingested files and transactions (e.g. when the output file is recreated)."""
+        self.connection.executescript("DELETE FROM files; DELETE FROM transactions; DELETE FROM row_counts;")
+        self.connection.commit()
+
+    def stage_file(self, file_hash: str, file_name: str) -> bool:
+        """Stage an input file for ingestion.
+
+        Args:
+            file_hash (str): Hash of the content of the file (see 'file_fingerprint').
+            file_name (str): Name of the file.
+
+        Returns:
+            bool: False if the file was already ingested (or is being ingested in this run), True otherwise.
+        """
+
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO files (file_hash, file_name, committed, ingested_at, worker) VALUES (?, ?, 0, ?, ?)",
+            (file_hash, file_name, time.time(), self.worker),
+        )
+        self.connection.commit()
+        return cursor.rowcount == 1
+
+    def stage_rows(self, file_hash: str, row_keys: np.ndarray) -> np.ndarray:
+        """Stage the transactions of a file (or of a chunk of it) that were not ingested before.
+
+        Occurrence numbers continue across calls for the same file, so large files can be staged in chunks.
+
+        Args:
+            file_hash (str): Hash of the content of the file.
+            row_keys (np.ndarray): Key of each transaction (see 'row_fingerprints').
+
+        Returns:
+            np.ndarray: Mask of the new transactions.
+        """
+
+        keys = pd.Series(row_keys)
+        if keys.empty:
+            return np.zeros(0, dtype=bool)
+        occurrences = keys.groupby(keys).cumcount().values
+
+        # Look up and stage the transactions in a single write transaction, so concurrent workers can't both stage them
+        # (committed at the end, or rolled back on errors)
+        self.connection.execute("BEGIN IMMEDIATE")
+        with self.connection:
+            # Continue the occurrence numbers of the previous chunks of the file
+            self.connection.execute("DELETE FROM candidates")
+            self.connection.executemany(
+                "INSERT INTO candidates (position, row_key, occurrence) VALUES (?, ?, ?)",
+                zip(range(len(keys)), keys.tolist(), occurrences.tolist()),
+            )
+            previous_counts = dict(self.connection.execute(
+                """SELECT row_key, count FROM row_counts
+                   WHERE file_hash = ? AND row_key IN (SELECT row_key FROM candidates)""",
+                (file_hash,),
+            ).fetchall())
+            if previous_counts:
+                occurrences = occurrences + keys.map(previous_counts).fillna(0).astype(np.int64).values
+                self.connection.execute("DELETE FROM candidates")
+                self.connection.executemany(
+                    "INSERT INTO candidates (position, row_key, occurrence) VALUES (?, ?, ?)",
+                    zip(range(len(keys)), keys.tolist(), occurrences.tolist()),
+                )
+            self.connection.executemany(
+                """INSERT INTO row_counts (file_hash, row_key, count) VALUES (?, ?, ?)
+                   ON CONFLICT (file_hash, row_key) DO UPDATE SET count = count + excluded.count""",
+                [(file_hash, key, count) for key, count in keys.value_counts().items()],
+            )
+
+            # Transactions already ingested (or staged by another file in this run, or by another worker)
+            seen = [position for (position,) in self.connection.execute(
+                "SELECT c.position FROM candidates c JOIN transactions t USING (row_key, occurrence)"
+            )]
+            new_rows = np.ones(len(keys), dtype=bool)
+            new_rows[seen] = False
+
+            self.connection.execute(
+                """INSERT INTO transactions (row_key, occurrence, file_hash, committed, worker)
+                   SELECT row_key, occurrence, ?, 0, ? FROM candidates c
+                   WHERE NOT EXISTS (SELECT 1 FROM transactions t WHERE t.row_key = c.row_key AND t.occurrence = c.occurrence)""",
+                (file_hash, self.worker),
+            )
+        return new_rows
+
+    def commit(self, file_hashes: Iterable[str]) -> None:
+        """Mark staged files (and their transactions) as ingested, once their results are saved."""
+        file_hashes = list(file_hashes)
+        self.connection.executemany("UPDATE files SET committed = 1 WHERE file_hash = ?", [(h,) for h in file_hashes])
+        self.connection.executemany("UPDATE transactions SET committed = 1 WHERE file_hash = ?", [(h,) for h in file_hashes])
+        # Occurrence counts are only needed while a file is being staged (and would pile up in watch mode)
+        self.connection.executemany("DELETE FROM row_counts WHERE file_hash = ?", [(h,) for h in file_hashes])
+        self.connection.commit()
+
+    def discard(self, file_hashes: Iterable[str]) -> None:
+        """Discard staged files (and their transactions), e.g. when their processing failed."""
+        file_hashes = list(file_hashes)
+        self.connection.executemany("DELETE FROM files WHERE file_hash = ? AND committed = 0", [(h,) for h in file_hashes])
+        self.connection.executemany("DELETE FROM transactions WHERE file_hash = ? AND committed = 0", [(h,) for h in file_hashes])
+        self.connection.executemany("DELETE FROM row_counts WHERE file_hash = ?", [(h,) for h in file_hashes])
+        self.connection.commit()
+
+    def discard_staged(self) -> None:
+        """Discard all staged files (and their transactions), e.g. when a batch fails before its results are saved.
+
+        In a sharded run, only the entries staged by this worker are discarded.
+        """
+        for table in ('files', 'transactions'):
+            if self.worker:
+                self.connection.execute(f"DELETE FROM {table} WHERE committed = 0 AND worker = ?", (self.worker,))
+            else:
+                self.connection.execute(f"DELETE FROM {table} WHERE committed = 0")
+        self.connection.execute("DELETE FROM row_counts")
+        self.connection.commit()
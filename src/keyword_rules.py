@@ -0,0 +1,187 @@
+# Standard library imports
+import os
+import re
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+import src.templates as templates
+from src.config import KEYWORD_RULES_FILE, KEYWORD_RULES_DEFAULT_PRIORITY
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def keyword_tokens(text: str) -> Tuple[str, ...]:
+    """Split a description (or keyword) into lowercase alphanumeric words (e.g. 'NETFLIX.COM 866-579' -> netflix, com, 866, 579)."""
+    return tuple(TOKEN_PATTERN.findall(text.lower()))
+
+
+def builtin_rules() -> pd.DataFrame:
+    """Return the built-in keyword rules (the merchants of each category, see 'templates.CATEGORIES')."""
+    rules = pd.DataFrame(
+        [(keyword, category) for category, data in templates.CATEGORIES.items() for keyword in data.get('merchants', [])],
+        columns=['keyword', 'category'],
+    )
+    rules['priority'] = KEYWORD_RULES_DEFAULT_PRIORITY
+    return rules
+
+
+class KeywordRules:
+    """Keyword rules assigning a category to the descriptions that contain one of its keywords.
+
+    Keywords match whole words (e.g. 'cat' matches 'CAT CAFE' but not 'CATERING'), ignoring case and
+    punctuation ('booking.com' matches 'BOOKING COM*HOTEL'). Rules are kept in a hash table keyed by their
+    sequence of words, so all of them are matched in a single pass over the words of each description, no
+    matter how many rules there are. When several rules match, the one with the highest priority wins, then
+    the longest keyword (e.g. 'cash back' over 'cash'), then the first one in the description.
+    """
+
+    def __init__(self, rules: pd.DataFrame) -> None:
+        # Words of the keyword -> (priority, category); for the same keyword, the highest priority (or the last rule) wins
+        resolved: Dict[Tuple[str, ...], Tuple[float, Optional[str]]] = {}
+        for keyword, category, priority in rules[['keyword', 'category', 'priority']].itertuples(index=False):
+            tokens = keyword_tokens(keyword) if isinstance(keyword, str) else ()
+            if tokens and (tokens not in resolved or priority >= resolved[tokens][0]):
+                resolved[tokens] = (priority, category if isinstance(category, str) and category.strip() else None)
+
+        # Rules without a category only disable the keyword (e.g. to leave a built-in keyword to the language model)
+        self.rules = {tokens: rule for tokens, rule in resolved.items() if rule[1] is not None}
+        self.max_words = max((len(tokens) for tokens in self.rules), default=0)
+
+    @classmethod
+    def load(cls, file_path: str = KEYWORD_RULES_FILE) -> 'KeywordRules':
+        """
+        Build the rules from the built-in merchant keywords and your own rules, if any.
+
+        Your rules are a CSV file with 'keyword' and 'category' columns, and an optional 'priority' column
+        (by default, above the built-in keywords). A rule with an empty category disables its keyword.
+
+        Args:
+            file_path (str): Path to your rules.
+
+        Returns:
+            KeywordRules: The rules.
+        """
+
+        rules = builtin_rules()
+        if os.path.exists(file_path):
+            user_rules = pd.read_csv(file_path, dtype={'keyword': str, 'category': str}, skipinitialspace=True)
+            if 'priority' not in user_rules.columns:
+                user_rules['priority'] = KEYWORD_RULES_DEFAULT_PRIORITY + 1
+            user_rules['priority'] = user_rules['priority'].fillna(KEYWORD_RULES_DEFAULT_PRIORITY + 1)
+
+            unknown = user_rules['category'].notnull() & ~user_rules['category'].isin(templates.EXPENSE_CATEGORIES)
+            if unknown.any():
+                logging.log(logging.ERROR, f"| File: {file_path} | Unknown categories, rules ignored: {sorted(user_rules.loc[unknown, 'category'].unique())}")
+            rules = pd.concat([rules, user_rules.loc[~unknown, ['keyword', 'category', 'priority']]], ignore_index=True)
+
+        return cls(rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, description: str) -> Optional[str]:
+        """Return the category of the best rule matching a description (None if no rule matches)."""
+        return self.match_keyword(description)[1]
+
+    def match_keyword(self, description: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return the keyword (as words separated by spaces) and category of the best rule matching a description
+        (None and None if no rule matches)."""
+        tokens = keyword_tokens(description)
+        best_key, best_keyword, best_category = None, None, None
+        for start in range(len(tokens)):
+            for length in range(1, min(self.max_words, len(tokens) - start) + 1):
+                rule = self.rules.get(tokens[start:start + length])
+                if rule is not None:
+                    key = (rule[0], length, -start)
+                    if best_key is None or key > best_key:
+                        best_key, best_keyword, best_category = key, ' '.join(tokens[start:start + length]), rule[1]
+        return best_keyword, best_category
+
+    def categorize(self, tx_descriptions: pd.Series) -> pd.Series:
+        """
+        Categorize transaction descriptions with the keyword rules (each unique description is matched once).
+
+        Args:
+            tx_descriptions (pd.Series): The transaction descriptions to categorize.
+
+        Returns:
+            pd.Series: Category of each transaction description (None if no rule matches).
+        """
+
+        matches = {description: self.match(description) for description in tx_descriptions.dropna().unique()}
+        return tx_descriptions.map(matches).astype(object)
+
+
+_keyword_rules: Optional[KeywordRules] = None
+
+
+def get_keyword_rules() -> KeywordRules:
+    """Return the process-wide keyword rules (loaded on first use)."""
+    global _keyword_rules
+    if _keyword_rules is None:
+        _keyword_rules = KeywordRules.load()
+    return _keyword_rules
+
+
+def evaluate(description_category_pairs: pd.DataFrame, rules: Optional[KeywordRules] = None, top: int = 10) -> tuple:
+    """
+    Evaluate the keyword rules on the reference (mostly categories given by the language model).
+
+    Args:
+        description_category_pairs (pd.DataFrame): DataFrame with 'description' and 'category' columns.
+        rules (KeywordRules, optional): Rules to evaluate; the built-in and your own rules if not provided.
+        top (int): Number of keywords to list, by number of disagreements with the reference.
+
+    Returns:
+        tuple: The share of reference descriptions matched by a rule (coverage) and the share of those matching
+        the reference category (accuracy), and the keywords with the most disagreements (with their matches,
+        disagreements and the reference categories they disagree with most).
+    """
+
+    rules = KeywordRules.load() if rules is None else rules
+    pairs = description_category_pairs.dropna().drop_duplicates(subset=['description'])
+    matches = pd.DataFrame(
+        [rules.match_keyword(description) for description in pairs['description']],
+        columns=['keyword', 'rule_category'],
+        index=pairs.index,
+    )
+    matched = pairs.join(matches).dropna(subset=['keyword'])
+    matched['agrees'] = matched['category'] == matched['rule_category']
+
+    summary = {
+        'coverage': len(matched) / len(pairs) if len(pairs) else 0.0,
+        'accuracy': matched['agrees'].mean() if len(matched) else float('nan'),
+    }
+    keywords = matched.groupby(['keyword', 'rule_category']).agg(
+        matches=('agrees', 'size'),
+        disagreements=('agrees', lambda agrees: int((~agrees).sum())),
+        reference_category=('category', lambda categories: categories.mode().iloc[0]),
+    ).reset_index()
+    keywords = keywords[keywords['disagreements'] > 0].sort_values(['disagreements', 'matches'], ascending=False).head(top)
+    return summary, keywords
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.keyword_rules', description='Evaluate the keyword rules on the reference data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    evaluate_parser = subparsers.add_parser('evaluate', help='Coverage and accuracy (vs. the reference categories) of the keyword rules')
+    evaluate_parser.add_argument('--top', type=int, default=10, help='Number of keywords with the most disagreements to list')
+    parsed = parser.parse_args(args)
+
+    # Imported here: only the CLI reads the reference store
+    from src.reference_store import ReferenceStore
+    pairs = ReferenceStore().load()
+    summary, keywords = evaluate(pairs, top=parsed.top)
+    print(f"Reference pairs: {len(pairs)} | matched by a rule: {summary['coverage']:.3f} | agree with the reference: {summary['accuracy']:.3f}")
+    if not keywords.empty:
+        print('Keywords disagreeing with the reference (disable one with an empty category in your keyword rules):')
+        print(keywords.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# Standard library imports
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Local application/library specific imports
+import src.templates as templates
+from src.descriptions import normalize_description
+from src.config import LLM_CACHE_FILE, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_ENTRIES, LLM_MODEL, LOCK_TIMEOUT
+
+
+def prompt_hash(template: str = templates.EXPENSE_CAT_TEMPLATE) -> str:
+    """Return a short hash identifying a prompt template version."""
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+
+class LLMCache:
+    """Durable (SQLite) cache of the categories returned by the language model.
+
+    Entries are keyed by normalized description, prompt template hash, and model name, so changing
+    the prompt or the model never reuses stale categories. Entries expire after 'ttl_days' days,
+    and 'prune' evicts expired, least recently used, and (optionally) stale prompt/model entries.
+    """
+
+    def __init__(
+        self,
+        file_path: str = LLM_CACHE_FILE,
+        model: str = LLM_MODEL,
+        template: str = templates.EXPENSE_CAT_TEMPLATE,
+        ttl_days: Optional[float] = LLM_CACHE_TTL_DAYS,
+    ) -> None:
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(file_path, timeout=LOCK_TIMEOUT)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                description TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                category TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (description, prompt_hash, model)
+            )"""
+        )
+        self.connection.commit()
+        self.model = model
+        self.prompt_hash = prompt_hash(template)
+        self.ttl_days = ttl_days
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _min_created_at(self, ttl_days: Optional[float]) -> float:
+        return time.time() - ttl_days * 86400 if ttl_days else 0.0
+
+    def get_many(self, descriptions: Iterable[str]) -> Dict[str, str]:
+        """Look up the cached categories of a list of descriptions.
+
+        Args:
+            descriptions (Iterable[str]): Descriptions to look up.
+
+        Returns:
+            Dict[str, str]: Category of each description found in the cache (and not expired).
+        """
+
+        keys: Dict[str, List[str]] = {}
+        for description in descriptions:
+            keys.setdefault(normalize_description(description), []).append(description)
+
+        categories = {}
+        found = []
+        min_created_at = self._min_created_at(self.ttl_days)
+        key_list = list(keys)
+        # Query in chunks to stay under SQLite's limit of host parameters per statement
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            rows = self.connection.execute(
+                f"""SELECT description, category FROM llm_cache
+                    WHERE prompt_hash = ? AND model = ? AND created_at >= ?
+                    AND description IN ({', '.join('?' * len(chunk))})""",
+                [self.prompt_hash, self.model, min_created_at, *chunk],
+            ).fetchall()
+            for key, category in rows:
+                found.append(key)
+                for description in keys[key]:
+                    categories[description] = category
+
+        if found:
+            self.connection.executemany(
+                "UPDATE llm_cache SET last_used_at = ? WHERE description = ? AND prompt_hash = ? AND model = ?",
+                [(time.time(), key, self.prompt_hash, self.model) for key in found],
+            )
+            self.connection.commit()
+
+        return categories
+
+    def put_many(self, description_category_pairs: Iterable[Tuple[str, str]]) -> None:
+        """Store (or refresh) the categories of a list of descriptions.
+
+        Args:
+            description_category_pairs (Iterable[Tuple[str, str]]): Description-category pairs to store.
+        """
+
+        now = time.time()
+        self.connection.executemany(
+            """INSERT INTO llm_cache (description, prompt_hash, model, category, created_at, last_used_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (description, prompt_hash, model)
+               DO UPDATE SET category = excluded.category, created_at = excluded.created_at, last_used_at = excluded.last_used_at""",
+            [(normalize_description(description), self.prompt_hash, self.model, category, now, now)
+             for description, category in description_category_pairs],
+        )
+        self.connection.commit()
+
+    def stats(self) -> List[Tuple[str, str, int, bool]]:
+        """Return the number of entries per prompt hash and model, flagging the current ones."""
+        rows = self.connection.execute(
+            "SELECT prompt_hash, model, COUNT(*) FROM llm_cache GROUP BY prompt_hash, model ORDER BY COUNT(*) DESC"
+        ).fetchall()
+        return [(hash_, model, count, hash_ == self.prompt_hash and model == self.model) for hash_, model, count in rows]
+
+    def prune(
+        self,
+        ttl_days: Optional[float] = LLM_CACHE_TTL_DAYS,
+        max_entries: Optional[int] = LLM_CACHE_MAX_ENTRIES,
+        stale: bool = False,
+    ) -> int:
+        """Evict cache entries.
+
+        Args:
+            ttl_days (float, optional): Evict entries created more than this many days ago.
+            max_entries (int, optional): Evict least recently used entries beyond this number.
+            stale (bool): Also evict entries for other prompt versions or models.
+
+        Returns:
+            int: Number of entries evicted.
+        """
+
+        before = self.connection.total_changes
+        if ttl_days:
+            self.connection.execute("DELETE FROM llm_cache WHERE created_at < ?", (self._min_created_at(ttl_days),))
+        if stale:
+            self.connection.execute(
+                "DELETE FROM llm_cache WHERE prompt_hash != ? OR model != ?", (self.prompt_hash, self.model)
+            )
+        if max_entries is not None:
+            self.connection.execute(
+                """DELETE FROM llm_cache WHERE rowid IN (
+                       SELECT rowid FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)""",
+                (max_entries,),
+            )
+        self.connection.commit()
+        evicted = self.connection.total_changes - before
+        self.connection.execute("VACUUM")
+        return evicted
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.llm_cache', description='Inspect and prune the LLM response cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Show the number of cached entries per prompt version and model')
+    prune_parser = subparsers.add_parser('prune', help='Evict expired, least recently used, or stale entries')
+    prune_parser.add_argument('--ttl-days', type=float, default=LLM_CACHE_TTL_DAYS, help='Evict entries older than this')
+    prune_parser.add_argument('--max-entries', type=int, default=LLM_CACHE_MAX_ENTRIES, help='Keep at most this many entries')
+    prune_parser.add_argument('--stale', action='store_true', help='Evict entries for other prompt versions or models')
+    prune_parser.add_argument('--all', action='store_true', help='Evict all entries')
+    parsed = parser.parse_args(args)
+
+    cache = LLMCache()
+    try:
+        if parsed.command == 'stats':
+            print(f'Cache file: {LLM_CACHE_FILE}')
+            for hash_, model, count, current in cache.stats():
+                print(f"  {model} | prompt {hash_} | {count} entries{' (current)' if current else ''}")
+        else:
+            max_entries = 0 if parsed.all else parsed.max_entries
+            print(f'Evicted {cache.prune(parsed.ttl_days, max_entries, parsed.stale)} entries')
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+# Standard library imports
+import sys
+import time
+import math
+import asyncio
+import logging
+from typing import Any, Optional
+
+# Local application/library specific imports
+import src.templates as templates
+from src.metrics import get_metrics
+from src.config import (
+    LLM_MODEL,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_RATE_LIMIT_RETRIES,
+)
+
+
+def rate_limit_error_type() -> type:
+    """Return the rate limit (429) exception class of the installed openai package (it moved in openai 1.0)."""
+    import openai
+    return getattr(getattr(openai, 'error', None), 'RateLimitError', None) or openai.RateLimitError
+
+
+def is_rate_limit_error(exception: BaseException) -> bool:
+    """Check whether an exception is a rate limit (429) response (without importing openai if it isn't loaded yet)."""
+    return 'openai' in sys.modules and isinstance(exception, rate_limit_error_type())
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text (~4 characters per token for English text)."""
+    return math.ceil(len(text) / 4)
+
+
+class TokenBucket:
+    """Asynchronous token bucket: 'acquire' waits until the requested amount is available.
+
+    The bucket refills continuously at 'rate_per_minute' and holds up to a tenth of a minute's
+    worth of tokens, so requests are spread evenly instead of being sent in a burst.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.rate_per_minute = rate_per_minute
+        self.capacity = max(1.0, rate_per_minute / 10)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_minute / 60)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        async with self._lock:
+            # Requests larger than the bucket wait for a full bucket (and leave it in debt)
+            needed = min(amount, self.capacity)
+            while True:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((needed - self._tokens) * 60 / self.rate_per_minute)
+
+
+class LLMScheduler:
+    """Process-wide scheduler for all language model calls.
+
+    All calls go through a single pooled client and are limited by a concurrency cap and by
+    token buckets for requests and tokens per minute. Rate limit (429) responses are handled
+    here: all calls pause for the time requested by the provider (or a few seconds), and the
+    rate is halved; it then recovers gradually with each successful call (AIMD), so throughput
+    stays close to the provider limit instead of alternating between bursts and backoff stalls.
+
+    The LLM stack (openai and langchain, by far the slowest imports of the application) is imported on
+    the first call, so runs where every description is resolved locally never load it.
+    """
+
+    def __init__(
+        self,
+        chain: Optional[Any] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+    ) -> None:
+        self._chain = chain
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.rate_factor = 1.0
+        self._resume_at = 0.0
+        self._slowed_down_at = 0.0
+
+    @property
+    def chain(self) -> Any:
+        # The client is created on first use and shared by all calls
+        if self._chain is None:
+            import langchain
+            from langchain.chat_models import ChatOpenAI
+            from langchain.chains import LLMChain
+            from langchain.prompts import PromptTemplate
+
+            # Set langchain's debug level
+            langchain.debug = False
+            # Rate limits are handled by the scheduler, so the client should not retry on its own
+            llm = ChatOpenAI(model_name=LLM_MODEL, temperature=0, client=Any, max_retries=0)
+            prompt = PromptTemplate.from_template(template=templates.EXPENSE_CAT_TEMPLATE)
+            self._chain = LLMChain(llm=llm, prompt=prompt)
+        return self._chain
+
+    def _set_rate_factor(self, rate_factor: float) -> None:
+        self.rate_factor = min(1.0, max(0.05, rate_factor))
+        self.request_bucket.rate_per_minute = self.requests_per_minute * self.rate_factor
+        self.token_bucket.rate_per_minute = self.tokens_per_minute * self.rate_factor
+
+    async def arun(self, input_data: str) -> str:
+        """Run the categorization chain on a batch of descriptions, respecting rate limits.
+
+        Args:
+            input_data (str): Concatenated transaction descriptions to categorize.
+
+        Returns:
+            str: Raw output of the language model.
+        """
+
+        # Imported here, with the client (see 'chain')
+        from langchain.callbacks import get_openai_callback
+
+        logger = logging.getLogger(__name__)
+        metrics = get_metrics()
+        prompt_tokens = estimate_tokens(templates.EXPENSE_CAT_TEMPLATE) + estimate_tokens(input_data)
+        tokens = prompt_tokens + estimate_tokens(input_data)
+
+        for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+            async with self.semaphore:
+                # Wait while calls are paused after a rate limit response, then for the rate limits
+                with metrics.timer('llm_rate_limit_wait'):
+                    pause = self._resume_at - time.monotonic()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                    await self.request_bucket.acquire(1)
+                    await self.token_bucket.acquire(tokens)
+
+                started_at = time.monotonic()
+                try:
+                    # Token usage and cost are reported by the OpenAI callback (and estimated if not reported)
+                    with metrics.timer('llm_request'), get_openai_callback() as usage:
+                        raw_result = await self.chain.arun(input_data=input_data)
+                    metrics.increment('llm_requests')
+                    metrics.increment('llm_prompt_tokens', usage.prompt_tokens or prompt_tokens)
+                    metrics.increment('llm_completion_tokens', usage.completion_tokens or estimate_tokens(raw_result))
+                    metrics.increment('llm_cost_usd', usage.total_cost)
+                except rate_limit_error_type() as e:
+                    metrics.increment('llm_rate_limited')
+                    headers = getattr(e, 'headers', None) or getattr(getattr(e, 'response', None), 'headers', None) or {}
+                    retry_after = float(headers.get('retry-after', 2 ** attempt))
+                    self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+                    # Slow down once per wave of rate limit responses (calls started before the last slowdown don't count)
+                    if started_at > self._slowed_down_at:
+                        self._set_rate_factor(self.rate_factor / 2)
+                        self._slowed_down_at = time.monotonic()
+                    logger.warning(f"Rate limited; pausing {retry_after:.1f}s, rate factor now {self.rate_factor:.2f}")
+                    if attempt == LLM_RATE_LIMIT_RETRIES:
+                        raise
+                    continue
+
+            self._set_rate_factor(self.rate_factor + 0.05)
+            return raw_result
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide LLM scheduler (created on first use)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+
+def configure_scheduler(workers: int = 1) -> LLMScheduler:
+    """
+    Create the process-wide LLM scheduler with its share of the rate limits of the account.
+
+    The limits are enforced per process, so when several workers call the language model at the same time
+    (see 'ShardWorker'), each one gets an equal share of them, and together they stay within the limits.
+
+    Args:
+        workers (int): Number of workers sharing the rate limits (LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE).
+
+    Returns:
+        LLMScheduler: The scheduler.
+    """
+
+    global _scheduler
+    _scheduler = LLMScheduler(
+        requests_per_minute=LLM_REQUESTS_PER_MINUTE / workers,
+        tokens_per_minute=LLM_TOKENS_PER_MINUTE / workers,
+    )
+    return _scheduler
@@ -0,0 +1,233 @@
+# Standard library imports
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+
+# Local application/library specific imports
+from src.descriptions import normalize_description
+from src.config import LOCAL_MODEL_FEATURES, LOCAL_MODEL_NGRAM_SIZES, LOCAL_MODEL_MIN_CONFIDENCE
+
+MAX_DESCRIPTION_BYTES = 96
+PREDICTION_CHUNK_SIZE = 2_000
+
+
+def hashed_ngram_features(
+    descriptions: Sequence[str],
+    n_features: int = LOCAL_MODEL_FEATURES,
+    ngram_sizes: Sequence[int] = LOCAL_MODEL_NGRAM_SIZES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract the hashed character n-grams of a list of descriptions (lowercase and space-padded).
+
+    N-grams are hashed with a rolling hash computed over all descriptions at once (as a matrix of bytes),
+    so extraction is vectorized and hashes are stable across runs.
+
+    Args:
+        descriptions (Sequence[str]): Descriptions.
+        n_features (int): Number of hash buckets (feature indices range from 0 to n_features - 1).
+        ngram_sizes (Sequence[int]): Sizes of the character n-grams.
+
+    Returns:
+        tuple: The row (description position) and the feature index of each n-gram, sorted by row.
+    """
+
+    padded = [f' {normalize_description(str(description))} '.encode('utf-8')[:MAX_DESCRIPTION_BYTES] for description in descriptions]
+    if not padded:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    text_bytes = np.array(padded, dtype=f'S{MAX_DESCRIPTION_BYTES}').view(np.uint8).reshape(len(padded), MAX_DESCRIPTION_BYTES).astype(np.uint64)
+
+    rows, features = [], []
+    with np.errstate(over='ignore'):
+        for size in ngram_sizes:
+            # FNV-1a over the bytes of each n-gram (seeded with its size), then a multiplicative mix
+            width = MAX_DESCRIPTION_BYTES - size + 1
+            hashes = np.full((len(padded), width), np.uint64(14695981039346656037) ^ np.uint64(size), dtype=np.uint64)
+            for offset in range(size):
+                hashes = (hashes ^ text_bytes[:, offset:offset + width]) * np.uint64(1099511628211)
+            hashes = (hashes ^ (hashes >> np.uint64(29))) * np.uint64(0xBF58476D1CE4E5B9)
+
+            valid = np.arange(width)[None, :] + size <= lengths[:, None]
+            ngram_rows, ngram_positions = np.nonzero(valid)
+            rows.append(ngram_rows)
+            features.append((hashes[ngram_rows, ngram_positions] >> np.uint64(32)) % np.uint64(n_features))
+
+    rows = np.concatenate(rows)
+    order = np.argsort(rows, kind='stable')
+    return rows[order], np.concatenate(features).astype(np.int64)[order]
+
+
+class LocalClassifier:
+    """Local (offline) classifier of descriptions, trained on the description-category pairs of the reference.
+
+    A multinomial Naive Bayes model over hashed character n-grams (see 'hashed_ngram_features'): training only
+    adds n-gram counts per category, so the model is updated incrementally as new pairs come in, and predictions
+    are a sparse lookup of those counts, computed for a whole batch of descriptions at once. The confidence of a
+    prediction is the probability of its category, with the evidence of a description scaled down by the square
+    root of its number of n-grams: overlapping n-grams are far from independent, so plain Naive Bayes probabilities
+    are close to 1 even for merchants never seen before.
+    """
+
+    def __init__(self, n_features: int = LOCAL_MODEL_FEATURES, alpha: float = 0.1) -> None:
+        self.n_features = n_features
+        self.alpha = alpha
+        self.classes: List[str] = []
+        self._class_positions: Dict[str, int] = {}
+        self.feature_counts = np.zeros((0, n_features), dtype=np.float32)
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        self._log_probabilities: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return int(self.class_counts.sum())
+
+    def partial_fit(self, descriptions: Sequence[str], categories: Sequence[str]) -> None:
+        """
+        Update the model with new description-category pairs.
+
+        Args:
+            descriptions (Sequence[str]): Descriptions.
+            categories (Sequence[str]): Category of each description.
+        """
+
+        if len(descriptions) == 0:
+            return
+
+        # New categories get a row of counts
+        new_classes = [category for category in pd.unique(pd.Series(categories, dtype=object)) if category not in self._class_positions]
+        for category in new_classes:
+            self._class_positions[category] = len(self.classes)
+            self.classes.append(category)
+        if new_classes:
+            self.feature_counts = np.vstack([self.feature_counts, np.zeros((len(new_classes), self.n_features), dtype=np.float32)])
+            self.class_counts = np.concatenate([self.class_counts, np.zeros(len(new_classes))])
+
+        labels = np.array([self._class_positions[category] for category in categories], dtype=np.int64)
+        rows, features = hashed_ngram_features(descriptions, self.n_features)
+        counts = np.bincount(labels[rows] * self.n_features + features, minlength=len(self.classes) * self.n_features)
+        self.feature_counts += counts.reshape(len(self.classes), self.n_features).astype(np.float32)
+        self.class_counts += np.bincount(labels, minlength=len(self.classes))
+        self._log_probabilities = None
+
+    def predict(self, descriptions: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict the category of a batch of descriptions.
+
+        Args:
+            descriptions (Sequence[str]): Descriptions.
+
+        Returns:
+            tuple: The predicted category of each description (None if the model is empty), and its confidence (0 to 1).
+        """
+
+        categories = np.full(len(descriptions), None, dtype=object)
+        confidences = np.zeros(len(descriptions))
+        if not self.classes or len(descriptions) == 0:
+            return categories, confidences
+
+        if self._log_probabilities is None:
+            smoothed = self.feature_counts + np.float32(self.alpha)
+            self._log_probabilities = (np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))).astype(np.float32)
+        log_priors = np.log(self.class_counts + 1) - np.log(self.class_counts.sum() + len(self.classes))
+        class_labels = np.array(self.classes, dtype=object)
+
+        for start in range(0, len(descriptions), PREDICTION_CHUNK_SIZE):
+            chunk = descriptions[start:start + PREDICTION_CHUNK_SIZE]
+            rows, features = hashed_ngram_features(chunk, self.n_features)
+            ngram_counts = np.bincount(rows, minlength=len(chunk))
+
+            # Sum the log probabilities of the n-grams of each description (descriptions without n-grams keep the priors)
+            scores = np.zeros((len(self.classes), len(chunk)))
+            with_ngrams = np.flatnonzero(ngram_counts)
+            if len(rows):
+                starts = np.concatenate([[0], np.cumsum(ngram_counts)[:-1]])[with_ngrams]
+                scores[:, with_ngrams] = np.add.reduceat(self._log_probabilities[:, features], starts, axis=1)
+            scores = (scores + log_priors[:, None]) / np.sqrt(np.maximum(ngram_counts, 1))
+
+            # Probabilities of each category (softmax over the scaled log probabilities)
+            scores -= scores.max(axis=0, keepdims=True)
+            probabilities = np.exp(scores)
+            probabilities /= probabilities.sum(axis=0, keepdims=True)
+            best = probabilities.argmax(axis=0)
+            categories[start:start + len(chunk)] = class_labels[best]
+            confidences[start:start + len(chunk)] = probabilities[best, np.arange(len(chunk))]
+
+        return categories, confidences
+
+    def categorize(self, tx_descriptions: pd.Series, min_confidence: float = LOCAL_MODEL_MIN_CONFIDENCE) -> pd.Series:
+        """
+        Categorize transaction descriptions (each unique description is predicted once).
+
+        Args:
+            tx_descriptions (pd.Series): The transaction descriptions to categorize.
+            min_confidence (float): Minimum confidence of the predictions kept.
+
+        Returns:
+            pd.Series: Category of each transaction description (None if not confident enough).
+        """
+
+        unique_descriptions = tx_descriptions.dropna().unique()
+        categories, confidences = self.predict(unique_descriptions)
+        matches = dict(zip(unique_descriptions, np.where(confidences >= min_confidence, categories, None)))
+        return tx_descriptions.map(matches).astype(object)
+
+
+def evaluate(
+    description_category_pairs: pd.DataFrame,
+    test_share: float = 0.2,
+    thresholds: Sequence[float] = (0.0, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95),
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Evaluate the classifier on a held-out split of the reference (mostly categories given by the language model).
+
+    Args:
+        description_category_pairs (pd.DataFrame): DataFrame with 'description' and 'category' columns.
+        test_share (float): Share of the pairs held out for testing.
+        thresholds (Sequence[float]): Confidence thresholds to report.
+        seed (int): Random seed of the split.
+
+    Returns:
+        pd.DataFrame: For each threshold, the share of held-out descriptions categorized locally (coverage) and
+        the share of those matching the reference category (accuracy).
+    """
+
+    pairs = description_category_pairs.dropna().drop_duplicates(subset=['description']).sample(frac=1, random_state=seed)
+    test_size = int(len(pairs) * test_share)
+    train, test = pairs.iloc[test_size:], pairs.iloc[:test_size]
+
+    classifier = LocalClassifier()
+    classifier.partial_fit(train['description'].tolist(), train['category'].tolist())
+    categories, confidences = classifier.predict(test['description'].tolist())
+    correct = categories == test['category'].values
+
+    report = []
+    for threshold in thresholds:
+        kept = confidences >= threshold
+        report.append({
+            'min_confidence': threshold,
+            'coverage': kept.mean() if len(kept) else 0.0,
+            'accuracy': correct[kept].mean() if kept.any() else float('nan'),
+        })
+    return pd.DataFrame(report)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.local_classifier', description='Evaluate the local classifier on the reference data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    evaluate_parser = subparsers.add_parser('evaluate', help='Coverage and accuracy (vs. the reference categories) on a held-out split')
+    evaluate_parser.add_argument('--test-share', type=float, default=0.2, help='Share of the reference held out for testing')
+    evaluate_parser.add_argument('--seed', type=int, default=0, help='Random seed of the split')
+    parsed = parser.parse_args(args)
+
+    # Imported here: only the CLI reads the reference store
+    from src.reference_store import ReferenceStore
+    pairs = ReferenceStore().load()
+    print(f'Reference pairs: {len(pairs)} (held out: {int(len(pairs) * parsed.test_share)})')
+    print(evaluate(pairs, parsed.test_share, seed=parsed.seed).to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
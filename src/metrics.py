@@ -0,0 +1,140 @@
+# Standard library imports
+import os
+import json
+import time
+import asyncio
+import functools
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Local application/library specific imports
+from src.config import METRICS_ENABLED, METRICS_FILE, METRICS_PROMETHEUS_FILE
+
+METRICS_PREFIX = 'expense_manager'
+
+
+class _NullTimer:
+    # Shared, stateless timer returned when metrics are disabled
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics: 'Metrics', name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> '_Timer':
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.started_at)
+
+
+class Metrics:
+    """Process-wide run metrics: stage timers (count, total and max seconds) and counters.
+
+    When disabled, timers are a shared no-op context manager and all updates return right away,
+    so instrumented code costs a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED) -> None:
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = datetime.now()
+        self.timers: Dict[str, Dict[str, float]] = defaultdict(lambda: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        self.counters: Dict[str, float] = defaultdict(int)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add a value to a counter (e.g. transactions categorized, tokens used)."""
+        if self.enabled:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record the duration of one run of a stage."""
+        if self.enabled:
+            timer = self.timers[name]
+            timer['count'] += 1
+            timer['total_seconds'] += seconds
+            timer['max_seconds'] = max(timer['max_seconds'], seconds)
+
+    def timer(self, name: str) -> Any:
+        """Return a context manager timing a stage (a no-op if metrics are disabled)."""
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics collected so far."""
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_seconds': (datetime.now() - self.started_at).total_seconds(),
+            'timers': {name: dict(timer) for name, timer in sorted(self.timers.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def to_prometheus(self) -> str:
+        """Return all metrics collected so far in the Prometheus text exposition format."""
+        lines = []
+        for name, timer in sorted(self.timers.items()):
+            metric = f'{METRICS_PREFIX}_{name}_seconds'
+            lines += [
+                f'# TYPE {metric} summary',
+                f"{metric}_sum {timer['total_seconds']}",
+                f"{metric}_count {timer['count']}",
+                f'# TYPE {metric}_max gauge',
+                f"{metric}_max {timer['max_seconds']}",
+            ]
+        for name, value in sorted(self.counters.items()):
+            metric = f'{METRICS_PREFIX}_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {value:g}']
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, file_path: Optional[str] = METRICS_FILE, prometheus_file_path: Optional[str] = METRICS_PROMETHEUS_FILE) -> None:
+        """Write the metrics of the run to a JSON file and, optionally, to a Prometheus text file (e.g. for node_exporter)."""
+        if not self.enabled:
+            return
+        for path, content in ((file_path, lambda: json.dumps(self.snapshot(), indent=2)), (prometheus_file_path, self.to_prometheus)):
+            if path:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, 'w') as file:
+                    file.write(content())
+
+
+_metrics: Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics (created on first use)."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing each call of a function or coroutine function (see 'Metrics.timer')."""
+
+    def decorator(function: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with get_metrics().timer(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
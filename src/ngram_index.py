@@ -0,0 +1,102 @@
+# Standard library imports
+from collections import defaultdict
+from typing import Dict, List, Iterable, Set
+
+# Third-party library imports
+import numpy as np
+
+# Local application/library specific imports
+from src.config import FUZZY_INDEX_NGRAM_SIZE, FUZZY_INDEX_MAX_CANDIDATES
+from src.descriptions import normalize_description
+
+
+def description_ngrams(description: str, n: int = FUZZY_INDEX_NGRAM_SIZE) -> Set[str]:
+    """Return the set of (lowercase, space-padded) character n-grams of a description."""
+    padded = f" {normalize_description(description)} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class NgramIndex:
+    """Inverted index from character n-grams to positions in a list of reference descriptions.
+
+    Used to generate a small set of candidate reference descriptions for each query before
+    running the (much more expensive) fuzzy scorer. Candidates are the reference descriptions
+    sharing the most (IDF-weighted) n-grams with the query, plus a token block. The fuzzy scorer
+    (WRatio) gives a high score to any pair of descriptions sharing a whole token whose lengths
+    differ by a factor of 1.5 to 8 (partial token set ratio), so the first such reference description
+    for each of the query's tokens is added to keep the match found by a brute-force scan.
+    """
+
+    def __init__(self, descriptions: Iterable[str] = ()) -> None:
+        self.size = 0
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._token_postings: Dict[str, List[int]] = defaultdict(list)
+        self._lengths: List[int] = []
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.add(descriptions)
+
+    def add(self, descriptions: Iterable[str]) -> None:
+        """Index new reference descriptions; positions continue from the last indexed description."""
+        for description in descriptions:
+            for ngram in description_ngrams(description):
+                self._postings[ngram].append(self.size)
+                self._arrays.pop(ngram, None)
+            for token in set(description.split()):
+                self._token_postings[token].append(self.size)
+                self._arrays.pop(f'token:{token}', None)
+            self._lengths.append(len(description))
+            self.size += 1
+        self._arrays.pop('lengths', None)
+
+    def _array(self, key: str, values: List[int]) -> np.ndarray:
+        # Posting lists are converted to arrays on first use and cached until they get new entries
+        array = self._arrays.get(key)
+        if array is None:
+            array = self._arrays[key] = np.array(values, dtype=np.int64)
+        return array
+
+    def _posting_array(self, ngram: str) -> np.ndarray:
+        return self._array(ngram, self._postings[ngram])
+
+    def _token_block(self, description: str) -> List[int]:
+        # First reference description sharing each token, overall and among those with a partial-match length ratio
+        lengths = self._array('lengths', self._lengths)
+        block = []
+        for token in set(description.split()):
+            if token not in self._token_postings:
+                continue
+            positions = self._array(f'token:{token}', self._token_postings[token])
+            ratios = np.maximum(lengths[positions], len(description)) / np.maximum(np.minimum(lengths[positions], len(description)), 1)
+            partial = positions[(ratios >= 1.5) & (ratios < 8)]
+            block.append(positions[0])
+            if len(partial):
+                block.append(partial[0])
+        return block
+
+    def candidates(self, description: str, max_candidates: int = FUZZY_INDEX_MAX_CANDIDATES) -> np.ndarray:
+        """Return the positions of the reference descriptions sharing the most n-grams with a description.
+
+        Args:
+            description (str): The query description.
+            max_candidates (int): Maximum number of candidates to return.
+
+        Returns:
+            np.ndarray: Sorted positions of the candidate reference descriptions.
+        """
+
+        token_block = self._token_block(description)
+        postings = [self._posting_array(ngram) for ngram in description_ngrams(description) if ngram in self._postings]
+        if not postings:
+            return np.array(sorted(set(token_block)), dtype=np.int64)
+
+        # Score shared n-grams per reference description, weighting rare n-grams (e.g. merchant names)
+        # above common ones (e.g. city names) with their inverse document frequency; keep the top candidates
+        weights = np.concatenate([np.full(len(posting), np.log1p(self.size / len(posting))) for posting in postings])
+        shared = np.bincount(np.concatenate(postings), weights=weights, minlength=self.size)
+        positions = np.flatnonzero(shared)
+        if len(positions) > max_candidates:
+            positions = positions[np.argpartition(shared[positions], -max_candidates)[-max_candidates:]]
+
+        # Keep reference order so that ties are resolved like a brute-force scan
+        return np.union1d(positions, np.array(token_block, dtype=np.int64))
+
@@ -0,0 +1,165 @@
+# Standard library imports
+from typing import Optional
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+import pandas.api.types as pdt
+
+# Local application/library specific imports
+from src.config import CR_VARIATIONS, DB_VARIATIONS, AMOUNT_SAMPLE_SIZE, SIGN_CHECK_MIN_SHARE, SIGN_CHECK_MIN_AMOUNTS
+
+# Lookup of (lowercase) type values to standardized types
+TYPE_LOOKUP = {**{value: 'D' for value in DB_VARIATIONS}, **{value: 'C' for value in CR_VARIATIONS}}
+
+
+def _european_masks(strings: pd.Series) -> tuple:
+    # Per-value format indicators: the legacy rule (a comma after the last dot, or a comma and no dot) and the
+    # values that can only be read one way (both separators present, or decimals that aren't 3 digits long)
+    last_dot = strings.str.rfind('.')
+    last_comma = strings.str.rfind(',')
+    length = strings.str.len()
+    european = (last_comma >= 0) & (last_dot < last_comma)
+    surely_european = european & ((last_dot >= 0) | (length - last_comma - 1 != 3))
+    surely_us = (last_dot >= 0) & (last_comma < last_dot) & ((last_comma >= 0) | (length - last_dot - 1 != 3))
+    return european, surely_european, surely_us
+
+
+def detect_decimal_separator(amounts: pd.Series, sample_size: int = AMOUNT_SAMPLE_SIZE) -> str:
+    """
+    Detect the decimal separator of an amount column from a sample of its values.
+
+    Values that can only be read one way (e.g. 1.234,56 or 12,5 are European; 1,234.56 or 12.5 are US)
+    decide the format; if there are none (e.g. only values like 1,234), amounts are in European format
+    if most of them contain a comma after their last dot (or a comma and no dot).
+
+    Args:
+        amounts (pd.Series): Amount column, as read from the input file.
+        sample_size (int): Number of (string) values to inspect.
+
+    Returns:
+        str: ',' for European format, '.' otherwise (including numeric columns).
+    """
+
+    if not pdt.is_object_dtype(amounts) and not pdt.is_string_dtype(amounts):
+        return '.'
+
+    sample = amounts[amounts.str.len().notnull()].head(sample_size).str.strip()
+    european, surely_european, surely_us = _european_masks(sample)
+    if surely_european.any() or surely_us.any():
+        return ',' if surely_european.sum() > surely_us.sum() else '.'
+    return ',' if european.sum() * 2 > len(sample) else '.'
+
+
+def parse_amounts(amounts: pd.Series, decimal_separator: Optional[str] = None) -> pd.Series:
+    """
+    Convert amounts to floats, supporting US (1,234.56) and European (1.234,56) formats.
+
+    If the column's decimal separator is known (see 'detect_decimal_separator'), it is used for all values
+    that could be read both ways (e.g. 1,234); otherwise, the format is decided per value (European if there
+    is a comma after the last dot, or a comma and no dot). Values that are not strings (e.g. already numeric)
+    are left as is. All operations are vectorized.
+
+    Args:
+        amounts (pd.Series): Amount column, as read from the input file.
+        decimal_separator (str, optional): Decimal separator of the column (',' or '.').
+
+    Returns:
+        pd.Series: Parsed amounts.
+    """
+
+    if not pdt.is_object_dtype(amounts) and not pdt.is_string_dtype(amounts):
+        return amounts
+
+    is_string = amounts.str.len().notnull()
+    strings = amounts[is_string]
+    if strings.empty:
+        return amounts
+
+    european, surely_european, surely_us = _european_masks(strings.str.strip())
+    if decimal_separator == ',':
+        european = ~surely_us
+    elif decimal_separator == '.':
+        european = surely_european
+
+    # European format: drop thousands dots and use a dot as decimal separator; US format: drop thousands commas
+    normalized = strings.str.replace(',', '', regex=False)
+    if european.any():
+        normalized[european] = strings[european].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    parsed = normalized.astype(float)
+
+    if is_string.all():
+        return parsed
+
+    # Mixed columns keep their non-string values untouched
+    amounts = amounts.copy()
+    amounts[is_string] = parsed
+    return amounts
+
+
+def standardize_types(types: pd.Series) -> pd.Series:
+    """
+    Map credit/debit type values (see CR_VARIATIONS and DB_VARIATIONS) to 'C' and 'D' (None if unknown).
+    """
+    return types.str.lower().map(TYPE_LOOKUP).astype(object).where(lambda mapped: mapped.notnull(), None)
+
+
+def sign_amounts_by_type(amounts: pd.Series, types: pd.Series) -> pd.Series:
+    """
+    Make amount signs consistent with their type (i.e. credits are positive, debits are negative).
+    """
+    absolute = amounts.abs()
+    return pd.Series(np.where(types == 'C', absolute, -absolute), index=amounts.index)
+
+
+def amount_sign_convention(amounts: pd.Series) -> str:
+    """
+    Guess the sign convention of an amount column when there is no type column (assuming there are more debits
+    than credits): 'invert' if there are more positive than negative amounts, 'keep' otherwise.
+    """
+    return 'invert' if (amounts > 0).sum() > (amounts < 0).sum() else 'keep'
+
+
+def contradicts_sign_convention(
+    positives: int,
+    negatives: int,
+    sign_convention: str,
+    min_share: float = SIGN_CHECK_MIN_SHARE,
+    min_amounts: int = SIGN_CHECK_MIN_AMOUNTS,
+) -> bool:
+    """
+    Check whether the amount signs of a file clearly contradict a sign convention (e.g. the one remembered for its
+    layout), i.e. whether most of its amounts would become credits: at least 'min_share' of its non-zero amounts are
+    positive for 'keep', or negative for 'invert'. Files with fewer than 'min_amounts' non-zero amounts are not checked.
+
+    Args:
+        positives (int): Number of positive amounts in the file.
+        negatives (int): Number of negative amounts in the file.
+        sign_convention (str): Sign convention ('invert' or 'keep').
+        min_share (float): Share of amounts with the unexpected sign from which the convention is contradicted.
+        min_amounts (int): Minimum number of non-zero amounts to check.
+
+    Returns:
+        bool: True if the signs contradict the convention.
+    """
+
+    total = positives + negatives
+    unexpected = positives if sign_convention == 'keep' else negatives
+    return total >= min_amounts and unexpected >= min_share * total
+
+
+def standardize_amount_signs(amounts: pd.Series, sign_convention: Optional[str] = None) -> pd.Series:
+    """
+    Standardize amount signs when there is no type column (i.e. credits are positive, debits are negative),
+    using the given sign convention, or the one guessed from the amounts (see 'amount_sign_convention').
+    """
+    if (sign_convention or amount_sign_convention(amounts)) == 'invert':
+        return -amounts
+    return amounts
+
+
+def types_from_amounts(amounts: pd.Series) -> pd.Series:
+    """
+    Standardize types based on amounts (i.e. non-negative amounts are credits, negative amounts are debits).
+    """
+    return pd.Series(np.where(amounts >= 0, 'C', 'D'), index=amounts.index)
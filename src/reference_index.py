@@ -0,0 +1,200 @@
+# Standard library imports
+import sys
+from typing import Dict, Optional
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+
+# Local application/library specific imports
+from src.config import TX_OUTPUT_FILE, FUZZY_INDEX_MIN_REFS, LOCAL_MODEL_MIN_REFS
+from src.ngram_index import NgramIndex
+from src.local_classifier import LocalClassifier
+from src.reference_store import ReferenceStore
+from src.descriptions import normalize_description, canonicalize_descriptions
+from src.metrics import get_metrics
+from src.categorize_tx import fuzzy_match_batch_categorizer, fuzzy_match_pruned_categorizer
+
+
+class ReferenceIndex:
+    """In-memory index of the description-category pairs in the reference store.
+
+    The index is loaded once per run and shared by all files being processed. Descriptions
+    are first looked up by exact and normalized value (O(1) hash lookups); only those not found
+    are sent to fuzzy matching, which for large references only scores the candidates returned by
+    an n-gram index. New description-category pairs are added in memory as they are obtained,
+    so files processed later in the same run benefit from them without reloading anything.
+
+    Descriptions are indexed by their canonical key (see 'DescriptionCanonicalizer'), so lookups must use
+    canonical keys too; reference entries saved before keys were canonical are canonicalized on load.
+    """
+
+    def __init__(self, description_category_pairs: pd.DataFrame) -> None:
+        pairs = description_category_pairs.dropna()
+        pairs = pairs.assign(description=canonicalize_descriptions(pairs['description'])).drop_duplicates(subset=['description'])
+        self.exact: Dict[str, str] = {}
+        self.normalized: Dict[str, str] = {}
+        self.descriptions = np.array([], dtype=object)
+        self.description_category_pairs = pd.DataFrame(columns=['description', 'category'])
+        self.ngram_index = NgramIndex()
+        # Trained lazily (and incrementally) on the pairs, in insertion order, the first time it is needed
+        self.classifier = LocalClassifier()
+        self.classifier_count = 0
+        self.update(pairs)
+        # Number of pairs (in insertion order) already in the reference store
+        self.saved_count = 0
+
+    @classmethod
+    def load(cls, store: Optional[ReferenceStore] = None) -> 'ReferenceIndex':
+        """Build the index from the reference store (an empty index if there is no reference data yet)."""
+        ref_index = cls((store or ReferenceStore()).load())
+        ref_index.saved_count = len(ref_index.description_category_pairs)
+        return ref_index
+
+    def refresh(self, store: Optional[ReferenceStore] = None) -> None:
+        """Add the pairs saved to the reference store by other processes since the index was loaded (e.g. by the
+        other workers of a sharded run); call it once the pairs of the index are saved."""
+        pairs = (store or ReferenceStore()).load().dropna()
+        self.update(pairs.assign(description=canonicalize_descriptions(pairs['description'])))
+        self.mark_saved()
+
+    def unsaved_pairs(self) -> pd.DataFrame:
+        """Return the description-category pairs added since the index was loaded (or last saved)."""
+        return self.description_category_pairs.iloc[self.saved_count:]
+
+    def mark_saved(self) -> None:
+        self.saved_count = len(self.description_category_pairs)
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def update(self, description_category_pairs: pd.DataFrame) -> None:
+        """Add new description-category pairs to the index; known descriptions keep their category.
+
+        Args:
+            description_category_pairs (pd.DataFrame): DataFrame with 'description' and 'category' columns.
+        """
+
+        new_pairs = []
+        for description, category in description_category_pairs[['description', 'category']].itertuples(index=False):
+            if not isinstance(description, str) or pd.isnull(category) or description in self.exact:
+                continue
+            self.exact[description] = category
+            self.normalized.setdefault(normalize_description(description), category)
+            new_pairs.append((description, category))
+
+        if new_pairs:
+            new_pairs = pd.DataFrame(new_pairs, columns=['description', 'category'])
+            self.description_category_pairs = pd.concat([self.description_category_pairs, new_pairs], ignore_index=True)
+            self.descriptions = self.description_category_pairs['description'].values
+            self.ngram_index.add(new_pairs['description'])
+
+    def categorize(self, tx_descriptions: pd.Series, fuzzy: bool = True) -> pd.Series:
+        """Look up the category of each transaction description.
+
+        Exact matches are resolved first, then normalized matches; the remaining descriptions
+        are categorized with fuzzy matching against the reference descriptions.
+
+        Args:
+            tx_descriptions (pd.Series): The transaction descriptions to categorize.
+            fuzzy (bool): Also fuzzy-match the descriptions not found by exact or normalized value (e.g. not
+                done per file, so each missing description is fuzzy-matched once for all files in the run).
+
+        Returns:
+            pd.Series: Category of each transaction description (NaN if not found).
+        """
+
+        # Exact and normalized hash lookups
+        categories = tx_descriptions.map(self.exact).astype(object)
+        missing = categories.isnull() & tx_descriptions.notnull()
+        if missing.any():
+            normalized_matches = {description: self.normalized.get(normalize_description(description))
+                                  for description in tx_descriptions[missing].unique()}
+            categories[missing] = tx_descriptions[missing].map(normalized_matches)
+
+        # Fuzzy-match the remaining descriptions
+        missing = categories.isnull() & tx_descriptions.notnull()
+        if fuzzy and missing.any() and len(self.descriptions):
+            with get_metrics().timer('fuzzy_match'):
+                categories[missing] = self.fuzzy_categorize(tx_descriptions[missing])
+
+        return categories
+
+    def classify(self, tx_descriptions: pd.Series) -> pd.Series:
+        """Categorize descriptions with the local classifier, trained on the reference pairs.
+
+        Args:
+            tx_descriptions (pd.Series): The transaction descriptions to categorize.
+
+        Returns:
+            pd.Series: Category of each transaction description (None if not confident enough, or if the
+            reference has fewer than LOCAL_MODEL_MIN_REFS pairs).
+        """
+
+        if len(self.description_category_pairs) < LOCAL_MODEL_MIN_REFS:
+            return pd.Series(None, index=tx_descriptions.index, dtype=object)
+
+        # Train on the pairs added since the last prediction
+        new_pairs = self.description_category_pairs.iloc[self.classifier_count:]
+        self.classifier.partial_fit(new_pairs['description'].tolist(), new_pairs['category'].tolist())
+        self.classifier_count = len(self.description_category_pairs)
+
+        # 'Other' is also the fallback for descriptions the language model failed to categorize, so it is not trusted
+        categories = self.classifier.categorize(tx_descriptions)
+        return categories.where(categories != 'Other', None)
+
+    def fuzzy_categorize(self, tx_descriptions: pd.Series, use_index: bool = None) -> pd.Series:
+        """Categorize descriptions with fuzzy matching against the reference descriptions.
+
+        Args:
+            tx_descriptions (pd.Series): The transaction descriptions to categorize.
+            use_index (bool, optional): Restrict scoring to n-gram index candidates; by default,
+                only done for references with at least FUZZY_INDEX_MIN_REFS descriptions.
+
+        Returns:
+            pd.Series: Category of each transaction description (None if no match found).
+        """
+
+        if use_index is None:
+            use_index = len(self.descriptions) >= FUZZY_INDEX_MIN_REFS
+
+        if use_index:
+            return fuzzy_match_pruned_categorizer(
+                tx_descriptions, self.ngram_index, self.descriptions, self.description_category_pairs
+            )
+
+        return fuzzy_match_batch_categorizer(tx_descriptions, self.descriptions, self.description_category_pairs)
+
+    def check_recall(self, tx_descriptions: pd.Series) -> Dict[str, float]:
+        """Compare the categories found using n-gram index candidates against a brute-force fuzzy scan.
+
+        Args:
+            tx_descriptions (pd.Series): Descriptions to use as queries.
+
+        Returns:
+            dict: Number of unique queries, number of them whose category differs, and recall (share unchanged).
+        """
+
+        queries = pd.Series(tx_descriptions.dropna().unique())
+        brute_force = self.fuzzy_categorize(queries, use_index=False)
+        pruned = self.fuzzy_categorize(queries, use_index=True)
+
+        mismatches = int((brute_force.fillna('') != pruned.fillna('')).sum())
+        return {
+            'queries': len(queries),
+            'mismatches': mismatches,
+            'recall': 1.0 - mismatches / len(queries) if len(queries) else 1.0,
+        }
+
+
+if __name__ == '__main__':
+    # Recall check of the n-gram candidate index: python -m src.reference_index [tx_file.csv ...]
+    # Queries are the descriptions in the given files (default: the output file), matched against the reference file
+    ref_index = ReferenceIndex.load()
+    tx_files = sys.argv[1:] or [TX_OUTPUT_FILE]
+    tx_list = pd.concat(
+        [pd.read_csv(tx_file, index_col=False).rename(columns=str.lower) for tx_file in tx_files],
+        ignore_index=True,
+    )
+    tx_descriptions = canonicalize_descriptions(tx_list['description'], tx_list.get('source'))
+    print(ref_index.check_recall(tx_descriptions))
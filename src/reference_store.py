@@ -0,0 +1,109 @@
+# Standard library imports
+import os
+import argparse
+from typing import List, Optional
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from src.file_lock import FileLock
+from src.config import REF_OUTPUT_FILE, REF_LOG_FILE, REF_COMPACTION_MIN_ENTRIES
+
+
+class ReferenceStore:
+    """Append-only store of description-category pairs (log + periodic compaction).
+
+    The reference file holds a compacted, sorted snapshot of all pairs (and can be edited by the
+    user); new and updated pairs are appended to a log file, so saving a run only writes its new
+    pairs. Pairs in the log take precedence over the snapshot and over earlier log entries
+    (upsert). Once the log grows past REF_COMPACTION_MIN_ENTRIES entries, it is folded into
+    the snapshot.
+
+    Several processes (e.g. the workers of a sharded run) can share the store: writes hold an exclusive
+    lock on it and reads a shared one, so concurrent upserts are all kept (for the same description, the
+    last one wins) and readers never see a compaction half done.
+    """
+
+    def __init__(self, file_path: str = REF_OUTPUT_FILE, log_path: str = REF_LOG_FILE) -> None:
+        self.file_path = file_path
+        self.log_path = log_path
+
+    def _read(self, file_path: str) -> pd.DataFrame:
+        if os.path.exists(file_path):
+            return pd.read_csv(file_path, names=['description', 'category'], header=0)
+        return pd.DataFrame(columns=['description', 'category'])
+
+    def _lock(self, shared: bool = False) -> FileLock:
+        return FileLock(self.file_path, shared=shared)
+
+    def load(self) -> pd.DataFrame:
+        """Return all description-category pairs (one per description, the latest one)."""
+        with self._lock(shared=True):
+            return self._load()
+
+    def _load(self) -> pd.DataFrame:
+        pairs = pd.concat([self._read(self.file_path), self._read(self.log_path)], ignore_index=True)
+        return pairs.drop_duplicates(subset=['description'], keep='last').reset_index(drop=True)
+
+    def log_entries(self) -> int:
+        """Return the number of entries in the log (not compacted yet)."""
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, 'rb') as file:
+            # Don't count the header
+            return max(0, sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(1 << 20), b'')) - 1)
+
+    def upsert(self, description_category_pairs: pd.DataFrame) -> None:
+        """Add (or update) description-category pairs, appending them to the log.
+
+        Args:
+            description_category_pairs (pd.DataFrame): DataFrame with 'description' and 'category' columns.
+        """
+
+        pairs = description_category_pairs[['description', 'category']].dropna()
+        if pairs.empty:
+            return
+
+        os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+        with self._lock():
+            pairs.rename(columns={'description': 'Description', 'category': 'Category'}).to_csv(
+                self.log_path, mode='a', index=False, header=not os.path.exists(self.log_path)
+            )
+            if self.log_entries() >= REF_COMPACTION_MIN_ENTRIES:
+                self._compact()
+
+    def compact(self) -> None:
+        """Fold the log into the (sorted) reference file, and start a new log."""
+        with self._lock():
+            self._compact()
+
+    def _compact(self) -> None:
+        pairs = self._load().sort_values(by=['description'])
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        temp_path = f'{self.file_path}.tmp'
+        pairs.rename(columns={'description': 'Description', 'category': 'Category'}).to_csv(temp_path, index=False, header=True)
+        os.replace(temp_path, self.file_path)
+        # Replaying the log is idempotent, so a crash before it is removed loses nothing
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.reference_store', description='Inspect and compact the reference data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Show the number of reference pairs and pending log entries')
+    subparsers.add_parser('compact', help='Fold pending log entries into the reference file (e.g. before editing it)')
+    parsed = parser.parse_args(args)
+
+    store = ReferenceStore()
+    if parsed.command == 'stats':
+        print(f'Reference file: {store.file_path}')
+        print(f'  {len(store.load())} pairs | {store.log_entries()} log entries pending compaction')
+    else:
+        store.compact()
+        print(f'Compacted {store.file_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Standard library imports
+import os
+import json
+from typing import Dict, Optional
+
+# Local application/library specific imports
+from src.file_lock import FileLock
+from src.config import SCHEMA_REGISTRY_FILE
+
+
+class SchemaRegistry:
+    """Persistent registry of known file layouts (e.g. each bank's export), keyed by header signature.
+
+    Each schema holds the resolved column mapping (standard name -> column name), the data format
+    ('TYPE_AMOUNTS', 'ONLY_AMOUNTS' or 'CR_DB_AMOUNTS'), and the parsing parameters: date format,
+    decimal separator and, for 'ONLY_AMOUNTS', the sign convention of each account ('invert' or 'keep' the amount
+    signs, see 'resolve_sign_convention'). Files whose signs clearly contradict the convention of their account are
+    rejected, unless 'sign_check' is set to false for the layout.
+    Files with a known layout skip column and format detection entirely.
+    """
+
+    def __init__(self, file_path: str = SCHEMA_REGISTRY_FILE) -> None:
+        self.file_path = file_path
+        self.schemas = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                schemas = json.load(file)
+            # Sign conventions used to be remembered per layout; they are guessed again per account
+            for schema in schemas.values():
+                schema.pop('sign_convention', None)
+            return schemas
+        return {}
+
+    def get(self, signature: str) -> Optional[Dict]:
+        return self.schemas.get(signature)
+
+    def save(self, signature: str, schema: Dict) -> None:
+        """Add (or update) a schema, merging with schemas saved concurrently by other processes."""
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        with FileLock(self.file_path):
+            self.schemas = self._load()
+            # Accounts of the layout first seen by other processes keep their sign convention
+            saved_conventions = self.schemas.get(signature, {}).get('sign_conventions')
+            if saved_conventions and 'sign_conventions' in schema:
+                schema = {**schema, 'sign_conventions': {**saved_conventions, **schema['sign_conventions']}}
+            self.schemas[signature] = schema
+            temp_path = f'{self.file_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.schemas, file, indent=2, sort_keys=True)
+            os.replace(temp_path, self.file_path)
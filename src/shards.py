@@ -0,0 +1,108 @@
+# Standard library imports
+import os
+import re
+from concurrent.futures import Executor
+from typing import List, Optional
+
+# Local application/library specific imports
+from src.file_processing import process_files, manage_processed_files, list_input_files
+from src.reference_index import ReferenceIndex
+from src.ingest_ledger import IngestLedger
+from src.config import TX_INPUT_FOLDER, TX_CLAIMS_FOLDER, TX_WORKER_BATCH_FILES
+
+WORKER_NAME_PATTERN = re.compile(r'[A-Za-z0-9_.-]+')
+
+
+class ShardWorker:
+    """A named worker of a sharded run, sharing the input folder (and the output and reference data) with others.
+
+    Workers claim input files by moving them into their own folder (TX_CLAIMS_FOLDER/<name>). A rename is
+    atomic, so each file is claimed by exactly one worker, and files are never archived (or deleted) while
+    another worker is processing them. Files left in a worker's folder by an interrupted run are processed
+    again by the next worker started with the same name.
+    """
+
+    def __init__(self, name: str, claims_folder: str = TX_CLAIMS_FOLDER) -> None:
+        if not WORKER_NAME_PATTERN.fullmatch(name):
+            raise ValueError(f'Invalid worker name: {name} (use letters, digits, dots, dashes and underscores)')
+        self.name = name
+        self.folder = os.path.join(claims_folder, name)
+
+    def claim(self, file_paths: List[str], limit: Optional[int] = None) -> List[str]:
+        """
+        Claim input files, moving them into the worker's folder.
+
+        Args:
+            file_paths (List[str]): Paths to the input files (e.g. all files in the input folder).
+            limit (int, optional): Max number of files to claim (the rest are left to other workers).
+
+        Returns:
+            List[str]: Paths to the files claimed (in the worker's folder); files claimed by another worker
+            first are skipped.
+        """
+
+        os.makedirs(self.folder, exist_ok=True)
+        claimed = []
+        for file_path in sorted(file_paths):
+            if limit is not None and len(claimed) >= limit:
+                break
+            claimed_path = os.path.join(self.folder, os.path.basename(file_path))
+            # A file with the same name still waiting in the worker's folder is processed first
+            if os.path.exists(claimed_path):
+                continue
+            try:
+                os.rename(file_path, claimed_path)
+            except FileNotFoundError:
+                continue
+            claimed.append(claimed_path)
+        return claimed
+
+    def claimed_files(self) -> List[str]:
+        """Return the paths of the files in the worker's folder (claimed, and not processed yet)."""
+        return sorted(list_input_files(self.folder))
+
+
+async def run_worker(
+    worker: ShardWorker,
+    executor: Optional[Executor] = None,
+    ref_index: Optional[ReferenceIndex] = None,
+    ledger: Optional[IngestLedger] = None,
+    d_flag: bool = False,
+    offline: bool = False,
+    batch_files: int = TX_WORKER_BATCH_FILES,
+    input_folder: str = TX_INPUT_FOLDER,
+) -> None:
+    """
+    Process the input folder as one of several concurrent workers, until no files are left to claim.
+
+    The worker claims a few files at a time, so files are spread over all the workers running, and takes
+    each batch through the usual flow ('process_files', then 'manage_processed_files'). Files left in its
+    folder by an interrupted run go first. Between batches, the reference index picks up the pairs saved
+    by the other workers, so descriptions are sent to the language model by one worker only (mostly).
+
+    Args:
+        worker (ShardWorker): The worker.
+        executor (Executor, optional): Executor to standardize the files in (see 'process_file').
+        ref_index (ReferenceIndex, optional): Reference index shared by all batches; loaded if not provided.
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested (opened with the
+            name of the worker, see 'IngestLedger').
+        d_flag (bool): Delete the files once processed, instead of archiving them (see 'manage_processed_files').
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
+        batch_files (int): Max number of files claimed at a time.
+        input_folder (str): Input folder shared by the workers.
+
+    Returns:
+        None
+    """
+
+    ref_index = ReferenceIndex.load() if ref_index is None else ref_index
+    file_paths = worker.claimed_files()
+    while True:
+        file_paths = file_paths or worker.claim(list_input_files(input_folder), limit=batch_files)
+        if not file_paths:
+            break
+        await process_files(file_paths, executor, ref_index, ledger, offline)
+        manage_processed_files(d_flag, [os.path.basename(file_path) for file_path in file_paths], worker.folder, clear_archive=False)
+        # Pick up the pairs saved by the other workers meanwhile
+        ref_index.refresh()
+        file_paths = []
@@ -1,3 +1,162 @@
+# Standard library imports
+from typing import Dict, List
+
+# Expense categories, with:
+# - keywords: words often seen in the transaction descriptions of the category, listed in the prompt to guide the
+#   language model (generic words like 'bar' or 'cash' are fine here, the model reads them in context)
+# - merchants (optional): merchant names and phrases that identify the category on their own, used as built-in keyword
+#   rules that categorize descriptions without calling the language model (see 'KeywordRules'). Generic words are left
+#   out, as they are also part of names in other categories (e.g. 'SUSHI BAR', 'CASH APP', 'RENT-A-CAR'); check the
+#   rules with 'python -m src.keyword_rules evaluate'
+CATEGORIES: Dict[str, Dict[str, List[str]]] = {
+    'ATM': {
+        'keywords': ['atm', 'cash', 'withdraw'],
+        'merchants': ['atm withdrawal', 'cash withdrawal'],
+    },
+    'Auto': {
+        'keywords': ['auto body'],
+    },
+    'Bars': {
+        'keywords': ['bar', 'pubs', 'irish', 'brewery'],
+    },
+    'Beauty': {
+        'keywords': ['body'],
+    },
+    'Cashback': {
+        'keywords': ['cashback', 'reward', 'bonus', 'cash back'],
+    },
+    'Clothing': {
+        'keywords': ['clothing', 'shoes', 'accessories'],
+    },
+    'Coffee Shops': {
+        'keywords': ['coffee', 'cafe', 'tea', 'Starbucks', 'Dunkin'],
+        'merchants': ['starbucks', 'dunkin', 'peets coffee', 'tim hortons'],
+    },
+    'Credit Card Payment': {
+        'keywords': ['card payment', 'autopay'],
+        'merchants': ['credit card payment', 'payment thank you'],
+    },
+    'Education': {
+        'keywords': ['kindle', 'tuition'],
+    },
+    'Entertainment': {
+        'keywords': ['event', 'show', 'movies', 'cinema', 'theater'],
+        'merchants': ['amc theatres', 'ticketmaster', 'stubhub'],
+    },
+    'Fees': {
+        'keywords': ['Fee'],
+        'merchants': ['overdraft fee', 'monthly service fee', 'foreign transaction fee', 'atm fee', 'late fee'],
+    },
+    'Food': {
+        'keywords': [
+            'snack', 'Donalds', 'Burger King', 'KFC', 'Subway', 'Pizza', 'Domino', 'Taco Bell', 'Wendy', 'Chick-fil-A',
+            'Popeyes', "Arby's", 'Chipotle'
+        ],
+        'merchants': [
+            "mcdonald's", 'mcdonalds', 'burger king', 'taco bell', "wendy's", 'chick-fil-a', 'popeyes', "arby's",
+            'chipotle', "domino's", 'pizza hut', 'five guys', 'shake shack'
+        ],
+    },
+    'Fuel': {
+        'keywords': ['fuel', 'gas', 'petrol'],
+        'merchants': ['exxonmobil', 'exxon', 'chevron', 'sunoco', 'valero'],
+    },
+    'Gifts': {
+        'keywords': ['donation', 'gift'],
+    },
+    'Groceries': {
+        'keywords': ['groceries', 'supermarket', 'food', 'familia'],
+        'merchants': [
+            'whole foods', 'wholefoods', "trader joe's", 'trader joes', 'kroger', 'aldi', 'publix', 'wegmans',
+            'mercadona'
+        ],
+    },
+    'Gym': {
+        'keywords': ['gym', 'fitness', 'yoga', 'pilates', 'crossfit'],
+        'merchants': ['planet fitness', 'crossfit', 'equinox'],
+    },
+    'Home': {
+        'keywords': ['Ikea'],
+        'merchants': ['ikea', 'home depot', "lowe's"],
+    },
+    'Housing': {
+        'keywords': ['rent', 'mortgage'],
+    },
+    'Income': {
+        'keywords': ['refund', 'deposit', 'paycheck'],
+        'merchants': ['payroll', 'paycheck'],
+    },
+    'Insurance': {
+        'keywords': ['insurance'],
+        'merchants': ['geico', 'state farm', 'allstate'],
+    },
+    'Medical': {
+        'keywords': ['medical', 'doctor', 'dentist', 'hospital', 'clinic'],
+    },
+    'Pets': {
+        'keywords': ['vet', 'veterinary', 'pet', 'dog', 'cat'],
+        'merchants': ['petco', 'petsmart', 'chewy.com'],
+    },
+    'Pharmacy': {
+        'keywords': ['pharmacy', 'drugstore', 'cvs', 'walgreens', 'rite aid', 'duane'],
+        'merchants': ['cvs pharmacy', 'walgreens', 'rite aid', 'duane reade'],
+    },
+    'Restaurants': {
+        'keywords': ['restaurant', 'lunch', 'dinner'],
+    },
+    'Services': {
+        'keywords': ['service', 'laundry', 'dry cleaning'],
+    },
+    'Shopping': {
+        'keywords': ['shopping', 'amazon', 'walmart', 'target', 'safeway'],
+        'merchants': ['amazon', 'amzn mktp', 'walmart', 'ebay', 'etsy'],
+    },
+    'Streaming': {
+        'keywords': ['Netflix', 'Spotify', 'Hulu', 'HBO'],
+        'merchants': ['netflix', 'spotify', 'hulu', 'hbo max', 'disney plus', 'youtube premium'],
+    },
+    'Taxes': {
+        'keywords': ['tax', 'irs'],
+        'merchants': ['irs treas'],
+    },
+    'Technology': {
+        'keywords': ['technology', 'software', 'hardware', 'electronics'],
+    },
+    'Transportation': {
+        'keywords': ['bus', 'train', 'subway', 'metro', 'airline', 'uber', 'lyft', 'taxi'],
+        'merchants': ['uber trip', 'lyft', 'amtrak'],
+    },
+    'Travel': {
+        'keywords': [
+            'travel', 'holiday', 'trip', 'airbnb', 'kiwi', 'hotel', 'hostel', 'resort', 'kiwi', 'kayak', 'expedia',
+            'booking.com'
+        ],
+        'merchants': ['airbnb', 'expedia', 'booking.com', 'hotels.com', 'kayak'],
+    },
+    'Transfer': {
+        'keywords': ['payment from'],
+        'merchants': ['zelle', 'venmo', 'cash app'],
+    },
+    'Utilities': {
+        'keywords': ['electricity', 'water', 'gas', 'ting', 'verizon', 'comcast', 'sprint', 't-mobile', 'at&t', 'mint'],
+        'merchants': ['verizon', 'comcast', 'xfinity', 't-mobile', 'mint mobile'],
+    },
+    # Fallback for descriptions that don't fit any other category (the model is told when to use it instead)
+    'Other': {'note': 'use this when very uncertain about the category'},
+}
+
+
+def categories_section(categories: Dict[str, Dict] = CATEGORIES) -> str:
+    """Return the <categories> section of the prompt template, listing each category with its keywords."""
+    lines = [f"    -{category}: {data.get('note') or ', '.join(data['keywords'])}" for category, data in categories.items()]
+    return (
+        "    <categories>\n"
+        "    The following list contains the categories and associated keywords you often see in transaction descriptions:\n"
+        + '\n'.join(lines) + "\n"
+        "    </categories>\n"
+    )
+
+
 EXPENSE_CAT_TEMPLATE = """
     <context>
     You are an advanced data analysis model. Your task is to create a list of [description, category] lists, where in each list item:
@@ -5,44 +164,7 @@ EXPENSE_CAT_TEMPLATE = """
     - the category of the transaction (choose one from the list below based on the description)
     </context>
     
-    <categories>
-    The following list contains the categories and associated keywords you often see in transaction descriptions:
-    -ATM: atm, cash, withdraw
-    -Auto: auto body
-    -Bars: bar, pubs, irish, brewery
-    -Beauty: body
-    -Cashback: cashback, reward, bonus, cash back
-    -Clothing: clothing, shoes, accessories
-    -Coffee Shops: coffee, cafe, tea, Starbucks, Dunkin
-    -Credit Card Payment: card payment, autopay
-    -Education: kindle, tuition
-    -Entertainment: event, show, movies, cinema, theater
-    -Fees: Fee
-    -Food: snack, Donalds, Burger King, KFC, Subway, Pizza, Domino, Taco Bell, Wendy, Chick-fil-A, Popeyes, Arby's, Chipotle
-    -Fuel: fuel, gas, petrol
-    -Gifts: donation, gift
-    -Groceries: groceries, supermarket, food, familia
-    -Gym: gym, fitness, yoga, pilates, crossfit
-    -Home: Ikea
-    -Housing: rent, mortgage
-    -Income: refund, deposit, paycheck
-    -Insurance: insurance
-    -Medical: medical, doctor, dentist, hospital, clinic
-    -Pets: vet, veterinary, pet, dog, cat
-    -Pharmacy: pharmacy, drugstore, cvs, walgreens, rite aid, duane
-    -Restaurants: restaurant, lunch, dinner
-    -Services: service, laundry, dry cleaning
-    -Shopping: shopping, amazon, walmart, target, safeway
-    -Streaming: Netflix, Spotify, Hulu, HBO
-    -Taxes: tax, irs
-    -Technology: technology, software, hardware, electronics
-    -Transportation: bus, train, subway, metro, airline, uber, lyft, taxi
-    -Travel: travel, holiday, trip, airbnb, kiwi, hotel, hostel, resort, kiwi, kayak, expedia, booking.com
-    -Transfer: payment from
-    -Utilities: electricity, water, gas, ting, verizon, comcast, sprint, t-mobile, at&t, mint
-    -Other: use this when very uncertain about the category
-    </categories>
-
+""" + categories_section() + """
     <formatting_instructions>
     Your output should be a valid list of lists (e.g. [[description1, category1], [description2, category2], ...]] parse-able by the command ast.literal_eval(output)
     Don't include any kind of commentary, return carriages, spaces or other characters in the output
@@ -52,4 +174,7 @@ EXPENSE_CAT_TEMPLATE = """
     
     <financial_transactions>
     {input_data}
-    </financial_transactions>"""
\ No newline at end of file
+    </financial_transactions>"""
+
+# Valid categories (as listed in the <categories> section of the template above)
+EXPENSE_CATEGORIES = frozenset(CATEGORIES)
@@ -0,0 +1,171 @@
+# Standard library imports
+import os
+import uuid
+import argparse
+from datetime import date, datetime
+from typing import List, Optional, Union
+
+# Third-party library imports
+import pandas as pd
+
+try:
+    # Optional dependency, only needed for the Parquet output format
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Local application/library specific imports
+from src.config import TX_OUTPUT_DATASET, TX_OUTPUT_FILE, TX_CHUNK_SIZE
+
+TX_COLUMNS = ['Source', 'Date', 'Type', 'Category', 'Description', 'Amount']
+CATEGORICAL_COLUMNS = ['Source', 'Type', 'Category']
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("The Parquet output format requires pyarrow (pip install pyarrow)")
+
+
+def _tx_schema() -> 'pa.Schema':
+    # Low-cardinality columns are dictionary encoded; dates are stored as dates, so range filters are typed
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('Source', dictionary),
+        ('Date', pa.date32()),
+        ('Type', dictionary),
+        ('Category', dictionary),
+        ('Description', pa.string()),
+        ('Amount', pa.float64()),
+        ('Month', pa.string()),
+    ])
+
+
+def write_tx_dataset(tx_list: pd.DataFrame, dataset_path: str = TX_OUTPUT_DATASET) -> None:
+    """
+    Append transactions (in output format) to the Parquet dataset, partitioned by year-month (Month=YYYY-MM).
+
+    Each call writes new files into the partitions of its transactions; existing files are never rewritten.
+
+    Args:
+        tx_list (pd.DataFrame): Transactions, with the output columns (see 'save_results').
+        dataset_path (str): Root folder of the dataset.
+    """
+
+    _require_pyarrow()
+    if tx_list.empty:
+        return
+
+    tx_list = tx_list[TX_COLUMNS].copy()
+    dates = pd.to_datetime(tx_list['Date'], format='%Y/%m/%d')
+    tx_list['Date'] = dates.dt.date
+    tx_list['Month'] = dates.dt.strftime('%Y-%m')
+    tx_list['Amount'] = tx_list['Amount'].astype(float)
+    for column in CATEGORICAL_COLUMNS:
+        tx_list[column] = tx_list[column].astype(str).astype('category')
+
+    table = pa.Table.from_pandas(tx_list, schema=_tx_schema(), preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=dataset_path,
+        partition_cols=['Month'],
+        basename_template=f'{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def write_tx_dataset_from_csv(file_path: str, dataset_path: str = TX_OUTPUT_DATASET, chunk_size: int = TX_CHUNK_SIZE) -> None:
+    """Append the transactions of a CSV file (in output format, without header) to the Parquet dataset, in chunks."""
+    for tx_list in pd.read_csv(file_path, names=TX_COLUMNS, header=None, chunksize=chunk_size):
+        write_tx_dataset(tx_list, dataset_path)
+
+
+def _to_date(value: Union[str, date, None]) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    return pd.to_datetime(value).date()
+
+
+def load_transactions(
+    start_date: Union[str, date, None] = None,
+    end_date: Union[str, date, None] = None,
+    columns: Optional[List[str]] = None,
+    dataset_path: str = TX_OUTPUT_DATASET,
+) -> pd.DataFrame:
+    """
+    Load transactions from the Parquet dataset, reading only the requested partitions and columns.
+
+    Args:
+        start_date (str or date, optional): First date to load (inclusive), e.g. '2023-04-01'.
+        end_date (str or date, optional): Last date to load (inclusive), e.g. '2023-06-30'.
+        columns (List[str], optional): Columns to load (default: all output columns).
+        dataset_path (str): Root folder of the dataset.
+
+    Returns:
+        pd.DataFrame: Transactions in the date range (with categorical 'Source', 'Type' and 'Category' columns).
+    """
+
+    _require_pyarrow()
+    columns = columns or TX_COLUMNS
+    if not os.path.isdir(dataset_path):
+        return pd.DataFrame(columns=columns)
+
+    partitioning = ds.partitioning(pa.schema([('Month', pa.string())]), flavor='hive')
+    dataset = ds.dataset(dataset_path, format='parquet', partitioning=partitioning)
+
+    # Month filters prune whole partitions; date filters are pushed down to the row groups
+    start_date, end_date = _to_date(start_date), _to_date(end_date)
+    filters = []
+    if start_date:
+        filters += [ds.field('Month') >= start_date.strftime('%Y-%m'), ds.field('Date') >= start_date]
+    if end_date:
+        filters += [ds.field('Month') <= end_date.strftime('%Y-%m'), ds.field('Date') <= end_date]
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas(date_as_object=False)
+
+
+def export_csv(
+    file_path: str = TX_OUTPUT_FILE,
+    start_date: Union[str, date, None] = None,
+    end_date: Union[str, date, None] = None,
+    dataset_path: str = TX_OUTPUT_DATASET,
+) -> int:
+    """
+    Export transactions from the Parquet dataset to a CSV file in the usual output format (e.g. for Excel).
+
+    Args:
+        file_path (str): Path to the CSV file (overwritten).
+        start_date (str or date, optional): First date to export (inclusive).
+        end_date (str or date, optional): Last date to export (inclusive).
+        dataset_path (str): Root folder of the dataset.
+
+    Returns:
+        int: Number of transactions exported.
+    """
+
+    tx_list = load_transactions(start_date, end_date, dataset_path=dataset_path)
+    tx_list = tx_list.sort_values(by=['Date'], kind='stable')
+    tx_list['Date'] = pd.to_datetime(tx_list['Date']).dt.strftime('%Y/%m/%d')
+    tx_list.to_csv(file_path, index=False, header=True)
+    return len(tx_list)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.tx_dataset', description='Export the Parquet transaction dataset')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Export transactions to a CSV file (e.g. for Excel)')
+    export_parser.add_argument('--start', help='First date to export (e.g. 2023-04-01)')
+    export_parser.add_argument('--end', help='Last date to export (e.g. 2023-06-30)')
+    export_parser.add_argument('--output', default=TX_OUTPUT_FILE, help='CSV file to write')
+    parsed = parser.parse_args(args)
+
+    exported = export_csv(parsed.output, parsed.start, parsed.end)
+    print(f'Exported {exported} transactions to {parsed.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# Standard library imports
+import os
+import time
+import signal
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+# Local application/library specific imports
+from src.file_processing import process_files, manage_processed_files, list_input_files
+from src.reference_index import ReferenceIndex
+from src.ingest_ledger import IngestLedger
+from src.shards import ShardWorker
+from src.metrics import get_metrics
+from src.config import (
+    TX_INPUT_FOLDER,
+    TX_WATCH_POLL_INTERVAL,
+    TX_WATCH_DEBOUNCE,
+    TX_WATCH_MAX_DELAY,
+    TX_WATCH_RETRY_DELAY,
+    TX_WATCH_MAX_RETRY_DELAY)
+
+
+class FolderWatcher:
+    """Polls the input folder and groups new files into micro-batches.
+
+    A file is complete once its size and modification time have not changed for 'debounce' seconds
+    (so files still being written or copied are left alone). Complete files are released as a batch
+    when the folder has been quiet for 'debounce' seconds, so files arriving together (e.g. the exports
+    of several accounts) are processed together; a steady stream of new files holds back complete ones
+    for at most 'max_delay' seconds.
+
+    Files of a failed batch (see 'retry_later') are held back with exponential backoff, from 'retry_delay' up to
+    'max_retry_delay' seconds, unless they change meanwhile (e.g. once fixed, or replaced by a new export).
+    """
+
+    def __init__(
+        self,
+        folder: str = TX_INPUT_FOLDER,
+        debounce: float = TX_WATCH_DEBOUNCE,
+        max_delay: float = TX_WATCH_MAX_DELAY,
+        retry_delay: float = TX_WATCH_RETRY_DELAY,
+        max_retry_delay: float = TX_WATCH_MAX_RETRY_DELAY,
+    ) -> None:
+        self.folder = folder
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # Path -> (size and modification time, when they last changed)
+        self._files: Dict[str, Tuple[Tuple[int, float], float]] = {}
+        self._complete_since: Optional[float] = None
+        # Path of the files of failed batches -> (size and modification time, when to retry, current delay)
+        self._retries: Dict[str, Tuple[Tuple[int, float], float, float]] = {}
+
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """Scan the folder, and return the next batch of complete files (empty if there is none yet)."""
+        now = time.monotonic() if now is None else now
+
+        files = {}
+        for file_path in list_input_files(self.folder):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self._files.get(file_path)
+            files[file_path] = previous if previous and previous[0] == signature else (signature, now)
+        self._files = files
+
+        complete = sorted(
+            file_path for file_path, (_, changed_at) in files.items()
+            if now - changed_at >= self.debounce and not self.backing_off(file_path, now)
+        )
+        if not complete:
+            self._complete_since = None
+            return []
+
+        self._complete_since = self._complete_since or now
+        quiet = now - max(changed_at for _, changed_at in files.values()) >= self.debounce
+        if not quiet and now - self._complete_since < self.max_delay:
+            return []
+
+        for file_path in complete:
+            del self._files[file_path]
+        self._complete_since = None
+        return complete
+
+    def retry_later(self, file_paths: List[str], now: Optional[float] = None) -> None:
+        """Hold back the files of a failed batch, twice as long as last time if they failed before."""
+        now = time.monotonic() if now is None else now
+        for file_path in file_paths:
+            signature = self._signature(file_path)
+            previous = self._retries.get(file_path)
+            delay = min(2 * previous[2], self.max_retry_delay) if previous and previous[0] == signature else self.retry_delay
+            self._retries[file_path] = (signature, now + delay, delay)
+
+    def processed(self, file_paths: List[str]) -> None:
+        """Forget the failures of files processed successfully."""
+        for file_path in file_paths:
+            self._retries.pop(file_path, None)
+
+    def backing_off(self, file_path: str, now: Optional[float] = None) -> bool:
+        """Return True if the file failed before, and is not to be retried yet."""
+        now = time.monotonic() if now is None else now
+        retry = self._retries.get(file_path)
+        if retry is None:
+            return False
+        if self._signature(file_path) != retry[0]:
+            # Changed (or gone) since it failed: retried as a new file
+            del self._retries[file_path]
+            return False
+        return now < retry[1]
+
+    @staticmethod
+    def _signature(file_path: str) -> Optional[Tuple[int, float]]:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+
+async def watch_input_folder(
+    executor: Optional[Executor] = None,
+    ref_index: Optional[ReferenceIndex] = None,
+    ledger: Optional[IngestLedger] = None,
+    d_flag: bool = False,
+    stop_event: Optional[asyncio.Event] = None,
+    poll_interval: float = TX_WATCH_POLL_INTERVAL,
+    offline: bool = False,
+    worker: Optional[ShardWorker] = None,
+) -> None:
+    """
+    Watch the input folder and process new files in micro-batches until stopped (SIGINT or SIGTERM).
+
+    The executor, reference index, ledger and LLM client stay warm between batches, so each batch only pays
+    for its own files. Each batch goes through the usual flow ('process_files', then 'manage_processed_files');
+    a stop request lets the current batch finish (and be saved) before returning. Files left in the folder
+    are picked up again on the next start.
+
+    Args:
+        executor (Executor, optional): Executor to standardize the files in (see 'process_file').
+        ref_index (ReferenceIndex, optional): Reference index shared by all batches; loaded if not provided.
+        ledger (IngestLedger, optional): Ledger of the files and transactions already ingested.
+        d_flag (bool): Delete the files once processed, instead of archiving them (see 'manage_processed_files').
+        stop_event (asyncio.Event, optional): Event to stop watching (set on SIGINT or SIGTERM).
+        poll_interval (float): Seconds between scans of the input folder.
+        offline (bool): Categorize with local tiers only, without calling the language model (see 'categorize_tx_list').
+        worker (ShardWorker, optional): Worker of a sharded run; new files are claimed before being processed, so
+            several workers can watch the same folder.
+
+    Returns:
+        None
+    """
+
+    logger = logging.getLogger(__name__)
+    metrics = get_metrics()
+    ref_index = ReferenceIndex.load() if ref_index is None else ref_index
+    stop_event = stop_event or asyncio.Event()
+    watcher = FolderWatcher()
+
+    # Stop after the current batch; a second signal interrupts right away (default handlers are restored)
+    loop = asyncio.get_running_loop()
+    stop_signals = (signal.SIGINT, signal.SIGTERM)
+
+    def request_stop() -> None:
+        if stop_event.is_set():
+            return
+        print('\nStopping after the current batch...')
+        stop_event.set()
+        for stop_signal in stop_signals:
+            loop.remove_signal_handler(stop_signal)
+
+    for stop_signal in stop_signals:
+        loop.add_signal_handler(stop_signal, request_stop)
+
+    print(f'\nWatching {TX_INPUT_FOLDER} for new files (Ctrl+C to stop)...')
+    resume = worker is not None
+    try:
+        while not stop_event.is_set():
+            file_paths = watcher.poll()
+            if worker is not None and (file_paths or resume):
+                # Files left in the worker's folder by an interrupted run (or a failed batch, once due) go with the next batch
+                worker.claim(file_paths)
+                file_paths = [file_path for file_path in worker.claimed_files() if not watcher.backing_off(file_path)]
+                resume = False
+            if file_paths:
+                file_names = [os.path.basename(file_path) for file_path in file_paths]
+                try:
+                    await process_files(file_paths, executor, ref_index, ledger, offline)
+                    if worker is not None:
+                        manage_processed_files(d_flag, file_names, worker.folder, clear_archive=False)
+                    else:
+                        manage_processed_files(d_flag, file_names)
+                    watcher.processed(file_paths)
+                    if worker is not None:
+                        # Pick up the pairs saved by the other workers meanwhile
+                        ref_index.refresh()
+                except Exception as e:
+                    # Files are left in the input folder, or in the worker's folder, and retried later (with backoff)
+                    logger.error(f"| Files: {', '.join(file_names)} | Batch Error: {e}")
+                    print(f'ERROR processing batch {file_names}: {e}')
+                    watcher.retry_later(file_paths)
+                    metrics.increment('failed_batches')
+                    if ledger is not None:
+                        ledger.discard_staged()
+                metrics.increment('batches')
+                metrics.dump()
+                print(f'\nWatching {TX_INPUT_FOLDER} for new files (Ctrl+C to stop)...')
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for stop_signal in stop_signals:
+            loop.remove_signal_handler(stop_signal)
+        metrics.dump()
@@ -0,0 +1,69 @@
+# Local application/library specific imports
+from src.categorize_tx import reconcile_llm_output
+
+
+def test_all_descriptions_categorized():
+    categorized, missing = reconcile_llm_output(
+        ['STARBUCKS', 'NETFLIX.COM'],
+        [('STARBUCKS', 'Coffee Shops'), ('NETFLIX.COM', 'Streaming')],
+    )
+    assert dict(categorized) == {'STARBUCKS': 'Coffee Shops', 'NETFLIX.COM': 'Streaming'}
+    assert missing == []
+
+
+def test_missing_lines_are_requeued():
+    categorized, missing = reconcile_llm_output(
+        ['STARBUCKS', 'NETFLIX.COM', 'SHELL OIL'],
+        [('NETFLIX.COM', 'Streaming')],
+    )
+    assert dict(categorized) == {'NETFLIX.COM': 'Streaming'}
+    assert missing == ['STARBUCKS', 'SHELL OIL']
+
+
+def test_invalid_categories_are_requeued():
+    categorized, missing = reconcile_llm_output(
+        ['STARBUCKS', 'NETFLIX.COM'],
+        [('STARBUCKS', 'Coffee'), ('NETFLIX.COM', 'Streaming')],
+    )
+    assert dict(categorized) == {'NETFLIX.COM': 'Streaming'}
+    assert missing == ['STARBUCKS']
+
+
+def test_reordered_output():
+    descriptions = ['A SHOP', 'B SHOP', 'C SHOP']
+    categorized, missing = reconcile_llm_output(
+        descriptions,
+        [('C SHOP', 'Shopping'), ('A SHOP', 'Groceries'), ('B SHOP', 'Food')],
+    )
+    assert dict(categorized) == {'A SHOP': 'Groceries', 'B SHOP': 'Food', 'C SHOP': 'Shopping'}
+    assert missing == []
+
+
+def test_altered_descriptions_are_matched_ignoring_case_and_whitespace():
+    categorized, missing = reconcile_llm_output(
+        ['BLUE  BOTTLE COFFEE', 'UNKNOWN'],
+        [('blue bottle coffee', 'Coffee Shops'), ('SOMETHING ELSE', 'Other')],
+    )
+    assert dict(categorized) == {'BLUE  BOTTLE COFFEE': 'Coffee Shops'}
+    assert missing == ['UNKNOWN']
+
+
+def test_duplicate_descriptions_keep_the_first_valid_category():
+    categorized, missing = reconcile_llm_output(
+        ['STARBUCKS'],
+        [('STARBUCKS', 'Not a category'), ('STARBUCKS', 'Coffee Shops'), ('starbucks', 'Restaurants')],
+    )
+    assert categorized == [('STARBUCKS', 'Coffee Shops')]
+    assert missing == []
+
+
+def test_duplicate_requested_descriptions():
+    categorized, missing = reconcile_llm_output(['STARBUCKS', 'STARBUCKS'], [('STARBUCKS', 'Coffee Shops')])
+    assert categorized == [('STARBUCKS', 'Coffee Shops')]
+    assert missing == []
+
+
+def test_empty_output():
+    categorized, missing = reconcile_llm_output(['STARBUCKS'], [])
+    assert categorized == []
+    assert missing == ['STARBUCKS']
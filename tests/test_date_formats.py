@@ -0,0 +1,88 @@
+# Standard library imports
+import json
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local application/library specific imports
+from src.date_formats import detect_date_format, parse_dates
+from src.file_processing import standardize_tx_format
+from src.config import SCHEMA_REGISTRY_FILE
+
+
+def test_day_first_dates():
+    # 13/01/2023 can only be day-first, so the whole column is read day-first
+    detected = detect_date_format(pd.Series(['01/02/2023', '13/01/2023', '05/03/2023']))
+    assert detected == {'format': '%d/%m/%Y', 'ambiguous': False}
+
+
+def test_month_first_dates():
+    detected = detect_date_format(pd.Series(['01/02/2023', '01/13/2023', '05/03/2023']))
+    assert detected == {'format': '%m/%d/%Y', 'ambiguous': False}
+
+
+def test_disambiguated_beyond_the_sample():
+    # Only the last date (outside the sample) tells the dates are day-first
+    dates = pd.Series(['01/02/2023', '02/03/2023', '03/04/2023', '25/12/2023'])
+    assert detect_date_format(dates, sample_size=2) == {'format': '%d/%m/%Y', 'ambiguous': False}
+
+
+def test_ambiguous_dates():
+    detected = detect_date_format(pd.Series(['01/02/2023', '03/04/2023']))
+    assert detected == {'format': '%m/%d/%Y', 'ambiguous': True}
+
+
+def test_equivalent_formats_are_not_ambiguous():
+    # Same day and month: month-first and day-first agree
+    assert detect_date_format(pd.Series(['01/01/2023', '02/02/2023'])) == {'format': '%m/%d/%Y', 'ambiguous': False}
+
+
+def test_mixed_formats_are_rejected():
+    with pytest.raises(ValueError):
+        detect_date_format(pd.Series(['2023-01-31', '31/01/2023', 'Jan 31, 2023']))
+
+
+def test_missing_dates_are_ignored():
+    dates = pd.Series(['31.01.2023', np.nan, None, '01.02.2023'], dtype=object)
+    assert detect_date_format(dates) == {'format': '%d.%m.%Y', 'ambiguous': False}
+
+    parsed, date_format = parse_dates(dates)
+    assert date_format == '%d.%m.%Y'
+    assert parsed.dt.strftime('%Y/%m/%d').tolist()[::3] == ['2023/01/31', '2023/02/01']
+    assert parsed.isnull().tolist() == [False, True, True, False]
+
+
+def test_all_missing_dates():
+    assert detect_date_format(pd.Series([np.nan, None], dtype=object))['ambiguous'] is False
+
+
+def test_remembered_format_is_used_when_it_parses_all_dates():
+    # Ambiguous on their own, but the layout is known to be day-first
+    parsed, date_format = parse_dates(pd.Series(['01/02/2023', '03/04/2023']), '%d/%m/%Y')
+    assert date_format == '%d/%m/%Y'
+    assert parsed.dt.month.tolist() == [2, 4]
+
+
+def test_remembered_format_is_replaced_when_it_fails():
+    parsed, date_format = parse_dates(pd.Series(['2023-01-31', '2023-02-28']), '%d/%m/%Y')
+    assert date_format == 'ISO8601'
+    assert parsed.dt.day.tolist() == [31, 28]
+
+
+def test_ambiguous_format_is_not_remembered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'ambiguous.csv').write_text('Date,Description,Amount\n01/02/2023,SHOP,-1.00\n03/04/2023,CAFE,-2.00\n')
+    (tmp_path / 'clear.csv').write_text('Date,Description,Amount\n01/02/2023,SHOP,-1.00\n25/04/2023,CAFE,-2.00\n')
+
+    # Parsed month-first (the assumed format), but the layout keeps no date format
+    tx_list = standardize_tx_format(str(tmp_path / 'ambiguous.csv'))
+    assert tx_list['date'].tolist() == ['2023/01/02', '2023/03/04']
+    schemas = json.loads((tmp_path / SCHEMA_REGISTRY_FILE).read_text())
+    assert [schema['date_format'] for schema in schemas.values()] == [None]
+
+    # A later export of the same layout that disambiguates the dates is remembered
+    standardize_tx_format(str(tmp_path / 'clear.csv'))
+    schemas = json.loads((tmp_path / SCHEMA_REGISTRY_FILE).read_text())
+    assert [schema['date_format'] for schema in schemas.values()] == ['%d/%m/%Y']
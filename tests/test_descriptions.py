@@ -0,0 +1,57 @@
+# Third-party library imports
+import pandas as pd
+import pytest
+
+# Local application/library specific imports
+from benchmarks.generate_exports import merchant_catalog
+from src.descriptions import DescriptionCanonicalizer
+
+DESCRIPTIONS = [
+    'SQ *BLUE BOTTLE 0423 NEW YORK NY',
+    'BLUE BOTTLE 1187 NEW YORK NY',
+    'STARBUCKS          SEATTLE      WA',
+    'WHOLEFDS MKT, AUSTIN, TX',
+    'UBER 8005928996 SAN FRANCISCO CA',
+    'CHECKCARD 0423 SHELL OIL 57444 CARD 1234',
+    'AMAZON MKTP US*2K4 AUTH #123456',
+    'NETFLIX.COM 866-579 04/23',
+    'PURCHASE AUTHORIZED ON 04/21 TST* TAQUERIA XXXX1234',
+    'ZELLE PAYMENT TO JOHN REF: A1B2C3',
+    'BIG ACME CO PA 1234',
+    'AIRBNB PAYMENT MA ME',
+    'PAGO EN TIENDA LA',
+    'SHOP, NY 1234',
+    'CHECK IN',
+    '123456',
+]
+
+
+@pytest.mark.parametrize('description, key', [
+    ('SQ *BLUE BOTTLE 0423 NEW YORK NY', 'BLUE BOTTLE NEW YORK'),
+    ('BLUE BOTTLE 1187 NEW YORK NY', 'BLUE BOTTLE NEW YORK'),
+    ('STARBUCKS          SEATTLE      WA', 'STARBUCKS SEATTLE'),
+    ('WHOLEFDS MKT, AUSTIN, TX', 'WHOLEFDS MKT, AUSTIN'),
+    ('NETFLIX.COM 866-579 04/23', 'NETFLIX.COM'),
+    # State codes are only stripped where they follow a city
+    ('PAGO EN TIENDA LA', 'PAGO EN TIENDA LA'),
+    ('AIRBNB PAYMENT MA ME', 'AIRBNB PAYMENT MA ME'),
+    ('BIG ACME CO PA 1234', 'BIG ACME CO PA'),
+    ('CHECK IN', 'CHECK IN'),
+    # Descriptions made only of noise keep their text
+    ('123456', '123456'),
+])
+def test_canonical_keys(description, key):
+    assert DescriptionCanonicalizer().canonicalize(pd.Series([description])).tolist() == [key]
+
+
+def test_canonicalization_is_idempotent():
+    # Reference keys are canonicalized again when loaded, so they must be canonical keys of themselves
+    descriptions = pd.Series(DESCRIPTIONS + [description for description, _ in merchant_catalog(2_000)])
+    keys = DescriptionCanonicalizer().canonicalize(descriptions)
+    assert DescriptionCanonicalizer().canonicalize(keys).tolist() == keys.tolist()
+
+
+def test_missing_descriptions_stay_missing():
+    keys = DescriptionCanonicalizer().canonicalize(pd.Series(['SQ *DUNKIN 0423', None]))
+    assert keys.iloc[0] == 'DUNKIN'
+    assert keys.iloc[1] is None
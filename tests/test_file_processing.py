@@ -0,0 +1,108 @@
+# Standard library imports
+import json
+import asyncio
+from pathlib import Path
+
+# Third-party library imports
+import pandas as pd
+import pytest
+
+# Local application/library specific imports
+from src.file_processing import standardize_tx_format, stream_file
+from src.categorize_tx_list import categorize_tx_list
+from src.reference_index import ReferenceIndex
+from src.config import SCHEMA_REGISTRY_FILE
+
+TX_COLUMNS = ['source', 'date', 'type', 'category', 'description', 'amount']
+
+
+def write_amounts(path, amounts):
+    # Single amount column layout ('ONLY_AMOUNTS'), with a day-first date to keep the date format unambiguous
+    path.write_text('Date,Description,Amount\n' + ''.join(f'25/01/2023,SHOP {i},{amount}\n' for i, amount in enumerate(amounts)))
+    return str(path)
+
+
+def registered_schema(tmp_path):
+    schemas = json.loads((tmp_path / SCHEMA_REGISTRY_FILE).read_text())
+    assert len(schemas) == 1
+    return next(iter(schemas.values()))
+
+
+def test_sign_conventions_are_remembered_per_account(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Checking account: debits are negative; credit card with the same columns: debits are positive
+    checking = write_amounts(tmp_path / 'checking_20230131.csv', [-10] * 10 + [100])
+    card = write_amounts(tmp_path / 'card_20230131.csv', [10] * 10 + [-100])
+
+    assert (standardize_tx_format(checking)['type'] == 'D').sum() == 10
+    assert (standardize_tx_format(card)['type'] == 'D').sum() == 10
+    assert registered_schema(tmp_path)['sign_conventions'] == {'checking': 'keep', 'card': 'invert'}
+
+    # A later export of the card whose signs contradict its convention is rejected
+    card = write_amounts(tmp_path / 'card_20230228.csv', [-10] * 10 + [100])
+    with pytest.raises(ValueError, match="account 'card'"):
+        standardize_tx_format(card)
+
+
+def test_sign_check_disabled_guesses_each_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    standardize_tx_format(write_amounts(tmp_path / 'card_20230131.csv', [10] * 10 + [-100]))
+    schema_path = tmp_path / SCHEMA_REGISTRY_FILE
+    schemas = json.loads(schema_path.read_text())
+    for schema in schemas.values():
+        schema['sign_check'] = False
+    schema_path.write_text(json.dumps(schemas))
+
+    # Not inverted with the remembered convention, but with the one guessed from the file
+    tx_list = standardize_tx_format(write_amounts(tmp_path / 'card_20230228.csv', [-10] * 10 + [100]))
+    assert (tx_list['type'] == 'D').sum() == 10
+
+
+def stream_and_read_at_once(tmp_path, monkeypatch, content, chunk_size=3):
+    # Standardize and categorize (offline) the same file in chunks and at once, each with a new registry
+    input_file = tmp_path / 'export_20230131.csv'
+    input_file.write_text(content)
+    outputs = []
+    for mode in ('streamed', 'at_once'):
+        (tmp_path / mode / 'data/tx_data/output').mkdir(parents=True)
+        monkeypatch.chdir(tmp_path / mode)
+        ref_index = ReferenceIndex(pd.DataFrame(columns=['description', 'category']))
+        if mode == 'streamed':
+            output_file, _, _ = asyncio.run(stream_file(str(input_file), ref_index, chunk_size=chunk_size, offline=True))
+            outputs.append(pd.read_csv(output_file, header=None, names=TX_COLUMNS, dtype=str, keep_default_na=False))
+        else:
+            tx_list = asyncio.run(categorize_tx_list(standardize_tx_format(str(input_file)), ref_index, offline=True))
+            tx_list.to_csv('at_once.csv', index=False, header=False)
+            outputs.append(pd.read_csv('at_once.csv', header=None, names=TX_COLUMNS, dtype=str, keep_default_na=False))
+        outputs.append(json.loads(Path(SCHEMA_REGISTRY_FILE).read_text()))
+    return outputs
+
+
+def test_streamed_file_matches_file_read_at_once(tmp_path, monkeypatch):
+    # Dates only read day-first from the third chunk on, and amounts whose separator is only clear in the last chunk
+    content = 'Date,Description,Amount\n' + ''.join(
+        f'{day:02d}/{month:02d}/2023,{merchant},{amount}\n'
+        for day, month, merchant, amount in [
+            (1, 2, 'STARBUCKS 1234', '"-1,234"'), (2, 3, 'NETFLIX.COM', '"-2,500"'), (3, 4, 'SHELL OIL 5678', '"-12,000"'),
+            (4, 5, 'PAYROLL ACME', '"3,000"'), (25, 5, 'UBER TRIP', '"-7,000"'), (5, 6, 'WHOLE FOODS', '"-1,500"'),
+            (6, 7, 'AMAZON MKTP', '"-2,000"'), (7, 8, 'LOCAL SHOP', '"-12,75"'),
+        ]
+    )
+    streamed, streamed_schemas, at_once, at_once_schemas = stream_and_read_at_once(tmp_path, monkeypatch, content)
+
+    assert len(streamed) == 8
+    assert streamed.equals(at_once)
+    assert streamed_schemas == at_once_schemas
+    assert streamed['date'].tolist()[4] == '2023/05/25'
+    assert streamed['amount'].tolist()[:2] == ['-1.234', '-2.5']
+
+
+def test_streamed_typed_file_matches_file_read_at_once(tmp_path, monkeypatch):
+    content = 'Transaction Date,Description,Type,Amount\n' + ''.join(
+        f'2023-01-{day:02d},MERCHANT {day % 4},{"Credit" if day % 5 == 0 else "Debit"},{day * 1.25}\n' for day in range(1, 29)
+    )
+    streamed, streamed_schemas, at_once, at_once_schemas = stream_and_read_at_once(tmp_path, monkeypatch, content, chunk_size=5)
+
+    assert len(streamed) == 28
+    assert streamed.equals(at_once)
+    assert streamed_schemas == at_once_schemas
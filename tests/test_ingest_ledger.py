@@ -0,0 +1,108 @@
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from src.ingest_ledger import IngestLedger, AccountMap, file_fingerprint, row_fingerprints
+
+
+def tx_rows(rows):
+    return pd.DataFrame(rows, columns=['date', 'description', 'amount'])
+
+
+JANUARY = [('2023/01/03', 'STARBUCKS', -4.5), ('2023/01/03', 'STARBUCKS', -4.5), ('2023/01/20', 'NETFLIX.COM', -15.99)]
+FEBRUARY = [('2023/01/20', 'NETFLIX.COM', -15.99), ('2023/02/01', 'PAYROLL', 3000.0), ('2023/02/03', 'STARBUCKS', -4.5)]
+
+
+def test_overlapping_exports_keep_only_new_rows(tmp_path):
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    assert ledger.stage_file('january', 'activity_20230131.csv')
+    # Identical transactions in the same file (two coffees on the same day) are all kept
+    assert ledger.stage_rows('january', row_fingerprints(tx_rows(JANUARY), 'bank/activity')).tolist() == [True, True, True]
+    ledger.commit(['january'])
+
+    assert ledger.stage_file('february', 'activity_20230228.csv')
+    new_rows = ledger.stage_rows('february', row_fingerprints(tx_rows(FEBRUARY), 'bank/activity'))
+    assert new_rows.tolist() == [False, True, True]
+    ledger.close()
+
+
+def test_rows_staged_in_chunks(tmp_path):
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    keys = row_fingerprints(tx_rows(JANUARY), 'bank/activity')
+    ledger.stage_file('january', 'activity.csv')
+    # The second coffee is in the next chunk of the same file: still a new occurrence
+    assert ledger.stage_rows('january', keys[:1]).tolist() == [True]
+    assert ledger.stage_rows('january', keys[1:]).tolist() == [True, True]
+    ledger.commit(['january'])
+
+    ledger.stage_file('january copy', 'activity (1).csv')
+    assert ledger.stage_rows('january copy', keys).tolist() == [False, False, False]
+    ledger.close()
+
+
+def test_identical_rows_from_different_accounts_are_kept(tmp_path):
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    ledger.stage_file('checking', 'checking.csv')
+    assert ledger.stage_rows('checking', row_fingerprints(tx_rows(JANUARY), 'bank/checking')).all()
+    ledger.stage_file('savings', 'savings.csv')
+    assert ledger.stage_rows('savings', row_fingerprints(tx_rows(JANUARY), 'bank/savings')).all()
+    ledger.close()
+
+
+def test_identical_files_from_different_accounts_are_kept(tmp_path):
+    export = tmp_path / 'transactions.csv'
+    export.write_text('Date,Description,Amount\n2023-01-03,STARBUCKS,-4.50\n')
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    assert ledger.stage_file(file_fingerprint(str(export), 'bank/checking'), 'transactions.csv')
+    assert ledger.stage_file(file_fingerprint(str(export), 'bank/savings'), 'transactions.csv')
+    # The same file again is skipped
+    assert not ledger.stage_file(file_fingerprint(str(export), 'bank/checking'), 'transactions.csv')
+    ledger.close()
+
+
+def test_download_names_map_to_the_same_account():
+    accounts = AccountMap()
+    names = ['Chase1234_Activity_20230430.csv', 'Chase1234_Activity_20230531 (1).csv', 'chase1234_activity_20230630 copy.csv']
+    assert {accounts.account(name) for name in names} == {'chase1234 activity'}
+    assert accounts.account('Amex_Activity_20230430.csv') != accounts.account(names[0])
+
+
+def test_account_mapping():
+    accounts = AccountMap(pd.DataFrame({'source': ['transactions*.csv', ''], 'account': ['Checking', 'Savings']}))
+    assert accounts.account('Transactions (2).csv') == 'Checking'
+    assert accounts.account('export.csv') == 'export'
+
+
+def test_discard_staged_on_failure(tmp_path):
+    ledger_file = str(tmp_path / 'ledger.db')
+    keys = row_fingerprints(tx_rows(JANUARY), 'bank/activity')
+    ledger = IngestLedger(ledger_file)
+    ledger.stage_file('january', 'activity.csv')
+    ledger.stage_rows('january', keys)
+    # The batch fails before its results are saved
+    ledger.discard_staged()
+
+    assert ledger.stage_file('january', 'activity.csv')
+    assert ledger.stage_rows('january', keys).all()
+    ledger.close()
+
+    # Entries staged by an interrupted run are discarded when the ledger is opened again
+    ledger = IngestLedger(ledger_file)
+    assert ledger.stage_file('january', 'activity.csv')
+    assert ledger.stage_rows('january', keys).all()
+    ledger.close()
+
+
+def test_workers_only_discard_their_own_entries(tmp_path):
+    ledger_file = str(tmp_path / 'ledger.db')
+    keys = row_fingerprints(tx_rows(JANUARY), 'bank/activity')
+    first, second = IngestLedger(ledger_file, worker='0'), IngestLedger(ledger_file, worker='1')
+    first.stage_file('january', 'activity.csv')
+    first.stage_rows('january', keys)
+    second.discard_staged()
+
+    assert not second.stage_file('january', 'activity.csv')
+    second.stage_file('january copy', 'activity (1).csv')
+    assert not second.stage_rows('january copy', keys).any()
+    first.close()
+    second.close()
@@ -0,0 +1,25 @@
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+import src.templates as templates
+from src.keyword_rules import KeywordRules, builtin_rules
+
+
+def test_categories_are_listed_in_the_prompt():
+    assert templates.EXPENSE_CATEGORIES == set(templates.CATEGORIES)
+    for category, data in templates.CATEGORIES.items():
+        assert f"-{category}: {data.get('note') or ', '.join(data['keywords'])}\n" in templates.EXPENSE_CAT_TEMPLATE
+    assert '{input_data}' in templates.EXPENSE_CAT_TEMPLATE
+
+
+def test_builtin_rules_come_from_the_category_merchants():
+    rules = builtin_rules()
+    assert set(rules['category']) <= templates.EXPENSE_CATEGORIES
+    assert ('netflix', 'Streaming') in set(rules[['keyword', 'category']].itertuples(index=False, name=None))
+
+
+def test_builtin_rules_match_whole_words():
+    rules = KeywordRules(builtin_rules())
+    descriptions = pd.Series(['NETFLIX.COM 866-579', 'BOOKING COM*HOTEL', 'SUSHI BAR', 'CASH APP*JOHN', 'AMAZONIA RESTAURANT'])
+    assert rules.categorize(descriptions).tolist() == ['Streaming', 'Travel', None, 'Transfer', None]
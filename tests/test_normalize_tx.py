@@ -0,0 +1,149 @@
+# Standard library imports
+import math
+
+# Third-party library imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local application/library specific imports
+from src.config import CR_VARIATIONS, DB_VARIATIONS
+from src.normalize_tx import (
+    detect_decimal_separator,
+    parse_amounts,
+    standardize_types,
+    sign_amounts_by_type,
+    amount_sign_convention,
+    standardize_amount_signs,
+    types_from_amounts,
+)
+
+
+# Legacy per-row normalization (as in 'standardize_tx_format' before it was vectorized)
+def legacy_parse_amount(x):
+    return (
+        float(x.replace('.', '').replace(',', '.'))  # European format (e.g. 1.234,56)
+        if isinstance(x, str) and ',' in x and (('.' not in x) or (x.rfind('.') < x.rfind(',')))
+        else float(x.replace(',', '')) if isinstance(x, str)  # US format (e.g. 1,234.56)
+        else x
+    )
+
+
+def legacy_standardize_type(x):
+    return 'C' if x.lower() in CR_VARIATIONS else 'D' if x.lower() in DB_VARIATIONS else None
+
+
+def legacy_sign_amounts(tx_list: pd.DataFrame) -> pd.Series:
+    return tx_list.apply(lambda x: abs(x['amount']) if x['type'] == 'C' else -abs(x['amount']), axis=1)
+
+
+def legacy_standardize_signs(amounts: pd.Series) -> pd.Series:
+    return -amounts if (amounts > 0).sum() > (amounts < 0).sum() else amounts
+
+
+def legacy_types_from_amounts(amounts: pd.Series) -> pd.Series:
+    return amounts.apply(lambda x: 'C' if x >= 0 else 'D')
+
+
+def assert_same_amounts(parsed: pd.Series, expected: list) -> None:
+    assert len(parsed) == len(expected)
+    for value, expected_value in zip(parsed, expected):
+        if isinstance(expected_value, float) and math.isnan(expected_value):
+            assert isinstance(value, float) and math.isnan(value)
+        else:
+            assert value == pytest.approx(expected_value)
+
+
+US_AMOUNTS = ['1,234.56', '-12.50', '0.99', '1,000,000.00', '12.5', ' 42.10 ']
+EU_AMOUNTS = ['1.234,56', '-12,50', '0,99', '1.000.000,00', '12,5', ' 42,10 ']
+MIXED_AMOUNTS = ['1,234.56', '1.234,56', '-7,25', '-7.25', '300', '5,00']
+
+
+@pytest.mark.parametrize('values', [US_AMOUNTS, EU_AMOUNTS, MIXED_AMOUNTS], ids=['us', 'eu', 'mixed'])
+def test_parse_amounts_matches_legacy(values):
+    amounts = pd.Series(values, dtype=object)
+    assert_same_amounts(parse_amounts(amounts), [legacy_parse_amount(value) for value in values])
+
+
+def test_parse_amounts_keeps_nan_and_numbers():
+    values = ['1,234.56', np.nan, 12.5, None, '3,5']
+    amounts = pd.Series(values, dtype=object)
+    expected = [legacy_parse_amount(value) for value in values]
+    parsed = parse_amounts(amounts)
+    assert parsed.isnull().tolist() == pd.Series(expected, dtype=object).isnull().tolist()
+    assert_same_amounts(parsed.dropna(), [value for value in expected if not pd.isnull(value)])
+
+
+def test_parse_amounts_leaves_numeric_columns_untouched():
+    amounts = pd.Series([1.5, -2.0, np.nan])
+    assert parse_amounts(amounts) is amounts
+
+
+@pytest.mark.parametrize('value', ['', '(1,234.56)', '(12.50)'])
+def test_parse_amounts_rejects_what_legacy_rejects(value):
+    # Empty strings and parenthesized negatives were never supported; both versions fail instead of guessing
+    with pytest.raises(ValueError):
+        legacy_parse_amount(value)
+    with pytest.raises(ValueError):
+        parse_amounts(pd.Series(['1.00', value], dtype=object))
+
+
+def test_thousands_separator_without_decimals():
+    amounts = pd.Series(['1,234', '12,000', '1.234'], dtype=object)
+    # Decided per value, as the legacy lambda did ('1,234' has a comma and no dot, so it reads as European)
+    assert_same_amounts(parse_amounts(amounts), [legacy_parse_amount(value) for value in amounts])
+    # With the column's decimal separator, values that could be read both ways follow it
+    assert_same_amounts(parse_amounts(amounts, '.'), [1234.0, 12000.0, 1.234])
+    assert_same_amounts(parse_amounts(amounts, ','), [1.234, 12.0, 1234.0])
+
+
+@pytest.mark.parametrize('values, separator', [
+    (US_AMOUNTS, '.'),
+    (EU_AMOUNTS, ','),
+    (['1,234', '2,500', '12,75'], ','),
+    (['1,234', '2,500', '12.75'], '.'),
+    (['1,234', '2,500'], ','),
+])
+def test_detect_decimal_separator(values, separator):
+    assert detect_decimal_separator(pd.Series(values, dtype=object)) == separator
+
+
+def test_detect_decimal_separator_numeric_column():
+    assert detect_decimal_separator(pd.Series([1.5, 2.25])) == '.'
+
+
+def test_standardize_types_matches_legacy():
+    values = ['Credit', 'CR', 'cr.', 'c', 'DEBIT', 'Dr', 'dr.', 'D', 'transfer', 'cr ', 'CREDITO']
+    types = pd.Series(values, dtype=object)
+    assert standardize_types(types).tolist() == [legacy_standardize_type(value) for value in values]
+
+
+def test_sign_amounts_by_type_matches_legacy():
+    tx_list = pd.DataFrame({
+        'amount': [10.0, -10.0, 5.5, -5.5, 0.0, 3.0],
+        'type': ['C', 'C', 'D', 'D', 'C', None],
+    })
+    signed = sign_amounts_by_type(tx_list['amount'], tx_list['type'])
+    assert signed.tolist() == legacy_sign_amounts(tx_list).tolist()
+    assert signed.index.equals(tx_list.index)
+
+
+@pytest.mark.parametrize('values', [
+    [-10.0, -20.0, 30.0],
+    [10.0, 20.0, -30.0],
+    [10.0, -10.0],
+    [0.0, 0.0, 5.0],
+    [],
+])
+def test_amount_signs_match_legacy(values):
+    amounts = pd.Series(values, dtype=float)
+    standardized = standardize_amount_signs(amounts)
+    assert standardized.tolist() == legacy_standardize_signs(amounts).tolist()
+    assert types_from_amounts(standardized).tolist() == legacy_types_from_amounts(standardized).tolist()
+
+
+def test_sign_convention_is_applied_as_given():
+    amounts = pd.Series([10.0, 20.0, -30.0])
+    assert amount_sign_convention(amounts) == 'invert'
+    assert standardize_amount_signs(amounts, 'keep').tolist() == amounts.tolist()
+    assert standardize_amount_signs(amounts, 'invert').tolist() == (-amounts).tolist()
@@ -0,0 +1,52 @@
+# Standard library imports
+import random
+
+# Third-party library imports
+import pandas as pd
+
+# Local application/library specific imports
+from benchmarks.generate_exports import merchant_catalog
+from src.reference_index import ReferenceIndex
+from src.descriptions import canonicalize_descriptions
+
+# Min share of queries whose category is the same with n-gram index candidates as with a brute-force fuzzy scan
+MIN_RECALL = 0.98
+
+
+def generated_reference(size: int, seed: int = 0) -> pd.DataFrame:
+    # Known merchants keep their category; the long tail of random merchants gets a random one
+    rng = random.Random(seed)
+    categories = ['Groceries', 'Shopping', 'Restaurants', 'Travel', 'Services']
+    return pd.DataFrame(
+        [(description, category or rng.choice(categories)) for description, category in merchant_catalog(size, seed=seed)],
+        columns=['description', 'category'],
+    )
+
+
+def misspell(description: str, rng: random.Random) -> str:
+    # Drop one letter of a word (e.g. 'STARBUCKS' -> 'STARBUKS'), as truncated descriptions often do
+    words = description.split()
+    position = rng.randrange(len(words))
+    word = words[position]
+    if len(word) > 4:
+        letter = rng.randrange(1, len(word) - 1)
+        words[position] = word[:letter] + word[letter + 1:]
+    return ' '.join(words)
+
+
+def test_pruned_fuzzy_matching_recall():
+    ref_index = ReferenceIndex(generated_reference(6_000))
+    rng = random.Random(1)
+    queries = pd.Series([misspell(description, rng) for description, _ in merchant_catalog(600, seed=1)])
+
+    report = ref_index.check_recall(canonicalize_descriptions(queries))
+
+    assert report['queries'] > 300
+    assert report['recall'] >= MIN_RECALL, report
+
+
+def test_exact_and_normalized_lookups():
+    ref_index = ReferenceIndex(pd.DataFrame({'description': ['BLUE BOTTLE COFFEE'], 'category': ['Coffee Shops']}))
+    categories = ref_index.categorize(pd.Series(['BLUE BOTTLE COFFEE', 'blue  bottle coffee', None]))
+    assert categories.tolist()[:2] == ['Coffee Shops', 'Coffee Shops']
+    assert pd.isnull(categories.iloc[2])
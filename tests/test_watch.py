@@ -0,0 +1,57 @@
+# Standard library imports
+import os
+
+# Local application/library specific imports
+from src.watch import FolderWatcher
+
+
+def test_batches_wait_for_complete_files(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), debounce=5, max_delay=60)
+    export = tmp_path / 'export.csv'
+    export.write_text('Date,Description,Amount\n')
+
+    assert watcher.poll(now=0) == []
+    assert watcher.poll(now=4) == []
+    assert watcher.poll(now=5) == [str(export)]
+    # Released once
+    assert watcher.poll(now=6) == []
+
+
+def test_failed_batches_are_retried_with_backoff(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), debounce=5, retry_delay=30, max_retry_delay=100)
+    export = str(tmp_path / 'export.csv')
+    with open(export, 'w') as file:
+        file.write('Date,Description,Amount\n')
+    assert watcher.poll(now=0) == []
+    assert watcher.poll(now=5) == [export]
+
+    # First failure: retried after 30 seconds, then 60, then at most every 100
+    retries = []
+    now = 5
+    for _ in range(4):
+        watcher.retry_later([export], now=now)
+        while True:
+            now += 1
+            if watcher.poll(now=now):
+                break
+        retries.append(now)
+    assert [later - earlier for earlier, later in zip([5] + retries, retries)] == [30, 60, 100, 100]
+
+    # A file changed since it failed is retried as a new file (once complete)
+    watcher.retry_later([export], now=now)
+    with open(export, 'a') as file:
+        file.write('2023-01-03,STARBUCKS,-4.50\n')
+    os.utime(export, (1, 1))
+    assert watcher.poll(now=now + 1) == []
+    assert watcher.poll(now=now + 6) == [export]
+
+
+def test_processed_files_forget_their_failures(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), debounce=5, retry_delay=30)
+    export = tmp_path / 'export.csv'
+    export.write_text('Date,Description,Amount\n')
+    watcher.retry_later([str(export)], now=0)
+    assert watcher.backing_off(str(export), now=10)
+
+    watcher.processed([str(export)])
+    assert not watcher.backing_off(str(export), now=10)